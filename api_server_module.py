@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Local HTTP API for the Exam Helper engine.
+
+Other tools on the same machine submit questions and images through the
+engine's question queue, so they share its answer workers, response cache
+and provider clients with the GUI. Answers are returned inline, polled by
+id or streamed as Server-Sent Events.
+
+    POST /v1/questions   {"question": "...", "response_mode": "short", "wait": true}
+    POST /v1/images      {"image": "<base64>", "model": "OpenAI GPT-4o", "wait": false}
+    GET  /v1/answers/<id>
+    GET  /v1/events[?request_id=<id>]   (text/event-stream)
+    GET  /v1/status
+
+When max_pending requests are already queued the server answers 429 with
+Retry-After instead of queueing more work.
+"""
+
+import argparse
+import ipaddress
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from engine_module import ExamEngine, IMAGE_MODELS, load_config
+
+MAX_BODY_BYTES = 25 * 1024 * 1024  # Large enough for a full-resolution PNG screenshot
+MAX_RESULTS = 1000  # Finished answers kept for polling
+DEFAULT_WAIT_TIMEOUT = 120
+HEARTBEAT_SECONDS = 15
+
+
+def is_loopback(host):
+    """True if host only accepts connections from this machine"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """Routes local API requests to the engine"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(format % args)
+
+    # -- helpers -----------------------------------------------------------
+
+    def _send_json(self, status, payload, extra_headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message, extra_headers=None):
+        self._send_json(status, {'error': {'message': message}}, extra_headers)
+
+    def _read_json(self):
+        """Read a JSON object body; sends the error response and returns None on failure"""
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # rfile.read(-1) would block until a keep-alive client closes the connection
+            self._send_error(400, "Invalid Content-Length")
+            self.close_connection = True
+            return None
+        if length > MAX_BODY_BYTES:
+            self._send_error(413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+            self.close_connection = True
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        except ValueError:
+            self._send_error(400, "Invalid JSON body")
+            return None
+        if not isinstance(body, dict):
+            self._send_error(400, "JSON body must be an object")
+            return None
+        return body
+
+    def _authorized(self):
+        """Check the bearer token if one is configured"""
+        token = self.server.token
+        if token and self.headers.get('Authorization') != f"Bearer {token}":
+            self._send_error(401, "Missing or invalid API token")
+            return False
+        return True
+
+    def _send_busy(self):
+        self.server.count('rejected')
+        self._send_error(429, "Too many pending requests", {'Retry-After': f"{self.server.retry_after:g}"})
+
+    # -- routes ------------------------------------------------------------
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+
+        url = urlparse(self.path)
+        if url.path == '/v1/status':
+            self._send_json(200, self.server.get_status())
+        elif url.path.startswith('/v1/answers/'):
+            self.handle_get_answer(url.path.rsplit('/', 1)[-1])
+        elif url.path == '/v1/events':
+            request_id = parse_qs(url.query).get('request_id', [None])[0]
+            self.handle_events(request_id)
+        else:
+            self._send_error(404, f"Unknown route {url.path}")
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+
+        path = urlparse(self.path).path
+        if path not in ('/v1/questions', '/v1/images'):
+            self._send_error(404, f"Unknown route {path}")
+            return
+
+        body = self._read_json()
+        if body is None:
+            return
+
+        response_mode = body.get('response_mode')
+        if response_mode not in (None, 'short', 'detailed'):
+            self._send_error(400, "response_mode must be 'short' or 'detailed'")
+            return
+
+        if path == '/v1/questions':
+            question = body.get('question')
+            if not isinstance(question, str) or not question.strip():
+                self._send_error(400, "'question' must be a non-empty string")
+                return
+            request_id = self.server.submit('question', body.get('source', 'API'), question.strip(),
+                                            response_mode=response_mode)
+        else:
+            image = body.get('image')
+            model = body.get('model')
+            if not isinstance(image, str) or not image:
+                self._send_error(400, "'image' must be a base64-encoded string")
+                return
+            if model is not None and model not in IMAGE_MODELS:
+                self._send_error(400, f"Unknown model; expected one of: {', '.join(IMAGE_MODELS)}")
+                return
+            request_id = self.server.submit('image', body.get('source', 'API'), image,
+                                            model_key=IMAGE_MODELS.get(model), response_mode=response_mode)
+
+        if request_id is None:
+            self._send_busy()
+            return
+
+        if body.get('wait', True):
+            try:
+                timeout = min(float(body.get('timeout', DEFAULT_WAIT_TIMEOUT)), self.server.max_wait)
+            except (TypeError, ValueError):
+                timeout = DEFAULT_WAIT_TIMEOUT
+            result = self.server.wait_for(request_id, timeout)
+        else:
+            result = self.server.get_result(request_id)
+
+        status = 200 if result['status'] != 'pending' else 202
+        self._send_json(status, result, {'Location': f"/v1/answers/{request_id}"})
+
+    def handle_get_answer(self, request_id):
+        """Poll a submitted request"""
+        try:
+            result = self.server.get_result(int(request_id))
+        except ValueError:
+            result = None
+        if result is None:
+            self._send_error(404, f"Unknown request id {request_id}")
+        else:
+            self._send_json(200, result)
+
+    def handle_events(self, request_id):
+        """Stream engine events as Server-Sent Events"""
+        try:
+            request_id = int(request_id) if request_id is not None else None
+        except ValueError:
+            self._send_error(400, "request_id must be an integer")
+            return
+
+        listener = self.server.add_listener()
+        if listener is None:
+            self._send_busy()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        try:
+            # A request that finished before the client subscribed is replayed once
+            if request_id is not None:
+                result = self.server.get_result(request_id)
+                if result and result['status'] != 'pending':
+                    self._write_event('answer' if result['status'] == 'done' else 'error', result)
+                    return
+
+            while self.server.serving:
+                try:
+                    event, data = listener.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+
+                if request_id is not None and data.get('request_id') != request_id:
+                    continue
+                self._write_event(event, data)
+                if request_id is not None and event in ('answer', 'error'):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.remove_listener(listener)
+
+    def _write_event(self, event, data):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+class ExamApiServer(ThreadingHTTPServer):
+    """Threaded localhost API in front of an ExamEngine, with backpressure"""
+
+    daemon_threads = True
+
+    def __init__(self, engine, host='127.0.0.1', port=8766, max_pending=32, max_listeners=8,
+                 token='', retry_after=1.0, max_wait=300):
+        if not token and not is_loopback(host):
+            raise ValueError("Refusing to serve the API beyond localhost without an API token")
+
+        super().__init__((host, port), ApiRequestHandler)
+        self.logger = logging.getLogger(__name__)
+        self.engine = engine
+        self.max_pending = max_pending
+        self.max_listeners = max_listeners
+        self.token = token
+        self.retry_after = retry_after
+        self.max_wait = max_wait
+
+        self.results = OrderedDict()  # request_id -> result dict
+        self.pending = 0
+        self.results_lock = threading.Condition()
+        self.listeners = []
+        self.listeners_lock = threading.Lock()
+        self.stats = {}
+        self.serving = False
+        self.thread = None
+
+        engine.subscribe('answer', self._on_answer)
+        engine.subscribe('error', self._on_error)
+        engine.subscribe('*', self._on_event)
+
+    @property
+    def url(self):
+        """Base URL of the running server"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        """Increment a request/outcome counter"""
+        with self.results_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    # -- requests ----------------------------------------------------------
+
+    def submit(self, kind, source, content, model_key=None, response_mode=None):
+        """Queue a question or image on the engine; returns the request id or None when saturated"""
+        with self.results_lock:
+            if self.pending >= self.max_pending:
+                return None
+            self.pending += 1
+
+            # Submitting under the lock keeps the result registered before a fast answer arrives
+            if kind == 'question':
+                request_id = self.engine.submit_question(source, content, response_mode)
+            else:
+                request_id = self.engine.submit_image(source, content, model_key, response_mode)
+
+            self.results[request_id] = {
+                'id': request_id,
+                'status': 'pending',
+                'kind': kind,
+                'source': source,
+                'question': content if kind == 'question' else None,
+                'answer': None,
+                'submitted_at': time.time(),
+                'finished_at': None
+            }
+            self.stats['submitted'] = self.stats.get('submitted', 0) + 1
+            return request_id
+
+    def _finish(self, request_id, status, **fields):
+        with self.results_lock:
+            result = self.results.get(request_id)
+            if result is None or result['status'] != 'pending':
+                return
+            result.update(status=status, finished_at=time.time(), **fields)
+            self.pending -= 1
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+            # Finished results age from now, so the one just finished is never evicted in this call
+            self.results.move_to_end(request_id)
+
+            # Drop the oldest finished results once the store is full
+            while len(self.results) > MAX_RESULTS:
+                oldest_id = next(iter(self.results))
+                if self.results[oldest_id]['status'] == 'pending':
+                    break
+                del self.results[oldest_id]
+
+            self.results_lock.notify_all()
+
+    def _on_answer(self, source, question, answer, request_id=None, duplicate_of=None):
+        if request_id is not None:
+            self._finish(request_id, 'done', answer=answer, duplicate_of=duplicate_of)
+
+    def _on_error(self, message, request_id=None):
+        if request_id is not None:
+            self._finish(request_id, 'error', answer=None, error=message)
+
+    def get_result(self, request_id):
+        """Copy of a request's result, or None if unknown"""
+        with self.results_lock:
+            result = self.results.get(request_id)
+            return dict(result) if result else None
+
+    def wait_for(self, request_id, timeout):
+        """Block until a request finishes or timeout elapses; returns its result"""
+        last_seen = {}
+
+        def finished():
+            # Later requests can evict a finished result before this waiter wakes up; keep the last copy
+            result = self.results.get(request_id)
+            if result is not None:
+                last_seen.update(result)
+            return result is None or result['status'] != 'pending'
+
+        with self.results_lock:
+            self.results_lock.wait_for(finished, timeout)
+            return dict(last_seen)
+
+    # -- event stream ------------------------------------------------------
+
+    def add_listener(self):
+        """Register an SSE client queue, or None if too many clients are connected"""
+        with self.listeners_lock:
+            if len(self.listeners) >= self.max_listeners:
+                return None
+            listener = queue.Queue(maxsize=256)
+            self.listeners.append(listener)
+            return listener
+
+    def remove_listener(self, listener):
+        with self.listeners_lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def _on_event(self, event, **data):
+        # Screenshots are large and only meaningful to the GUI
+        if event == 'screenshot':
+            return
+
+        with self.listeners_lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener.put_nowait((event, data))
+            except queue.Full:
+                # Slow client: drop its oldest event rather than block the engine
+                try:
+                    listener.get_nowait()
+                    listener.put_nowait((event, data))
+                except (queue.Empty, queue.Full):
+                    pass
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def get_status(self):
+        """Engine status plus API queue and counters"""
+        with self.results_lock:
+            api = {'pending': self.pending, 'max_pending': self.max_pending, **self.stats}
+        with self.listeners_lock:
+            api['listeners'] = len(self.listeners)
+        return {'engine': self.engine.get_status(), 'api': api}
+
+    def start(self):
+        """Serve in a background thread and return the base URL"""
+        self.serving = True
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.info(f"Local API listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        """Stop serving, detach from the engine and close the socket"""
+        self.serving = False
+        self.engine.unsubscribe('answer', self._on_answer)
+        self.engine.unsubscribe('error', self._on_error)
+        self.engine.unsubscribe('*', self._on_event)
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Exam Helper engine over a local HTTP API")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int, help="Answer worker threads (concurrent provider requests)")
+    parser.add_argument('--max-pending', type=int, help="Queued requests before answering 429")
+    parser.add_argument('--token', help="Bearer token clients must send")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler('exam_helper.log'), logging.StreamHandler(sys.stderr)])
+
+    config = load_config(args.config)
+    # The API decides what runs; never persist its choices over the GUI's config
+    config['audio_enabled'] = False
+    config['live_screen_enabled'] = False
+    if args.workers:
+        config['answer_workers'] = args.workers
+
+    engine = ExamEngine(config)
+    server = ExamApiServer(engine, args.host, args.port or config.get('api_server_port', 8766),
+                           max_pending=args.max_pending or config.get('api_max_pending', 32),
+                           token=args.token if args.token is not None else config.get('api_token', ''))
+    engine.start()
+    server.serving = True
+    server.logger.info(f"Local API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.serving = False
+        server.server_close()
+        engine.stop()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
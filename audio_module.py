@@ -9,14 +9,18 @@ import numpy as np
 from collections import deque
 import base64
 import io
+import json
+import os
 import requests
+from datetime import datetime
 from openai import OpenAI
+from profiler_module import profiler
 
 class AudioCapture:
-    def __init__(self):
+    def __init__(self, profile_path="audio_profile.json"):
         self.logger = logging.getLogger(__name__)
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        self._microphone = None  # Opened on first use; sr.Microphone() probes the device
         
         # Audio settings
         self.chunk = 1024
@@ -28,8 +32,14 @@ class AudioCapture:
         # Initialize PyAudio
         self.audio = pyaudio.PyAudio()
         
-        # Calibrate microphone
-        self.calibrate_microphone()
+        # Device discovery and noise-floor calibration run in the background.
+        # Calibration results are persisted per device and reused across launches.
+        self.profile_path = profile_path
+        self.devices = None
+        self.default_device_name = None
+        self.noise_floor = None
+        self.devices_ready = threading.Event()
+        self.calibrated = threading.Event()
         
         # Last processed audio to avoid duplicates
         self.last_audio_text = ""
@@ -53,15 +63,192 @@ class AudioCapture:
         self.min_speech_length = 0.5
         self.last_speech_time = 0
         
+        # Shared capture stream with a retrospective ring buffer.
+        # Monitoring and on-demand recording both read from this one stream,
+        # so "Record" can include audio from before the button was pressed.
+        self.capture_stream = None
+        self.capture_running = False
+        self.pre_roll_seconds = 2.0
+        self.ring_buffer_seconds = 40  # Covers the longest record duration plus pre-roll
+        self.chunk_seconds = self.chunk / self.rate
+        self.ring_buffer = deque(maxlen=int(self.ring_buffer_seconds / self.chunk_seconds))
+        self.ring_condition = threading.Condition()
+        self.capture_lock = threading.Lock()
+        self.capture_sequence = 0  # Chunks captured so far, used to skip redundant spectrum work
+        
+        # Frequency spectrum for visualization. Computed from the ring buffer
+        # when the display asks for it, never per chunk in the audio thread.
+        self.spectrum_bands = 25
+        self.spectrum_fft_size = 1024
+        self.spectrum_decimation = 4  # 44.1 kHz -> ~11 kHz covers the speech band
+        self.spectrum_min_freq = 60
+        self.spectrum_window = None
+        self.spectrum_edges = {}  # num_bands -> rFFT bin edges
+        self.spectrum_cache = None  # (capture_sequence, num_bands, values)
+        
+        # Transcription uploads: speech APIs resample to 16 kHz anyway,
+        # so uploading at that rate cuts the body to ~36% of 44.1 kHz PCM
+        self.upload_rate = 16000
+        self.upload_stats = {}  # backend -> deque of recent uploads
+        self.upload_stats_lock = threading.Lock()
+        
+        # Returns immediately; calibration never blocks construction
+        self.start_device_discovery()
+        
+    @property
+    def microphone(self):
+        """Speech-recognition microphone source, created on first use"""
+        if self._microphone is None:
+            self._microphone = sr.Microphone()
+        return self._microphone
+        
+    def start_device_discovery(self):
+        """Enumerate devices and apply or build the noise-floor profile in the background"""
+        discovery_thread = threading.Thread(target=self._discover_and_calibrate, daemon=True)
+        discovery_thread.start()
+        return discovery_thread
+        
+    def _discover_and_calibrate(self):
+        """Background worker for start_device_discovery"""
+        self.discover_devices()
+        if not self.apply_saved_profile():
+            self.calibrate_microphone()
+            
+    def discover_devices(self):
+        """Enumerate input devices and cache the result"""
+        devices = []
+        try:
+            for index in range(self.audio.get_device_count()):
+                info = self.audio.get_device_info_by_index(index)
+                if info.get('maxInputChannels', 0) > 0:
+                    devices.append({
+                        'index': index,
+                        'name': info.get('name', f"Device {index}"),
+                        'channels': info.get('maxInputChannels', 0),
+                        'default_rate': info.get('defaultSampleRate', self.rate)
+                    })
+                    
+            try:
+                self.default_device_name = self.audio.get_default_input_device_info().get('name')
+            except Exception:
+                self.default_device_name = devices[0]['name'] if devices else None
+                
+            self.logger.info(f"Found {len(devices)} input devices, default: {self.default_device_name}")
+            
+        except Exception as e:
+            self.logger.error(f"Audio device discovery error: {e}")
+            
+        self.devices = devices
+        self.devices_ready.set()
+        return devices
+        
+    def get_input_devices(self):
+        """Get the cached input device list (None until discovery finishes)"""
+        return self.devices
+        
+    def load_profiles(self):
+        """Load persisted per-device noise-floor profiles"""
+        try:
+            with open(self.profile_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.error(f"Audio profile load error: {e}")
+            return {}
+            
+    def save_profile(self):
+        """Persist the noise-floor profile for the current device"""
+        if not self.default_device_name or self.noise_floor is None:
+            return
+            
+        profiles = self.load_profiles()
+        profiles[self.default_device_name] = {
+            'noise_floor': self.noise_floor,
+            'energy_threshold': self.recognizer.energy_threshold,
+            'sample_rate': self.rate,
+            'updated': datetime.now().isoformat(timespec='seconds')
+        }
+        
+        try:
+            temp_path = self.profile_path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(profiles, f, indent=2)
+            os.replace(temp_path, self.profile_path)
+        except Exception as e:
+            self.logger.error(f"Audio profile save error: {e}")
+            
+    def apply_saved_profile(self):
+        """Apply the saved profile for the current device, if there is one"""
+        profile = self.load_profiles().get(self.default_device_name or '')
+        if not profile:
+            return False
+            
+        if profile.get('noise_floor') is None:
+            return False
+            
+        self.noise_floor = profile['noise_floor']
+        self.recognizer.energy_threshold = profile.get('energy_threshold', self.recognizer.energy_threshold)
+        self.calibrated.set()
+        self.logger.info(f"Loaded noise profile for {self.default_device_name}: floor {self.noise_floor:.0f}")
+        return True
+        
+    def measure_noise_floor(self, duration=1.5):
+        """Measure ambient RMS, from the shared stream if it is open, otherwise a short-lived one"""
+        # Hold the capture lock while the short-lived stream is open, so monitoring
+        # starting meanwhile waits instead of opening a second input stream
+        with self.capture_lock:
+            shared = self.capture_running
+            if not shared:
+                stream = self.audio.open(
+                    format=self.format,
+                    channels=self.channels,
+                    rate=self.rate,
+                    input=True,
+                    frames_per_buffer=self.chunk
+                )
+                try:
+                    frames = [stream.read(self.chunk, exception_on_overflow=False)
+                              for _ in range(int(self.rate / self.chunk * duration))]
+                finally:
+                    stream.stop_stream()
+                    stream.close()
+                audio_data = b''.join(frames)
+        if shared:
+            audio_data = self.record_frames(duration, pre_roll=0)
+            
+        if not audio_data:
+            return None
+            
+        samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float64)
+        usable = len(samples) - len(samples) % self.chunk
+        if usable <= 0:
+            return None
+            
+        # Median chunk RMS ignores short bursts like key clicks
+        chunk_rms = np.sqrt(np.mean(samples[:usable].reshape(-1, self.chunk) ** 2, axis=1))
+        return float(np.median(chunk_rms))
+        
     def calibrate_microphone(self):
-        """Calibrate microphone for ambient noise"""
+        """Calibrate microphone for ambient noise and persist the result"""
         try:
-            with self.microphone as source:
-                self.logger.info("Calibrating microphone for ambient noise...")
-                self.recognizer.adjust_for_ambient_noise(source, duration=2)
-                self.logger.info("Microphone calibrated")
+            self.logger.info("Calibrating microphone for ambient noise...")
+            noise_floor = self.measure_noise_floor()
+            if noise_floor is None:
+                self.logger.warning("Microphone calibration captured no audio")
+                return False
+                
+            # Same scaling speech_recognition applies after adjust_for_ambient_noise
+            self.noise_floor = noise_floor
+            self.recognizer.energy_threshold = max(noise_floor * self.recognizer.dynamic_energy_ratio, 50)
+            self.calibrated.set()
+            self.save_profile()
+            self.logger.info(f"Microphone calibrated (noise floor {noise_floor:.0f})")
+            return True
+            
         except Exception as e:
             self.logger.error(f"Microphone calibration error: {e}")
+            return False
             
     def listen_for_question(self):
         """Listen for audio questions from microphone"""
@@ -75,7 +262,8 @@ class AudioCapture:
                 audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=10)
                 
                 # Convert speech to text
-                text = self.recognizer.recognize_google(audio)
+                with profiler.span('recognize', backend='google'):
+                    text = self.recognizer.recognize_google(audio)
                 
                 # Avoid duplicate processing
                 if text != self.last_audio_text or time.time() - self.last_audio_time > 30:
@@ -115,31 +303,148 @@ class AudioCapture:
             
     def record_audio_chunk(self, duration=5):
         """Record audio chunk for processing"""
-        try:
-            stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
+        audio_data = self.record_frames(duration, pre_roll=0)
+        if audio_data is None:
+            return None
+        return sr.AudioData(audio_data, self.rate, 2)
             
-            frames = []
-            for _ in range(0, int(self.rate / self.chunk * duration)):
-                data = stream.read(self.chunk)
-                frames.append(data)
+    def start_capture_stream(self):
+        """Open the shared capture stream once and keep it running"""
+        with self.capture_lock:
+            if self.capture_running:
+                return True
+                
+            try:
+                self.capture_stream = self.audio.open(
+                    format=self.format,
+                    channels=self.channels,
+                    rate=self.rate,
+                    input=True,
+                    frames_per_buffer=self.chunk
+                )
+            except Exception as e:
+                self.logger.error(f"Audio stream open error: {e}")
+                self.capture_stream = None
+                return False
                 
-            stream.stop_stream()
-            stream.close()
+            self.capture_running = True
+            self.audio_thread = threading.Thread(target=self._dedicated_audio_thread, daemon=True)
+            self.audio_thread.start()
+            self.logger.info("Shared audio capture stream opened")
+            return True
             
-            # Convert to audio data
-            audio_data = b''.join(frames)
-            return sr.AudioData(audio_data, self.rate, 2)
+    def stop_capture_stream(self):
+        """Stop the shared capture stream (only needed on shutdown)"""
+        with self.capture_lock:
+            self.capture_running = False
             
-        except Exception as e:
-            self.logger.error(f"Audio recording error: {e}")
+        with self.ring_condition:
+            self.ring_condition.notify_all()
+            
+        if self.audio_thread and self.audio_thread.is_alive():
+            self.audio_thread.join(timeout=2.0)  # Wait up to 2 seconds
+            
+    def record_frames(self, duration=5, pre_roll=None):
+        """Return raw PCM covering the pre-roll window plus the next `duration` seconds
+        
+        Audio is taken from the shared ring buffer, so no device is re-opened and
+        the call returns as soon as the last chunk of the window has been captured.
+        """
+        if not self.start_capture_stream():
+            return None
+            
+        if pre_roll is None:
+            pre_roll = self.pre_roll_seconds
+            
+        start_time = time.time()
+        window_start = start_time - pre_roll
+        deadline = start_time + duration
+        give_up_at = deadline + 2.0  # Stream stalled or device unplugged
+        
+        with self.ring_condition:
+            while self.capture_running and (not self.ring_buffer or self.ring_buffer[-1][0] < deadline):
+                remaining = give_up_at - time.time()
+                if remaining <= 0:
+                    self.logger.warning("Audio stream stalled while recording")
+                    break
+                self.ring_condition.wait(timeout=remaining)
+                
+            frames = []
+            for capture_time, data in self.ring_buffer:
+                # A chunk's timestamp marks when its last sample arrived
+                if capture_time - self.chunk_seconds < window_start:
+                    continue
+                frames.append(data)
+                if capture_time >= deadline:
+                    break
+                    
+        if not frames:
+            self.logger.error("No audio captured for recording window")
             return None
             
+        return b''.join(frames)
+        
+    def _frames_to_wav_bytes(self, audio_data, rate=None):
+        """Wrap raw PCM in a WAV container in memory"""
+        wav_buffer = io.BytesIO()
+        with wave.open(wav_buffer, 'wb') as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(self.audio.get_sample_size(self.format))
+            wav_file.setframerate(rate or self.rate)
+            wav_file.writeframes(audio_data)
+        return wav_buffer.getvalue()
+        
+    def encode_for_upload(self, audio_data):
+        """Downsample raw PCM to the upload rate and return in-memory WAV bytes"""
+        with profiler.span('encode', kind='audio'):
+            return self._encode_for_upload(audio_data)
+            
+    def _encode_for_upload(self, audio_data):
+        """Resample and wrap PCM for upload"""
+        if self.upload_rate >= self.rate:
+            return self._frames_to_wav_bytes(audio_data)
+            
+        samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
+        if len(samples) == 0:
+            return self._frames_to_wav_bytes(b'')
+            
+        # Box-filter before resampling to keep speech band aliasing down
+        ratio = self.rate / self.upload_rate
+        width = max(1, int(round(ratio)))
+        if width > 1:
+            samples = np.convolve(samples, np.ones(width, dtype=np.float32) / width, mode='same')
+            
+        target_length = int(len(samples) / ratio)
+        positions = np.arange(target_length, dtype=np.float64) * ratio
+        resampled = np.interp(positions, np.arange(len(samples)), samples)
+        pcm = np.clip(resampled, -32768, 32767).astype(np.int16).tobytes()
+        
+        return self._frames_to_wav_bytes(pcm, rate=self.upload_rate)
+        
+    def _report_upload(self, backend, upload_bytes, started_at):
+        """Record upload size and transcription latency for a backend"""
+        latency = time.time() - started_at
+        with self.upload_stats_lock:
+            history = self.upload_stats.setdefault(backend, deque(maxlen=50))
+            history.append({'bytes': upload_bytes, 'latency': latency, 'time': time.time()})
+        self.logger.info(f"{backend} upload: {upload_bytes / 1024:.1f} KB, transcription latency {latency:.2f}s")
+        
+    def get_upload_stats(self):
+        """Get per-backend upload size and latency summaries"""
+        summary = {}
+        with self.upload_stats_lock:
+            for backend, history in self.upload_stats.items():
+                if not history:
+                    continue
+                summary[backend] = {
+                    'count': len(history),
+                    'avg_bytes': sum(item['bytes'] for item in history) / len(history),
+                    'avg_latency': sum(item['latency'] for item in history) / len(history),
+                    'last_bytes': history[-1]['bytes'],
+                    'last_latency': history[-1]['latency']
+                }
+        return summary
+            
     def is_speech_detected(self, audio_data, threshold=0.01):
         """Simple voice activity detection"""
         try:
@@ -159,75 +464,75 @@ class AudioCapture:
             return False
             
     def start_audio_monitoring(self):
-        """Start continuous audio monitoring in dedicated thread"""
+        """Start continuous audio monitoring on the shared capture stream"""
         if not self.is_monitoring:
+            if not self.start_capture_stream():
+                return
+            self.speech_buffer.clear()
             self.is_monitoring = True
-            self.audio_thread = threading.Thread(target=self._dedicated_audio_thread, daemon=True)
-            self.audio_thread.start()
-            self.logger.info("Audio monitoring thread started")
+            self.logger.info("Audio monitoring started")
             
     def stop_audio_monitoring(self):
-        """Stop audio monitoring"""
+        """Stop audio monitoring (the capture stream stays open for recording)"""
         self.is_monitoring = False
-        if self.audio_thread and self.audio_thread.is_alive():
-            self.audio_thread.join(timeout=2.0)  # Wait up to 2 seconds
+        self.speech_buffer.clear()
         self.logger.info("Audio monitoring stopped")
         
     def _dedicated_audio_thread(self):
-        """Dedicated thread for audio capture - handles both microphone and system audio"""
+        """Dedicated thread for audio capture - feeds the ring buffer and, while monitoring, the visualizer and VAD"""
         self.logger.info("Starting dedicated audio capture thread")
         
-        stream = None
+        stream = self.capture_stream
         try:
-            # Open audio stream
-            stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
-            
-            self.logger.info("Audio stream opened successfully")
-            
-            while self.is_monitoring:
+            while self.capture_running:
                 try:
-                    # Read audio data (non-blocking)
+                    # Blocking read paces the loop at the device rate
                     data = stream.read(self.chunk, exception_on_overflow=False)
                     if not data:
                         continue
                         
+                    captured_at = time.time()
+                    with self.ring_condition:
+                        self.ring_buffer.append((captured_at, data))
+                        self.capture_sequence += 1
+                        self.ring_condition.notify_all()
+                        
+                    if not self.is_monitoring:
+                        continue
+                        
                     # Convert to numpy array
                     audio_np = np.frombuffer(data, dtype=np.int16)
                     if len(audio_np) == 0:
                         continue
                     
-                    # Calculate RMS safely
-                    rms = self._calculate_rms(audio_np)
-                    
-                    # Update visualization data (thread-safe)
-                    with self.audio_data_lock:
-                        self.current_rms = rms
-                        self.rms_history.append(rms)
+                    with profiler.span('vad'):
+                        # Calculate RMS safely
+                        rms = self._calculate_rms(audio_np)
                         
-                        # Update max RMS for dynamic scaling
-                        if rms > self.max_rms_seen:
-                            self.max_rms_seen = rms * 1.2
-                    
-                    # Handle speech detection
-                    self._process_speech_detection(audio_np, rms)
-                    
-                    # Small sleep to prevent overwhelming the system
-                    time.sleep(0.01)  # 100Hz sampling rate
+                        # Update visualization data (thread-safe)
+                        with self.audio_data_lock:
+                            self.current_rms = rms
+                            self.rms_history.append(rms)
+                            
+                            # Update max RMS for dynamic scaling
+                            if rms > self.max_rms_seen:
+                                self.max_rms_seen = rms * 1.2
+                        
+                        # Handle speech detection
+                        self._process_speech_detection(audio_np, rms, captured_at)
                     
                 except Exception as e:
-                    if self.is_monitoring:
+                    if self.capture_running:
                         self.logger.error(f"Audio processing error: {e}")
-                        time.sleep(0.1)  # Longer sleep on error
+                        time.sleep(0.1)  # Back off on error
                         
         except Exception as e:
-            self.logger.error(f"Audio thread setup error: {e}")
+            self.logger.error(f"Audio thread error: {e}")
         finally:
+            self.capture_running = False
+            with self.ring_condition:
+                self.ring_condition.notify_all()
+                
             # Clean up stream
             if stream:
                 try:
@@ -236,6 +541,7 @@ class AudioCapture:
                     self.logger.info("Audio stream closed")
                 except Exception as e:
                     self.logger.error(f"Error closing audio stream: {e}")
+            self.capture_stream = None
                     
     def _calculate_rms(self, audio_data):
         """Calculate RMS safely"""
@@ -252,10 +558,11 @@ class AudioCapture:
         except (ValueError, RuntimeWarning):
             return 0
             
-    def _process_speech_detection(self, audio_data, rms):
-        """Process speech detection in audio thread"""
+    def _process_speech_detection(self, audio_data, rms, current_time=None):
+        """Process speech detection in audio thread (current_time is the chunk's capture time)"""
         try:
-            current_time = time.time()
+            if current_time is None:
+                current_time = time.time()
             
             if rms > self.threshold_level:
                 # Speech detected
@@ -292,15 +599,78 @@ class AudioCapture:
             
     def get_current_audio_level(self):
         """Get the current audio level (0-1)"""
-        return self.audio_levels[-1] if self.audio_levels else 0.0
+        with self.audio_data_lock:
+            if self.max_rms_seen <= 0:
+                return 0.0
+            return min(1.0, self.current_rms / self.max_rms_seen)
         
     def get_audio_levels_history(self):
-        """Get the history of audio levels for visualization"""
-        return list(self.audio_levels)
+        """Get the history of audio levels (0-1) for visualization"""
+        with self.audio_data_lock:
+            if self.max_rms_seen <= 0:
+                return [0.0] * len(self.rms_history)
+            scale = self.max_rms_seen
+            return [min(1.0, rms / scale) for rms in self.rms_history]
         
-    def get_frequency_spectrum(self):
-        """Get the current frequency spectrum for visualization"""
-        return list(self.frequency_data[-1]) if self.frequency_data else [0] * 25
+    def _get_spectrum_edges(self, num_bands):
+        """Log-spaced rFFT bin edges for the requested band count (cached)"""
+        edges = self.spectrum_edges.get(num_bands)
+        if edges is not None:
+            return edges
+            
+        sample_rate = self.rate / self.spectrum_decimation
+        bin_count = self.spectrum_fft_size // 2 + 1
+        low_bin = max(1, int(self.spectrum_min_freq * self.spectrum_fft_size / sample_rate))
+        raw_edges = np.geomspace(low_bin, bin_count, num_bands + 1).astype(np.int64)
+        
+        # Low bands are narrower than one bin; force every band to hold at least one
+        offsets = np.arange(num_bands + 1)
+        edges = np.maximum.accumulate(raw_edges - offsets) + offsets
+        edges = np.minimum(edges, bin_count)
+        self.spectrum_edges[num_bands] = edges
+        return edges
+        
+    def get_frequency_spectrum(self, num_bands=None):
+        """Get the current frequency spectrum (0-1 per band) for visualization"""
+        num_bands = num_bands or self.spectrum_bands
+        chunks_needed = -(-self.spectrum_fft_size * self.spectrum_decimation // self.chunk)
+        
+        with self.ring_condition:
+            sequence = self.capture_sequence
+            cached = self.spectrum_cache
+            if cached and cached[0] == sequence and cached[1] == num_bands:
+                return list(cached[2])
+            if len(self.ring_buffer) < chunks_needed:
+                return [0] * num_bands
+            recent = [self.ring_buffer[-i][1] for i in range(chunks_needed, 0, -1)]
+            
+        try:
+            samples = np.frombuffer(b''.join(recent), dtype=np.int16)
+            samples = samples[-self.spectrum_fft_size * self.spectrum_decimation:].astype(np.float32)
+            
+            # Decimate with a box filter: average each group of samples
+            frame = samples.reshape(self.spectrum_fft_size, self.spectrum_decimation).mean(axis=1)
+            
+            if self.spectrum_window is None:
+                self.spectrum_window = np.hanning(self.spectrum_fft_size).astype(np.float32)
+                
+            # Scale so a full-scale sine lands near 90 dB
+            magnitudes = np.abs(np.fft.rfft(frame * self.spectrum_window)) / (self.spectrum_fft_size / 4)
+            
+            edges = self._get_spectrum_edges(num_bands)
+            band_sums = np.add.reduceat(magnitudes, edges[:-1])
+            band_means = band_sums / np.maximum(np.diff(edges), 1)
+            
+            # Map 20..90 dB onto 0..1
+            decibels = 20 * np.log10(band_means + 1e-9)
+            values = np.clip((decibels - 20) / 70, 0, 1).tolist()
+            
+        except Exception as e:
+            self.logger.error(f"Spectrum computation error: {e}")
+            return [0] * num_bands
+            
+        self.spectrum_cache = (sequence, num_bands, values)
+        return list(values)
         
     def get_rms_history(self):
         """Get the RMS history for waveform visualization (thread-safe)"""
@@ -335,7 +705,8 @@ class AudioCapture:
     def process_speech_audio(self, audio_data):
         """Process speech audio data and return recognized text"""
         try:
-            text = self.recognizer.recognize_google(audio_data)
+            with profiler.span('recognize', backend='google'):
+                text = self.recognizer.recognize_google(audio_data)
             
             # Avoid duplicate processing
             if text != self.last_audio_text or time.time() - self.last_audio_time > 30:
@@ -365,34 +736,12 @@ class AudioCapture:
             # Record audio
             self.logger.info(f"Recording audio for {duration} seconds...")
             
-            # Use PyAudio to record
-            stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
-            
-            frames = []
-            for _ in range(0, int(self.rate / self.chunk * duration)):
-                data = stream.read(self.chunk, exception_on_overflow=False)
-                frames.append(data)
-            
-            stream.stop_stream()
-            stream.close()
+            audio_data = self.record_frames(duration)
+            if audio_data is None:
+                return None
             
             # Convert to WAV format in memory
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(self.channels)
-                wav_file.setsampwidth(self.audio.get_sample_size(self.format))
-                wav_file.setframerate(self.rate)
-                wav_file.writeframes(b''.join(frames))
-            
-            # Get WAV data
-            wav_data = wav_buffer.getvalue()
-            wav_buffer.close()
+            wav_data = self.encode_for_upload(audio_data)
             
             # Encode to base64
             encoded_audio = base64.b64encode(wav_data).decode('utf-8')
@@ -447,32 +796,34 @@ class AudioCapture:
         if not encoded_audio:
             return None
             
-        # Transcribe with OpenAI
-        transcription = self.transcribe_with_openai_audio(encoded_audio, api_key, model, prompt)
+        # Transcribe with OpenAI (chat audio input only accepts base64 inside JSON)
+        started_at = time.time()
+        with profiler.span('recognize', backend=model):
+            transcription = self.transcribe_with_openai_audio(encoded_audio, api_key, model, prompt)
+        if transcription:
+            self._report_upload(model, len(encoded_audio), started_at)
         return transcription
     
     def record_and_transcribe_with_whisper(self, duration=5, api_key=None, model="whisper-1"):
         """Complete workflow: record audio and transcribe with OpenAI Whisper API"""
         try:
-            # Record audio to file for Whisper API
-            audio_file = self.record_audio_to_file(duration)
-            if not audio_file:
+            audio_data = self.record_frames(duration)
+            if audio_data is None:
                 return None
             
-            # Transcribe with Whisper API
-            client = OpenAI(api_key=api_key)
+            # Send the in-memory WAV as the multipart file part - no temp file, no base64
+            wav_data = self.encode_for_upload(audio_data)
+            started_at = time.time()
             
-            with open(audio_file, "rb") as audio:
+            client = OpenAI(api_key=api_key)
+            with profiler.span('recognize', backend=model):
                 transcription = client.audio.transcriptions.create(
                     model=model,
-                    file=audio,
+                    file=("audio.wav", wav_data, "audio/wav"),
                     response_format="text"
                 )
             
-            # Clean up temporary file
-            import os
-            os.remove(audio_file)
-            
+            self._report_upload(model, len(wav_data), started_at)
             self.logger.info(f"Whisper transcription successful: {transcription[:50]}...")
             return transcription
             
@@ -485,28 +836,13 @@ class AudioCapture:
         try:
             self.logger.info(f"Recording audio to file for {duration} seconds...")
             
-            # Record audio
-            stream = self.audio.open(format=self.format,
-                                   channels=self.channels,
-                                   rate=self.rate,
-                                   input=True,
-                                   frames_per_buffer=self.chunk)
-            
-            frames = []
-            for _ in range(0, int(self.rate / self.chunk * duration)):
-                data = stream.read(self.chunk)
-                frames.append(data)
-            
-            stream.stop_stream()
-            stream.close()
+            audio_data = self.record_frames(duration)
+            if audio_data is None:
+                return None
             
             # Save to file
-            wf = wave.open(filename, 'wb')
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(self.audio.get_sample_size(self.format))
-            wf.setframerate(self.rate)
-            wf.writeframes(b''.join(frames))
-            wf.close()
+            with open(filename, 'wb') as wf:
+                wf.write(self._frames_to_wav_bytes(audio_data))
             
             self.logger.info("Audio recorded and saved to file successfully")
             return filename
@@ -518,23 +854,22 @@ class AudioCapture:
     def record_and_transcribe_with_gemini(self, duration=5, gemini_client=None, model="gemini-1.5-flash", prompt="Please transcribe this audio accurately. If it sounds like a question, provide the exact question being asked."):
         """Complete workflow: record audio and transcribe with Gemini"""
         try:
-            # Record audio to file for Gemini
-            audio_file = self.record_audio_to_file(duration, "temp_gemini_audio.wav")
-            if not audio_file:
+            if not gemini_client:
+                return "Error: No Gemini client provided"
+                
+            audio_data = self.record_frames(duration)
+            if audio_data is None:
                 return None
             
-            # Transcribe with Gemini
-            if gemini_client:
-                transcription = gemini_client.transcribe_audio(audio_file, model, prompt)
-                
-                # Clean up temporary file
-                import os
-                if os.path.exists(audio_file):
-                    os.remove(audio_file)
-                
-                return transcription
-            else:
-                return "Error: No Gemini client provided"
+            # Pass the WAV inline with the request instead of uploading a temp file
+            wav_data = self.encode_for_upload(audio_data)
+            started_at = time.time()
+            
+            with profiler.span('recognize', backend=model):
+                transcription = gemini_client.transcribe_audio_data(wav_data, "audio/wav", model, prompt)
+            if transcription and not transcription.startswith("Error"):
+                self._report_upload(model, len(wav_data), started_at)
+            return transcription
                 
         except Exception as e:
             self.logger.error(f"Gemini audio recording error: {e}")
@@ -545,23 +880,10 @@ class AudioCapture:
         try:
             self.logger.info(f"Recording audio for {duration} seconds...")
             
-            # Record audio
-            stream = self.audio.open(format=self.format,
-                                   channels=self.channels,
-                                   rate=self.rate,
-                                   input=True,
-                                   frames_per_buffer=self.chunk)
-            
-            frames = []
-            for _ in range(0, int(self.rate / self.chunk * duration)):
-                data = stream.read(self.chunk)
-                frames.append(data)
-            
-            stream.stop_stream()
-            stream.close()
-            
-            # Convert to bytes
-            audio_data = b''.join(frames)
+            audio_data = self.record_frames(duration)
+            if audio_data is None:
+                return None
+                
             self.logger.info("Audio recorded successfully")
             return audio_data
             
@@ -573,6 +895,7 @@ class AudioCapture:
         """Clean up audio resources"""
         try:
             self.stop_audio_monitoring()
+            self.stop_capture_stream()
             self.audio.terminate()
         except Exception as e:
             self.logger.error(f"Audio cleanup error: {e}")
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Batch mode: answer a folder of screenshots or a text file of questions.
+
+Requests run in parallel through the headless engine, so they share its
+response cache and AI clients. Each result is appended to a JSONL file as it
+finishes; re-running with the same output file skips inputs that already
+succeeded, so an interrupted batch resumes where it stopped.
+
+    python batch_module.py screenshots/ --image-model "Gemini Flash" --workers 4
+    python batch_module.py questions.txt --model "OpenAI gpt-4o-mini" -o answers.jsonl
+
+With --provider-batch, OpenAI inputs are instead packed into Batch API jobs
+(uploaded JSONL files, polled until complete) for half the per-token price
+when per-request latency does not matter.
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from PIL import Image
+
+from cache_module import is_error_answer, is_rate_limit_answer
+from engine_module import ExamEngine, IMAGE_MODELS, load_config
+from sizing_module import estimate_tokens, estimate_image_tokens, estimate_request_tokens
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp'}
+
+# Image model key -> provider model name
+IMAGE_MODEL_NAMES = {
+    'openai_gpt4o': 'gpt-4o',
+    'openai_gpt4o_mini': 'gpt-4o-mini',
+    'openai_gpt4_turbo': 'gpt-4-turbo',
+    'gemini_pro_vision': 'gemini-1.5-flash',
+    'gemini_flash': 'gemini-1.5-flash'
+}
+
+# Approximate list prices in USD per 1M tokens (input, output); edit to match your account
+MODEL_PRICING = {
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4': (30.00, 60.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gemini-1.5-flash': (0.075, 0.30),
+    'gemini-1.5-pro': (1.25, 5.00)
+}
+
+# OpenAI Batch API limits and pricing
+BATCH_DISCOUNT = 0.5
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024  # Below the 200 MB upload limit
+BATCH_TERMINAL_STATES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def load_items(input_path):
+    """Batch items from a folder of images or a text file with one question per line"""
+    items = []
+    if os.path.isdir(input_path):
+        for name in sorted(os.listdir(input_path)):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                items.append({'id': name, 'kind': 'image', 'input': os.path.join(input_path, name)})
+    else:
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                question = line.strip()
+                if question and not question.startswith('#'):
+                    # Line number plus content hash, so an edited line is answered again
+                    digest = hashlib.sha1(question.encode('utf-8')).hexdigest()[:8]
+                    items.append({'id': f"{line_number}:{digest}", 'kind': 'question', 'input': question})
+    return items
+
+
+def encode_image_file(path, format='PNG', max_size=1024, quality=85):
+    """Load an image file, resize it like live captures and return (base64, width, height)"""
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        scale = min(1, max_size / image.width, max_size / image.height)
+        if scale < 1:
+            image = image.resize((int(image.width * scale), int(image.height * scale)), Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        if format == 'JPEG':
+            image.save(buffer, format='JPEG', quality=quality, optimize=True)
+        else:
+            image.save(buffer, format='PNG', optimize=True)
+        return base64.b64encode(buffer.getvalue()).decode('utf-8'), image.width, image.height
+
+
+def estimate_cost(model_name, input_tokens, output_tokens):
+    """Estimated USD cost, or None for models without a price"""
+    pricing = MODEL_PRICING.get(model_name)
+    if not pricing:
+        return None
+    return (input_tokens * pricing[0] + output_tokens * pricing[1]) / 1_000_000
+
+
+class BatchRunner:
+    """Runs batch items through an ExamEngine with bounded parallelism and rate-limit backoff"""
+
+    def __init__(self, engine, output_path, workers=4, image_model=None, response_mode=None,
+                 max_retries=4, backoff=2.0):
+        self.logger = logging.getLogger(__name__)
+        self.engine = engine
+        self.output_path = output_path
+        self.workers = workers
+        self.image_model = image_model or engine.get_selected_image_model()[0]
+        self.response_mode = response_mode or engine.config.get('response_mode', 'short')
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.write_lock = threading.Lock()
+        # After a rate-limit response every worker waits until this time
+        self.cooldown_until = 0
+        self.cooldown_lock = threading.Lock()
+
+    def load_completed(self):
+        """Ids that already succeeded in the output file"""
+        completed = set()
+        if not os.path.exists(self.output_path):
+            return completed
+
+        with open(self.output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Partial line from an interrupted run
+                if record.get('status') == 'ok':
+                    completed.add(record['id'])
+        return completed
+
+    def text_model_name(self):
+        """Provider model name used for text questions"""
+        model_key = self.engine.get_response_models().get(self.engine.get_selected_response_model(), '')
+        if model_key.startswith('openai'):
+            return self.engine.config.get('openai_model', 'gpt-3.5-turbo')
+        return 'gemini-1.5-flash'
+
+    def run(self, items):
+        """Process every item not already completed; returns the summary"""
+        completed = self.load_completed()
+        pending = [item for item in items if item['id'] not in completed]
+        self.logger.info(f"{len(items)} items, {len(items) - len(pending)} already done, {len(pending)} to run")
+
+        records = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.process_item, item) for item in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                records.append(record)
+                self.write_record(record)
+                self.logger.info(f"[{done}/{len(pending)}] {record['id']}: {record['status']} ({record['latency']:.2f}s)")
+
+        return self.summarize(records, time.perf_counter() - started, skipped=len(items) - len(pending))
+
+    def process_item(self, item):
+        """Answer one item, retrying rate-limited and failed requests with backoff"""
+        record = {'id': item['id'], 'kind': item['kind'], 'input': item['input']}
+        started = time.perf_counter()
+        try:
+            if item['kind'] == 'image':
+                model_key = IMAGE_MODELS[self.image_model]
+                model_name = IMAGE_MODEL_NAMES.get(model_key, model_key)
+                base64_image, width, height = encode_image_file(
+                    item['input'], 'JPEG' if model_key.startswith('openai') else 'PNG')
+                input_tokens = estimate_image_tokens(width, height, model_name) + 300  # Image prompt
+                request = lambda: self.engine.analyze_image(base64_image, model_key, self.response_mode)
+            else:
+                model_name = self.text_model_name()
+                input_tokens = estimate_tokens(item['input']) + 40  # System prompt
+                request = lambda: self.engine.answer_question(item['input'], self.response_mode)
+
+            answer, attempts, rate_limited = self.request_with_backoff(request)
+        except Exception as e:
+            self.logger.error(f"Batch item {item['id']} failed: {e}")
+            model_name, input_tokens, answer, attempts, rate_limited = None, 0, f"Error: {e}", 1, 0
+
+        ok = not is_error_answer(answer)
+        output_tokens = estimate_tokens(answer) if ok else 0
+        record.update({
+            'status': 'ok' if ok else 'error',
+            'model': model_name,
+            'answer': answer,
+            'attempts': attempts,
+            'rate_limited': rate_limited,
+            'latency': time.perf_counter() - started,
+            'input_tokens': input_tokens if ok else 0,
+            'output_tokens': output_tokens,
+            'cost': estimate_cost(model_name, input_tokens, output_tokens) if ok else 0.0
+        })
+        return record
+
+    def request_with_backoff(self, request):
+        """Call request() until it succeeds or retries run out; returns (answer, attempts, rate_limited)"""
+        rate_limited = 0
+        for attempt in range(1, self.max_retries + 2):
+            self.wait_for_cooldown()
+            answer = request()
+            if not is_error_answer(answer) or attempt > self.max_retries:
+                return answer, attempt, rate_limited
+
+            delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            if is_rate_limit_answer(answer):
+                # Rate limits apply to the whole account, so pause every worker
+                rate_limited += 1
+                with self.cooldown_lock:
+                    self.cooldown_until = max(self.cooldown_until, time.monotonic() + delay)
+                self.logger.warning(f"Rate limited; backing off {delay:.1f}s")
+            else:
+                time.sleep(delay)
+        return answer, attempt, rate_limited
+
+    def wait_for_cooldown(self):
+        with self.cooldown_lock:
+            remaining = self.cooldown_until - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def write_record(self, record):
+        """Append a result line and flush it so progress survives interruption"""
+        with self.write_lock:
+            with open(self.output_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def summarize(self, records, elapsed, skipped=0):
+        """Throughput, latency and cost summary"""
+        latencies = sorted(record['latency'] for record in records)
+        succeeded = [record for record in records if record['status'] == 'ok']
+        costs = [record['cost'] for record in succeeded if record['cost'] is not None]
+
+        cost_by_model = {}
+        for record in succeeded:
+            if record['cost'] is not None:
+                cost_by_model[record['model']] = cost_by_model.get(record['model'], 0.0) + record['cost']
+
+        return {
+            'processed': len(records),
+            'succeeded': len(succeeded),
+            'failed': len(records) - len(succeeded),
+            'skipped': skipped,
+            'elapsed': elapsed,
+            'throughput': len(records) / elapsed if elapsed else 0.0,
+            'latency_p50': latencies[len(latencies) // 2] if latencies else 0.0,
+            'latency_p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+            'retries': sum(record['attempts'] - 1 for record in records),
+            'rate_limited': sum(record['rate_limited'] for record in records),
+            'input_tokens': sum(record['input_tokens'] for record in succeeded),
+            'output_tokens': sum(record['output_tokens'] for record in succeeded),
+            'estimated_cost': sum(costs),
+            'cost_by_model': cost_by_model,
+            'cache': self.engine.cache.get_stats()
+        }
+
+
+class ProviderBatchRunner(BatchRunner):
+    """
+    Submits items as OpenAI Batch API jobs and stitches the results back to their inputs.
+    Submitted batch ids are saved next to the output file, so an interrupted run
+    re-attaches to its jobs instead of paying for them twice.
+    """
+
+    def __init__(self, engine, output_path, image_model=None, response_mode=None, poll_interval=30,
+                 completion_window='24h'):
+        super().__init__(engine, output_path, workers=1, image_model=image_model, response_mode=response_mode)
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.state_path = f"{output_path}.batches.json"
+        self.base_url = (engine.config.get('openai_base_url') or "https://api.openai.com/v1").rstrip('/')
+        self.headers = {"Authorization": f"Bearer {engine.config.get('openai_api_key', '')}"}
+
+    # -- provider API --------------------------------------------------------
+
+    def api(self, method, path, **kwargs):
+        """Call the OpenAI API; raises RuntimeError with the provider's message on failure"""
+        response = requests.request(method, f"{self.base_url}{path}", headers=self.headers, timeout=120, **kwargs)
+        if response.status_code != 200:
+            try:
+                detail = response.json().get('error', {}).get('message', response.text)
+            except ValueError:
+                detail = response.text
+            raise RuntimeError(f"OpenAI API error: {response.status_code} - {detail}")
+        return response
+
+    def submit_batch(self, lines):
+        """Upload request lines and create a batch job; returns the batch id"""
+        data = ''.join(json.dumps(line) + '\n' for line in lines).encode('utf-8')
+        upload = self.api('POST', '/files', data={'purpose': 'batch'},
+                          files={'file': ('exam_helper_batch.jsonl', data, 'application/jsonl')}).json()
+        batch = self.api('POST', '/batches', json={
+            'input_file_id': upload['id'],
+            'endpoint': '/v1/chat/completions',
+            'completion_window': self.completion_window
+        }).json()
+        self.logger.info(f"Submitted batch {batch['id']} with {len(lines)} requests")
+        return batch['id']
+
+    def download_results(self, file_id):
+        """Parse a batch output or error file into custom_id -> (answer, error)"""
+        results = {}
+        if not file_id:
+            return results
+
+        for line in self.api('GET', f"/files/{file_id}/content").text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get('response') or {}
+            body = response.get('body') or {}
+            if response.get('status_code') == 200:
+                results[result['custom_id']] = (body['choices'][0]['message']['content'], None)
+            else:
+                error = result.get('error') or body.get('error') or {}
+                message = error.get('message', f"status {response.get('status_code')}")
+                results[result['custom_id']] = (None, f"Error: {message}")
+        return results
+
+    # -- state ---------------------------------------------------------------
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'batches': []}
+
+    def save_state(self, state):
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+
+    # -- run -----------------------------------------------------------------
+
+    def build_request(self, item):
+        """Batch request body, cache key, model name and estimated input tokens for an item"""
+        if item['kind'] == 'image':
+            model_key = IMAGE_MODELS[self.image_model]
+            if not model_key.startswith('openai'):
+                raise ValueError(f"{self.image_model} is not available through the OpenAI Batch API")
+            base64_image, width, height = encode_image_file(item['input'], 'JPEG')
+            body = self.engine.build_openai_vision_request(base64_image, model_key, self.response_mode)
+            cache_key = self.engine.image_cache_key(base64_image, model_key, self.response_mode)
+        else:
+            model_key = self.engine.get_response_models().get(self.engine.get_selected_response_model(), '')
+            if not model_key.startswith('openai'):
+                raise ValueError("Provider batches need an OpenAI response model")
+            body = self.engine.llm_client.build_answer_request(item['input'], self.response_mode)
+            cache_key = self.engine.question_cache_key(item['input'], self.response_mode)
+        return body, cache_key, body['model'], estimate_request_tokens(body)
+
+    def make_record(self, item, model_name, answer, input_tokens, started, **extra):
+        ok = not is_error_answer(answer)
+        output_tokens = estimate_tokens(answer) if ok else 0
+        cost = estimate_cost(model_name, input_tokens, output_tokens) if ok else 0.0
+        record = {
+            'id': item['id'], 'kind': item['kind'], 'input': item['input'],
+            'status': 'ok' if ok else 'error',
+            'model': model_name,
+            'answer': answer,
+            'attempts': 1,
+            'rate_limited': 0,
+            'latency': time.perf_counter() - started,
+            'input_tokens': input_tokens if ok else 0,
+            'output_tokens': output_tokens,
+            'cost': cost
+        }
+        record.update(extra)
+        return record
+
+    def run(self, items):
+        """Answer cached items directly, submit the rest as batch jobs and wait for them"""
+        started = time.perf_counter()
+        completed = self.load_completed()
+        pending = {item['id']: item for item in items if item['id'] not in completed}
+        state = self.load_state()
+        submitted = {custom_id for batch in state['batches'] for custom_id in batch['custom_ids']}
+
+        records = []
+        lines, line_bytes = [], 0
+        requests_meta = {}  # custom_id -> (cache_key, model_name, input_tokens)
+
+        def flush():
+            nonlocal lines, line_bytes
+            if lines:
+                batch_id = self.submit_batch(lines)
+                state['batches'].append({'id': batch_id, 'custom_ids': [line['custom_id'] for line in lines]})
+                self.save_state(state)
+            lines, line_bytes = [], 0
+
+        for item_id, item in pending.items():
+            try:
+                body, cache_key, model_name, input_tokens = self.build_request(item)
+            except Exception as e:
+                records.append(self.make_record(item, None, f"Error: {e}", 0, started))
+                continue
+
+            requests_meta[item_id] = (cache_key, model_name, input_tokens)
+            if item_id in submitted:
+                continue
+
+            cached = self.engine.cache.get(cache_key)
+            if cached is not None:
+                records.append(self.make_record(item, model_name, cached, input_tokens, started, cached=True, cost=0.0))
+                continue
+
+            line = {'custom_id': item_id, 'method': 'POST', 'url': '/v1/chat/completions', 'body': body}
+            size = len(json.dumps(line))
+            if len(lines) >= MAX_BATCH_REQUESTS or line_bytes + size > MAX_BATCH_BYTES:
+                flush()
+            lines.append(line)
+            line_bytes += size
+        flush()
+
+        for record in records:
+            self.write_record(record)
+
+        for batch in state['batches']:
+            batch_records = self.collect_batch(batch, pending, requests_meta, started)
+            for record in batch_records:
+                self.write_record(record)
+            records.extend(batch_records)
+
+        # Every submitted job has been collected
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return self.summarize(records, time.perf_counter() - started, skipped=len(items) - len(pending))
+
+    def collect_batch(self, batch, pending, requests_meta, started):
+        """Wait for a batch job and turn its output into records"""
+        while True:
+            info = self.api('GET', f"/batches/{batch['id']}").json()
+            counts = info.get('request_counts') or {}
+            self.logger.info(f"Batch {batch['id']}: {info['status']} "
+                             f"({counts.get('completed', 0)}/{counts.get('total', 0)} done, {counts.get('failed', 0)} failed)")
+            if info['status'] in BATCH_TERMINAL_STATES:
+                break
+            time.sleep(self.poll_interval)
+
+        # Expired and cancelled jobs can still have partial output
+        results = self.download_results(info.get('output_file_id'))
+        results.update(self.download_results(info.get('error_file_id')))
+
+        records = []
+        for custom_id in batch['custom_ids']:
+            item = pending.get(custom_id)
+            if item is None or custom_id not in requests_meta:
+                continue  # Already recorded, or the input was removed since submission
+
+            cache_key, model_name, input_tokens = requests_meta[custom_id]
+            answer, error = results.get(custom_id, (None, f"Error: batch {info['status']} without a result"))
+            if answer is not None:
+                self.engine.cache.put(cache_key, answer)
+
+            record = self.make_record(item, model_name, answer if answer is not None else error,
+                                      input_tokens, started, batch_id=batch['id'])
+            if record['cost']:
+                record['cost'] *= BATCH_DISCOUNT
+            records.append(record)
+        return records
+
+
+def format_summary(summary):
+    """Human-readable batch report"""
+    lines = [
+        f"Processed {summary['processed']} items ({summary['succeeded']} ok, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped) in {summary['elapsed']:.1f}s",
+        f"Throughput: {summary['throughput']:.2f} items/s, latency p50 {summary['latency_p50']:.2f}s, "
+        f"p95 {summary['latency_p95']:.2f}s",
+        f"Retries: {summary['retries']} ({summary['rate_limited']} rate limited), "
+        f"cache hits: {summary['cache']['hits']}",
+        f"Tokens (estimated): {summary['input_tokens']} in / {summary['output_tokens']} out, "
+        f"cost ~${summary['estimated_cost']:.4f}"
+    ]
+    for model, cost in sorted(summary['cost_by_model'].items()):
+        lines.append(f"  {model}: ~${cost:.4f}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a folder of screenshots or a file of questions")
+    parser.add_argument('input', help="Folder of images or text file with one question per line")
+    parser.add_argument('-o', '--output', help="Results JSONL (default: <input>.answers.jsonl); reused to resume")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--workers', type=int, default=4, help="Parallel requests")
+    parser.add_argument('--model', help="Response model for questions, e.g. 'OpenAI gpt-4o-mini'")
+    parser.add_argument('--image-model', choices=list(IMAGE_MODELS), help="Image model for screenshots")
+    parser.add_argument('--response-mode', choices=['short', 'detailed'])
+    parser.add_argument('--max-retries', type=int, default=4)
+    parser.add_argument('--provider-batch', action='store_true',
+                        help="Submit OpenAI Batch API jobs instead of interactive requests")
+    parser.add_argument('--poll-interval', type=float, default=30, help="Seconds between batch status checks")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler('exam_helper.log'), logging.StreamHandler(sys.stderr)])
+
+    config = load_config(args.config)
+    config['audio_enabled'] = False
+    config['live_screen_enabled'] = False
+    if args.model:
+        config['selected_response_model'] = args.model
+        if args.model.startswith('OpenAI '):
+            config['openai_model'] = args.model[len('OpenAI '):]
+
+    engine = ExamEngine(config)
+    if args.model and args.model not in engine.get_response_models():
+        parser.error(f"unknown model; expected one of: {', '.join(engine.get_response_models())}")
+
+    items = load_items(args.input)
+    if not items:
+        parser.error(f"no questions or images found in {args.input}")
+
+    output = args.output or f"{args.input.rstrip('/').rstrip(os.sep)}.answers.jsonl"
+    if args.provider_batch:
+        runner = ProviderBatchRunner(engine, output, image_model=args.image_model,
+                                     response_mode=args.response_mode, poll_interval=args.poll_interval)
+    else:
+        runner = BatchRunner(engine, output, workers=args.workers, image_model=args.image_model,
+                             response_mode=args.response_mode, max_retries=args.max_retries)
+    try:
+        summary = runner.run(items)
+    except KeyboardInterrupt:
+        print(f"Interrupted; re-run with the same output file to resume ({output})", file=sys.stderr)
+        return 130
+    except RuntimeError as e:
+        print(f"Batch failed: {e}", file=sys.stderr)
+        return 1
+
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    print(f"Results: {output}", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
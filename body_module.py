@@ -0,0 +1,79 @@
+"""
+Streamed JSON request bodies.
+
+requests' json= argument serializes a payload to one str and then encodes it
+to bytes, so a multi-MB base64 image exists three times while a request is
+sent. StreamedJSONBody serializes everything except large base64 data: URLs
+(a small JSON skeleton) and sends those strings in slices straight from the
+payload, so the image is never copied as a whole. Content-Length is known up
+front, so the request is not chunk-encoded.
+"""
+
+import json
+import re
+import string
+import uuid
+
+# Strings at least this long are streamed from the payload instead of serialized
+MIN_STREAMED_LENGTH = 4096
+CHUNK_SIZE = 256 * 1024
+
+# A base64 data: URL needs no JSON escaping; only the short header needs a regex
+_DATA_URL_HEADER = re.compile(r'data:[\w.+-]+/[\w.+-]+(;[\w.+-]+=[\w.+-]+)*;base64,')
+_BASE64_ALPHABET = (string.ascii_letters + string.digits + '+/=').encode('ascii')
+
+
+def _is_base64_data_url(value):
+    """True for a data: URL with base64 data (checked slice by slice, without copying the string)"""
+    header = _DATA_URL_HEADER.match(value)
+    if header is None or not value.isascii():
+        return False
+    for start in range(header.end(), len(value), CHUNK_SIZE):
+        if value[start:start + CHUNK_SIZE].encode('ascii').translate(None, _BASE64_ALPHABET):
+            return False
+    return True
+
+
+class StreamedJSONBody:
+    """
+    Iterable of the JSON encoding of payload, byte-for-byte what json.dumps gives.
+    Pass as requests' data= with a Content-Type: application/json header; it can
+    be iterated again (e.g. to retry the same request).
+    """
+
+    def __init__(self, payload, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.marker = f"__streamed_{uuid.uuid4().hex}_"
+        self.strings = []
+        skeleton = json.dumps(self._skeleton(payload), allow_nan=False)
+
+        # Split the serialized skeleton at each marker: text, string, text, string, ..., text
+        self.parts = [part.encode('utf-8') for part in re.split(re.escape(self.marker) + r'\d+', skeleton)]
+        self.length = sum(len(part) for part in self.parts) + sum(len(value) for value in self.strings)
+
+    def _skeleton(self, value):
+        """Copy of the containers in value with large base64 data: URLs replaced by numbered markers"""
+        if isinstance(value, dict):
+            return {key: self._skeleton(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._skeleton(item) for item in value]
+        if isinstance(value, str) and len(value) >= MIN_STREAMED_LENGTH and _is_base64_data_url(value):
+            self.strings.append(value)
+            return f"{self.marker}{len(self.strings) - 1}"
+        return value
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index, part in enumerate(self.parts):
+            yield part
+            if index < len(self.strings):
+                value = self.strings[index]
+                # ASCII only, so each slice encodes to exactly its length in bytes
+                for start in range(0, len(value), self.chunk_size):
+                    yield value[start:start + self.chunk_size].encode('ascii')
+
+    def getvalue(self):
+        """The whole body as bytes (for tests and logging; defeats the streaming)"""
+        return b''.join(self)
@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+RATE_LIMIT_MARKERS = ('rate limit', '429', 'quota', 'resource_exhausted', 'too many requests')
+
+# Exact prefixes of the error strings the AI clients and the engine return instead of an answer
+ERROR_PREFIXES = ('Error:', 'API Error', 'Error analyzing image', 'Error extracting text:',
+                  'Error getting quick answer', 'OpenAI analysis error:', 'Gemini analysis error:',
+                  'OpenAI API key is not configured', 'Gemini API key is not configured')
+
+
+def is_error_answer(answer):
+    """True for empty answers and the error strings the AI clients return (not answers that mention errors)"""
+    return not answer or str(answer).lstrip().startswith(ERROR_PREFIXES)
+
+
+def is_rate_limit_answer(answer):
+    """True if an error answer reports a provider rate limit or exhausted quota"""
+    return is_error_answer(answer) and any(marker in str(answer).lower() for marker in RATE_LIMIT_MARKERS)
+
+
+class ResponseCache:
+    """
+    LRU cache of provider answers with a time-to-live.
+    Keys combine the request kind, model, response mode and a hash of the
+    question text or image, so identical requests from the GUI, the local
+    API and batch jobs share one provider call.
+    """
+
+    def __init__(self, max_entries=256, ttl=600):
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (stored_at, answer)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind, model, response_mode, content):
+        """Build a cache key; content is hashed so images are not kept as keys"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return (kind, model, response_mode, hashlib.sha256(content).hexdigest())
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key):
+        """Get a cached answer or None"""
+        if not self.enabled:
+            return None
+
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None or time.time() - item[0] > self.ttl:
+                if item is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, answer):
+        """Store an answer (provider error messages are never cached)"""
+        if not self.enabled or is_error_answer(answer):
+            return
+
+        with self.lock:
+            self.entries[key] = (time.time(), answer)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached answer for key, or compute(), cache and return it"""
+        answer = self.get(key)
+        if answer is not None:
+            return answer
+        answer = compute()
+        self.put(key, answer)
+        return answer
+
+    def clear(self):
+        """Drop all cached answers"""
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        """Get size and hit-rate statistics"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+class ConfigStore:
+    """
+    In-memory config.json.
+    Saves are debounced and written atomically from a timer thread, so toggles
+    never block on disk; edits made to the file by hand are picked up by
+    watch() when its mtime changes. A file that is not valid JSON is copied to
+    path + '.bad' and never written over until it parses again.
+    """
+
+    def __init__(self, path='config.json', defaults=None, debounce=0.5):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self.debounce = debounce
+
+        # Callers hold on to this dict; reloads update it in place
+        self.data = {}
+        self.lock = threading.RLock()
+        self.save_timer = None
+        self.mtime = None
+        self.watch_thread = None
+        self.watching = False
+        self.invalid = False  # The file on disk does not parse; saves are blocked
+
+        if not self.load():
+            self.data.update(self.defaults)
+            self.flush()
+        elif self.invalid:
+            # Run on defaults; the user's file (and its API keys) stays untouched
+            self.data.update(self.defaults)
+
+    def load(self):
+        """Read the file into data; returns False if it does not exist"""
+        try:
+            with open(self.path, 'r') as f:
+                loaded = json.load(f)
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        except ValueError as e:
+            # Keep the current settings rather than wiping them with a half-written file
+            self.logger.error(f"Invalid {self.path}: {e}; settings will not be saved until it is fixed")
+            self._mark_invalid()
+            return True
+
+        with self.lock:
+            # Other threads read data without the lock: update in place, then drop removed keys,
+            # so no reader ever sees a key that exists in both versions go missing
+            self.data.update(loaded)
+            for key in [key for key in self.data if key not in loaded]:
+                del self.data[key]
+            self.mtime = mtime
+            self.invalid = False
+        return True
+
+    def _mark_invalid(self):
+        """Block saves over an unparseable file and keep a copy of it"""
+        with self.lock:
+            try:
+                # Remember this version so the watcher does not report it again
+                self.mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                pass
+            if self.invalid:
+                return
+            self.invalid = True
+            try:
+                shutil.copyfile(self.path, self.path + '.bad')
+                self.logger.error(f"Copied the invalid {self.path} to {self.path}.bad")
+            except OSError as e:
+                self.logger.error(f"Failed to back up {self.path}: {e}")
+
+    def save(self):
+        """Schedule a write; repeated calls within the debounce window coalesce"""
+        with self.lock:
+            if self.save_timer:
+                self.save_timer.cancel()
+            self.save_timer = threading.Timer(self.debounce, self.flush)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush(self):
+        """Write pending changes now (atomic replace)"""
+        with self.lock:
+            if self.save_timer:
+                self.save_timer.cancel()
+                self.save_timer = None
+            if self.invalid:
+                self.logger.error(f"Not saving settings: {self.path} is not valid JSON (fix it to save again)")
+                return
+            # Copy first: other threads may set keys while this serializes
+            content = json.dumps(self.data.copy(), indent=2)
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            temp_path = None
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix='.config-', suffix='.tmp', dir=directory)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(content)
+                os.replace(temp_path, self.path)
+                self.mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                self.logger.error(f"Failed to save {self.path}: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+    def reload_if_changed(self):
+        """Reload if the file changed on disk; returns True if it was reloaded"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+        with self.lock:
+            # A pending save would overwrite the edit anyway; in-memory settings win
+            if mtime == self.mtime or self.save_timer:
+                return False
+
+        self.logger.info(f"{self.path} changed on disk, reloading")
+        return self.load()
+
+    def watch(self, on_change=None, interval=2.0):
+        """Poll the file's mtime in the background and call on_change() after a reload"""
+        def loop():
+            while self.watching:
+                try:
+                    if self.reload_if_changed() and on_change:
+                        on_change()
+                except Exception as e:
+                    self.logger.error(f"Config watch error: {e}")
+                time.sleep(interval)
+
+        self.watching = True
+        self.watch_thread = threading.Thread(target=loop, daemon=True)
+        self.watch_thread.start()
+
+    def close(self):
+        """Stop watching and write any pending changes"""
+        self.watching = False
+        with self.lock:
+            pending = self.save_timer is not None
+        if pending:
+            self.flush()
+
+
+class PromptStore:
+    """Text files (prompt.txt) cached in memory and re-read only when their mtime changes"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.entries = {}  # path -> (mtime, text)
+        self.lock = threading.Lock()
+
+    def read(self, path, default=None):
+        """Stripped file contents, or default if the file does not exist"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return default
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == mtime:
+                return entry[1]
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read().strip()
+        except OSError as e:
+            self.logger.error(f"Failed to read {path}: {e}")
+            return default
+
+        with self.lock:
+            self.entries[path] = (mtime, text)
+        return text
+
+
+prompts = PromptStore()
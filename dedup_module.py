@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Spoken fillers and politeness that do not change what is being asked
+FILLER_WORDS = {'um', 'uh', 'er', 'ah', 'hmm', 'like', 'so', 'okay', 'ok', 'please', 'hey', 'well', 'just', 'a', 'an', 'the'}
+
+CONTRACTIONS = {"what's": 'what is', "who's": 'who is', "where's": 'where is', "how's": 'how is',
+                "it's": 'it is', "that's": 'that is', "there's": 'there is', "can't": 'cannot',
+                "don't": 'do not', "doesn't": 'does not', "isn't": 'is not', "aren't": 'are not'}
+
+# Words that flip what a question asks; near-duplicates must agree on them exactly
+POLARITY_WORDS = {'not', 'no', 'never', 'none', 'nor', 'cannot', 'except', 'true', 'false', 'correct', 'incorrect'}
+
+FINGERPRINT_BITS = 64
+BAND_BITS = 16  # 4 bands: any fingerprints within 3 bits share at least one band
+
+
+def normalize_tokens(text):
+    """Lowercase word tokens with contractions expanded and fillers dropped"""
+    text = text.lower().replace('’', "'")
+    for contraction, expanded in CONTRACTIONS.items():
+        text = text.replace(contraction, expanded)
+    tokens = re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", text)
+    return [token for token in tokens if token not in FILLER_WORDS]
+
+
+def shingles(tokens):
+    """Word unigrams and bigrams"""
+    return list(tokens) + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def simhash(tokens):
+    """64-bit SimHash over word unigrams and bigrams"""
+    features = shingles(tokens)
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def question_numbers(tokens):
+    return tuple(sorted(token for token in tokens if token[0].isdigit()))
+
+
+def question_polarity(tokens):
+    return tuple(sorted(token for token in tokens if token in POLARITY_WORDS))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class QuestionEntry:
+    """A question being answered (or recently answered) and the requests waiting on it"""
+
+    def __init__(self, request_id, fingerprint, tokens, key):
+        self.request_id = request_id
+        self.fingerprint = fingerprint
+        self.tokens = tokens
+        self.features = frozenset(shingles(tokens))
+        self.numbers = question_numbers(tokens)
+        self.polarity = question_polarity(tokens)
+        self.key = key
+        self.created = time.time()
+        self.answer = None
+        self.done = False
+        self.followers = []  # (request_id, source, question)
+
+
+class QuestionIndex:
+    """
+    Near-duplicate index over recent questions.
+    SimHash (within max_distance bits) only finds candidates. A candidate is the
+    same question when its normalized tokens are equal, or when its unigram and
+    bigram Jaccard similarity is at least min_similarity and it has the same
+    numbers and negation/polarity words, so "2+2" never matches "3+3" and
+    "which is not" never matches "which is". Such a question attaches to that
+    request instead of triggering another provider call.
+    """
+
+    def __init__(self, window=120, max_distance=3, max_entries=512, min_tokens=4, min_similarity=0.95):
+        self.logger = logging.getLogger(__name__)
+        self.window = window
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+
+        self.entries = OrderedDict()  # request_id -> QuestionEntry
+        self.bands = {}  # (band, value) -> set of request_ids
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << BAND_BITS) - 1
+        return [(band, fingerprint >> (band * BAND_BITS) & mask) for band in range(FINGERPRINT_BITS // BAND_BITS)]
+
+    def _fingerprint(self, tokens):
+        if len(tokens) < self.min_tokens:
+            # Too short for a stable SimHash; only exact normalized matches count
+            digest = hashlib.blake2b(' '.join(tokens).encode('utf-8'), digest_size=8).digest()
+            return int.from_bytes(digest, 'big'), True
+        return simhash(tokens), False
+
+    def _same_question(self, entry, tokens, fingerprint, exact):
+        """Whether a band candidate really asks the same question as tokens"""
+        if entry.tokens == tokens:
+            return True
+        if exact or hamming_distance(entry.fingerprint, fingerprint) > self.max_distance:
+            return False
+        if entry.numbers != question_numbers(tokens) or entry.polarity != question_polarity(tokens):
+            return False
+        # One swapped content word in a typical question already falls below this
+        return jaccard(entry.features, frozenset(shingles(tokens))) >= self.min_similarity
+
+    def _expire(self, now):
+        """Drop answered entries older than the window, then the oldest answered ones over capacity"""
+        answered = [request_id for request_id, entry in self.entries.items() if entry.done]
+        for request_id in answered:
+            if now - self.entries[request_id].created > self.window or len(self.entries) > self.max_entries:
+                self._remove(request_id)
+
+    def _remove(self, request_id):
+        entry = self.entries.pop(request_id, None)
+        if entry is None:
+            return
+        for band_key in self._band_keys(entry.fingerprint):
+            members = self.bands.get(band_key)
+            if members:
+                members.discard(request_id)
+                if not members:
+                    del self.bands[band_key]
+
+    def attach(self, question, key, request_id, source):
+        """
+        Look up a near-duplicate of question answered with the same key (model/mode).
+        Returns None if the question is new (it becomes the primary request), otherwise
+        the matching QuestionEntry: pending entries gain request_id as a follower.
+        """
+        tokens = tuple(normalize_tokens(question))
+        fingerprint, exact = self._fingerprint(tokens)
+        now = time.time()
+
+        with self.lock:
+            self._expire(now)
+
+            candidates = set()
+            for band_key in self._band_keys(fingerprint):
+                candidates |= self.bands.get(band_key, set())
+
+            for candidate_id in sorted(candidates):
+                entry = self.entries[candidate_id]
+                if entry.key != key:
+                    continue
+                if entry.done and now - entry.created > self.window:
+                    continue
+                if self._same_question(entry, tokens, fingerprint, exact):
+                    if not entry.done:
+                        entry.followers.append((request_id, source, question))
+                    self.coalesced += 1
+                    return entry
+
+            entry = QuestionEntry(request_id, fingerprint, tokens, key)
+            self.entries[request_id] = entry
+            for band_key in self._band_keys(fingerprint):
+                self.bands.setdefault(band_key, set()).add(request_id)
+            return None
+
+    def complete(self, request_id, answer, failed=False):
+        """Record the primary request's answer; returns the followers to fan it out to"""
+        with self.lock:
+            entry = self.entries.get(request_id)
+            if entry is None:
+                return []
+            followers, entry.followers = entry.followers, []
+            if failed:
+                # Never reuse a failure; the next copy of the question asks again
+                self._remove(request_id)
+            else:
+                entry.done = True
+                entry.answer = answer
+                entry.created = time.time()
+            return followers
+
+    def get_stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'coalesced': self.coalesced}
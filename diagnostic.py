@@ -109,11 +109,26 @@ def check_audio_devices():
         print(f"✅ Audio devices found: {device_count}")
         
         # Find default input device
+        default_name = None
         try:
             default_input = audio.get_default_input_device_info()
-            print(f"   Default input: {default_input['name']}")
+            default_name = default_input['name']
+            print(f"   Default input: {default_name}")
         except:
             print("   ❌ No default input device")
+        
+        # Show the saved noise-floor profile the app reuses at startup
+        try:
+            with open('audio_profile.json', 'r') as f:
+                profile = json.load(f).get(default_name or '')
+            if profile:
+                print(f"   Noise profile: floor {profile['noise_floor']:.0f} (saved {profile['updated']})")
+            else:
+                print("   Noise profile: not calibrated yet (done in background on first launch)")
+        except FileNotFoundError:
+            print("   Noise profile: not calibrated yet (done in background on first launch)")
+        except Exception as e:
+            print(f"   Noise profile error: {e}")
             
         audio.terminate()
         return True
@@ -0,0 +1,122 @@
+import threading
+import time
+import logging
+from collections import deque
+
+
+class UIDispatcher:
+    """
+    Thread-safe queue of GUI updates drained once per frame on the Tk thread.
+    Worker threads post callbacks instead of scheduling their own root.after(0, ...)
+    closures; updates posted with the same key are merged so only the latest runs.
+    """
+
+    def __init__(self, root, frame_ms=25):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.logger = logging.getLogger(__name__)
+
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.keyed = {}  # key -> pending item, for merging redundant updates
+        self.running = False
+
+        # Metrics
+        self.posted_count = 0
+        self.merged_count = 0
+        self.executed_count = 0
+        self.max_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latencies = deque(maxlen=500)
+
+    def post(self, callback, *args, key=None, **kwargs):
+        """Queue a GUI update from any thread. Arguments are bound now, not when it runs."""
+        now = time.perf_counter()
+        with self.lock:
+            self.posted_count += 1
+
+            if key is not None and key in self.keyed:
+                # Latest update wins; keep the queue slot and original post time
+                item = self.keyed[key]
+                item[1] = callback
+                item[2] = args
+                item[3] = kwargs
+                self.merged_count += 1
+                return
+
+            item = [key, callback, args, kwargs, now]
+            self.pending.append(item)
+            if key is not None:
+                self.keyed[key] = item
+
+            if len(self.pending) > self.max_depth:
+                self.max_depth = len(self.pending)
+
+    def start(self):
+        """Start draining on the Tk thread"""
+        if not self.running:
+            self.running = True
+            self.root.after(self.frame_ms, self._drain)
+
+    def stop(self):
+        """Stop draining"""
+        self.running = False
+
+    def _drain(self):
+        """Run every queued update (Tk thread only)"""
+        if not self.running:
+            return
+
+        # Schedule the next frame first so a modal dialog opened by a
+        # callback does not stall later updates
+        try:
+            self.root.after(self.frame_ms, self._drain)
+        except Exception:
+            self.running = False
+            return
+
+        with self.lock:
+            if not self.pending:
+                return
+            items = list(self.pending)
+            self.pending.clear()
+            self.keyed.clear()
+
+        for _key, callback, args, kwargs, posted_at in items:
+            latency = time.perf_counter() - posted_at
+            try:
+                callback(*args, **kwargs)
+            except Exception as e:
+                self.logger.error(f"GUI update error: {e}")
+
+            # get_stats reads these from other threads
+            with self.lock:
+                self.executed_count += 1
+                self.total_latency += latency
+                self.latencies.append(latency)
+                if latency > self.max_latency:
+                    self.max_latency = latency
+
+    def get_stats(self):
+        """Get queue depth and GUI latency statistics"""
+        # Snapshot under the lock; the Tk thread appends to latencies while draining
+        with self.lock:
+            depth = len(self.pending)
+            recent = list(self.latencies)
+            executed, total_latency, max_latency = self.executed_count, self.total_latency, self.max_latency
+            posted, merged, max_depth = self.posted_count, self.merged_count, self.max_depth
+
+        recent.sort()
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+
+        return {
+            'queue_depth': depth,
+            'max_queue_depth': max_depth,
+            'posted': posted,
+            'merged': merged,
+            'executed': executed,
+            'avg_latency_ms': (total_latency / executed * 1000) if executed else 0.0,
+            'p95_latency_ms': p95 * 1000,
+            'max_latency_ms': max_latency * 1000
+        }
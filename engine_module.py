@@ -0,0 +1,1130 @@
+#!/usr/bin/env python3
+"""
+Headless capture -> recognize -> answer engine.
+
+The engine owns the question queue, the audio and live-screen loops and
+provider dispatch. Frontends subscribe to its events; nothing here imports
+tkinter, so the pipeline can run on a server box, under a profiler or from
+benchmarks. Run this module directly for the CLI/daemon frontend.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from registry_module import ComponentRegistry
+from cache_module import ResponseCache, is_error_answer, is_rate_limit_answer
+from dedup_module import QuestionIndex
+from scheduler_module import LiveScreenScheduler, AdaptiveIntervalController, frame_thumbnail, frame_change
+from segment_module import segment_lines, crop_segment
+from config_module import prompts
+from prompt_module import vision_instructions, prompt_cache_stats
+from sizing_module import request_sizer, choose_detail, image_size, estimate_request_tokens
+from legibility_module import plan_tiles, crop_tiles
+from body_module import StreamedJSONBody
+from profiler_module import profiler
+
+DEFAULT_CONFIG = {
+    'openai_api_key': '',
+    'gemini_api_key': '',
+    'perplexity_api_key': '',
+    'scan_interval': 3,
+    'live_screen_interval': 5,
+    'live_screen_max_in_flight': 1,  # Concurrent live screen analyses; newer frames replace waiting ones
+    'live_screen_adaptive': True,  # Adapt the interval to screen changes and rate limits
+    'live_screen_min_interval': 2,
+    'live_screen_max_interval': 30,
+    'audio_enabled': True,
+    'ocr_enabled': True,
+    'ocr_first_enabled': False,  # Answer screen captures from local OCR text when it reads cleanly
+    'ocr_first_min_confidence': 75,  # Mean Tesseract word confidence (0-100) needed to skip vision
+    'ocr_first_min_words': 5,
+    'ocr_first_max_diagram': 0.4,  # Share of edges outside text above which the screen has a diagram
+    'segment_questions': False,  # Answer each question on a multi-question screen separately and concurrently
+    'segment_workers': 4,
+    'segment_max_tokens': 2000,  # Vision answer limit for a single cropped question
+    'adaptive_max_tokens': True,  # Size max_tokens from past answer lengths (retried in full if cut off)
+    'vision_detail': 'auto',  # OpenAI image detail: 'auto' (low for images within one 512px tile), 'low' or 'high'
+    'legibility_resize': True,  # Size screenshots by measured text height instead of a fixed 1024px cap
+    'legibility_min_text_px': 10,  # Text line height to keep after downscaling
+    'vision_max_tiles': 4,  # Overlapping crops per OpenAI request when one image would be downscaled (1 disables)
+    'live_screen_enabled': False,
+    'response_mode': 'short',  # 'short' or 'detailed'
+    'always_on_top': True,
+    'openai_model': 'gpt-3.5-turbo',
+    'gemini_model': 'gemini-1.5-flash',
+    'working_models': [],
+    'working_gemini_models': [],
+    'selected_image_model': 'OpenAI GPT-4o',  # Default image recognition model
+    'selected_audio_model': 'OpenAI Whisper-1',  # Default audio recognition model
+    'use_custom_prompt': False,  # Whether to use custom prompt or hardcoded prompt
+    'custom_image_prompt': "What's in this image? Please analyze and describe what you see.",  # Default prompt
+    'audio_record_duration': '10s',  # OpenAI audio recording duration
+    'answer_history_limit': 200,  # Answers kept in memory before spilling to disk
+    'answer_display_limit': 30,  # Answers rendered in the response pane
+    'profiling_enabled': True,  # Record pipeline spans for the performance panel
+    'response_cache_size': 256,  # Cached answers shared by the GUI, local API and batch jobs (0 disables)
+    'response_cache_ttl': 600,  # Seconds a cached answer stays valid
+    'answer_workers': 1,  # Threads answering queued questions
+    'dedup_enabled': True,  # Coalesce near-duplicate questions from audio, manual and API input
+    'dedup_window': 120,  # Seconds an answered question keeps absorbing duplicates
+    'api_server_enabled': False,  # Serve the local HTTP API from the GUI
+    'api_server_port': 8766,
+    'api_max_pending': 32,  # Queued API requests before answering 429
+    'api_token': ''  # Optional bearer token required by the local API
+}
+
+# Display name -> model key
+IMAGE_MODELS = {
+    'OpenAI GPT-4o': 'openai_gpt4o',
+    'OpenAI GPT-4o-mini': 'openai_gpt4o_mini',
+    'OpenAI GPT-4 Turbo': 'openai_gpt4_turbo',
+    'Gemini Pro Vision': 'gemini_pro_vision',
+    'Gemini Flash': 'gemini_flash'
+}
+
+AUDIO_MODELS = {
+    'OpenAI Whisper-1': 'openai_whisper1',
+    'OpenAI GPT-4o-transcribe': 'openai_gpt4o_transcribe',
+    'OpenAI GPT-4o-mini-transcribe': 'openai_gpt4o_mini_transcribe',
+    'Gemini 2.5 Pro': 'gemini_2_5_pro',
+    'Gemini 2.5 Flash': 'gemini_2_5_flash'
+}
+
+GEMINI_RESPONSE_MODELS = {
+    'Gemini 1.5 Flash': 'gemini_flash',
+    'Gemini 1.5 Pro': 'gemini_pro'
+}
+
+DEFAULT_OPENAI_MODELS = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-turbo', 'gpt-4o', 'gpt-4o-mini']
+
+TRANSCRIBE_PROMPT = "Please transcribe this audio accurately. If it sounds like a question, provide the exact question being asked."
+
+SCREEN_TEXT_PROMPT = "The following text was read from the screen. Answer the questions in it:\n\n{text}"
+
+
+def load_config(path='config.json'):
+    """Load config.json, falling back to the defaults"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict(DEFAULT_CONFIG)
+
+
+class ExamEngine:
+    """
+    Capture/recognize/answer pipeline with an event API.
+
+    Events (callback keyword arguments):
+        status(text)                      - progress and error messages
+        answer(source, question, answer, request_id[, duplicate_of])  - an answer is ready
+        transcription(text)               - a recording was transcribed
+        screenshot(image)                 - a base64 screenshot was captured
+        audio_state(running, loading)     - audio scanning started/stopped
+        live_screen_state(running)        - live screen started/stopped
+        error(message, request_id)        - a queued question failed
+
+    Callbacks run on the engine's worker threads; GUI frontends must marshal
+    them onto their own thread.
+    """
+
+    def __init__(self, config, save_config=None, components=None):
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.save_config = save_config or (lambda: None)
+
+        self.components = components or ComponentRegistry()
+        if components is None:
+            self.register_components()
+
+        # Shared by every frontend so identical requests reuse one provider call
+        self.cache = ResponseCache(config.get('response_cache_size', 256), config.get('response_cache_ttl', 600))
+
+        request_sizer.enabled = config.get('adaptive_max_tokens', True)
+        self.segment_pool = ThreadPoolExecutor(max_workers=max(1, int(config.get('segment_workers', 4))),
+                                               thread_name_prefix='segment')
+
+        # Near-duplicate questions attach to the request already answering them
+        self.question_index = (QuestionIndex(window=config.get('dedup_window', 120))
+                               if config.get('dedup_enabled', True) else None)
+
+        # Items are (request_id, source, kind, payload)
+        self.question_queue = queue.Queue()
+        self.request_ids = itertools.count(1)
+        self.running = False
+        self.answer_threads = []
+
+        # Thread control flags
+        self.audio_running = False
+        self.live_screen_running = False
+        self.audio_thread = None
+        self.live_screen_scheduler = None
+        self.live_screen_controller = None
+        self.last_live_thumbnail = None
+        self.ocr_first_stats = {'ocr': 0, 'vision': 0}
+        self.stats_lock = threading.Lock()  # Guards ocr_first_stats (updated from answer and segment workers)
+
+        # Window excluded from screen captures (set by GUI frontends)
+        self.window_title = "Exam Helper"
+
+        self.subscribers = {}
+        self.subscribers_lock = threading.Lock()
+
+    def register_components(self):
+        """Register lazily-built subsystems with the component registry"""
+        self.components.register('screenshot_capture', 'screenshot_module', lambda m: m.ScreenshotCapture())
+        self.components.register('llm_client', 'llm_module', lambda m: m.LLMClient(
+            self.config.get('openai_api_key', ''), self.config.get('openai_model', 'gpt-3.5-turbo'),
+            self.config.get('openai_base_url')))
+        self.components.register('gemini_client', 'gemini_module', lambda m: m.GeminiClient(
+            self.config.get('gemini_api_key', ''), self.config.get('gemini_api_endpoint')))
+        self.components.register('perplexity_client', 'perplexity_module', lambda m: m.PerplexityClient(
+            self.config.get('perplexity_api_key', ''), self.config.get('perplexity_base_url')))
+        self.components.register('audio_capture', 'audio_module', lambda m: m.AudioCapture())
+        self.components.register('ocr_capture', 'ocr_module', lambda m: m.OCRCapture())
+
+    @property
+    def ocr_capture(self):
+        return self.components.get('ocr_capture')
+
+    @property
+    def audio_capture(self):
+        return self.components.get('audio_capture')
+
+    @property
+    def screenshot_capture(self):
+        return self.components.get('screenshot_capture')
+
+    @property
+    def llm_client(self):
+        return self.components.get('llm_client')
+
+    @property
+    def gemini_client(self):
+        return self.components.get('gemini_client')
+
+    @property
+    def perplexity_client(self):
+        return self.components.get('perplexity_client')
+
+    # -- events ----------------------------------------------------------
+
+    def subscribe(self, event, callback):
+        """Register callback(**data) for an event ('*' receives every event as callback(event, **data))"""
+        with self.subscribers_lock:
+            self.subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event, callback):
+        """Remove a previously registered callback"""
+        with self.subscribers_lock:
+            if callback in self.subscribers.get(event, []):
+                self.subscribers[event].remove(callback)
+
+    def emit(self, event, **data):
+        """Deliver an event to its subscribers"""
+        with self.subscribers_lock:
+            callbacks = list(self.subscribers.get(event, []))
+            wildcard = list(self.subscribers.get('*', []))
+
+        for callback in callbacks:
+            try:
+                callback(**data)
+            except Exception as e:
+                self.logger.error(f"Event {event} subscriber error: {e}")
+        for callback in wildcard:
+            try:
+                callback(event, **data)
+            except Exception as e:
+                self.logger.error(f"Event {event} subscriber error: {e}")
+
+    def status(self, text):
+        """Emit a status message"""
+        self.emit('status', text=text)
+
+    # -- lifecycle -------------------------------------------------------
+
+    def start(self, warm_up=True):
+        """Start the answer worker and any loops enabled in the config"""
+        if self.running:
+            return
+        self.running = True
+
+        for _ in range(max(1, int(self.config.get('answer_workers', 1)))):
+            thread = threading.Thread(target=self.process_answers, daemon=True)
+            thread.start()
+            self.answer_threads.append(thread)
+
+        if self.config.get('audio_enabled', True):
+            self.start_audio_scanning()
+        else:
+            self.emit('audio_state', running=False, loading=False)
+
+        if self.config.get('live_screen_enabled', False):
+            self.start_live_screen()
+        else:
+            self.emit('live_screen_state', running=False)
+
+        if warm_up:
+            # Import and initialize heavy subsystems off the caller's thread
+            self.components.warm_up(
+                ['screenshot_capture', 'llm_client', 'gemini_client', 'perplexity_client', 'audio_capture', 'ocr_capture'],
+                on_done=lambda: self.logger.info("Component warm-up complete:\n" + self.components.format_timings())
+            )
+
+    def stop(self):
+        """Stop all loops and release audio devices"""
+        self.running = False
+        self.audio_running = False
+        self.live_screen_running = False
+        if self.live_screen_scheduler:
+            self.live_screen_scheduler.stop()
+        if self.components.is_ready('audio_capture'):
+            self.audio_capture.cleanup()
+
+    def get_status(self):
+        """Get current engine status"""
+        with self.stats_lock:
+            ocr_first = dict(self.ocr_first_stats) if self.config.get('ocr_first_enabled', False) else None
+
+        return {
+            'running': self.running,
+            'audio_running': self.audio_running,
+            'live_screen_running': self.live_screen_running,
+            'questions_pending': self.question_queue.qsize(),
+            'cache': self.cache.get_stats(),
+            'dedup': self.question_index.get_stats() if self.question_index else None,
+            'ocr_available': self.ocr_capture.tesseract_available if self.components.is_ready('ocr_capture') else None,
+            'ocr_first': ocr_first,
+            'threads_active': {
+                'answers': sum(thread.is_alive() for thread in self.answer_threads),
+                'audio': self.audio_thread.is_alive() if self.audio_thread else False,
+                'live_screen': self.live_screen_scheduler.running if self.live_screen_scheduler else False
+            },
+            'live_screen': self.live_screen_scheduler.get_stats() if self.live_screen_scheduler else None,
+            'live_screen_interval': self.live_screen_controller.get_stats() if self.live_screen_controller else None,
+            'prompt_cache': prompt_cache_stats.get_stats(),
+            'request_sizing': request_sizer.get_stats()
+        }
+
+    # -- model selection -------------------------------------------------
+
+    def get_response_models(self):
+        """Response model display names -> model keys"""
+        working_models = self.config.get('working_models', []) or DEFAULT_OPENAI_MODELS
+        response_models = {f"OpenAI {model}": f"openai_{model}" for model in working_models}
+        response_models.update(GEMINI_RESPONSE_MODELS)
+        return response_models
+
+    def get_selected_response_model(self):
+        """Display name of the selected response model"""
+        response_models = self.get_response_models()
+        selected = self.config.get('selected_response_model')
+        if selected in response_models:
+            return selected
+        display_model = f"OpenAI {self.config.get('openai_model', 'gpt-4o')}"
+        if display_model in response_models:
+            return display_model
+        return next(iter(response_models))
+
+    def get_selected_image_model(self):
+        """Display name and key of the selected image model"""
+        selected = self.config.get('selected_image_model', 'OpenAI GPT-4o')
+        if selected not in IMAGE_MODELS:
+            selected = 'OpenAI GPT-4o'
+        return selected, IMAGE_MODELS[selected]
+
+    def check_api_key(self, model_key):
+        """Return an error message if the provider for model_key has no API key"""
+        if model_key.startswith('openai') and not self.config.get('openai_api_key'):
+            return "OpenAI API key is not configured."
+        if model_key.startswith('gemini') and not self.config.get('gemini_api_key'):
+            return "Gemini API key is not configured."
+        return None
+
+    # -- questions -------------------------------------------------------
+
+    def submit_question(self, source, question, response_mode=None):
+        """Queue a text question for answering; returns its request id"""
+        request_id = next(self.request_ids)
+
+        if self.question_index is not None:
+            mode = response_mode or self.config.get('response_mode', 'short')
+            model_key = self.get_response_models().get(self.get_selected_response_model())
+            entry = self.question_index.attach(question, (model_key, mode), request_id, source)
+            if entry is not None:
+                self.logger.info(f"{source} question coalesced with request {entry.request_id}")
+                if entry.done:
+                    # Answered moments ago; reply from the worker like any other request
+                    self.question_queue.put((request_id, source, 'duplicate', (question, entry.answer, entry.request_id)))
+                return request_id
+
+        self.question_queue.put((request_id, source, 'question', (question, response_mode)))
+        return request_id
+
+    def submit_image(self, source, base64_image, model_key=None, response_mode=None):
+        """Queue an image for analysis; returns its request id"""
+        request_id = next(self.request_ids)
+        self.question_queue.put((request_id, source, 'image', (base64_image, model_key, response_mode)))
+        return request_id
+
+    def answer_question(self, question, response_mode=None):
+        """Answer a text question with the selected response model (blocking)"""
+        response_mode = response_mode or self.config.get('response_mode', 'short')
+        model_key = self.get_response_models().get(self.get_selected_response_model())
+        key = self.question_cache_key(question, response_mode)
+        return self.cache.get_or_compute(key, lambda: self._answer_question(question, model_key, response_mode))
+
+    def question_cache_key(self, question, response_mode):
+        """Cache key for a text question answered with the selected response model"""
+        model_key = self.get_response_models().get(self.get_selected_response_model())
+        return ResponseCache.make_key('question', model_key, response_mode, question)
+
+    def _answer_question(self, question, model_key, response_mode):
+        """Dispatch a text question to a provider"""
+        if model_key and model_key.startswith('openai') and self.llm_client.client:
+            return self.llm_client.get_answer(question, response_mode)
+        elif model_key and model_key.startswith('gemini') and self.gemini_client.api_key:
+            return self.gemini_client.get_text_answer(question, response_mode)
+
+        # Fallback logic
+        if self.llm_client.client:
+            return self.llm_client.get_answer(question, response_mode)
+        elif self.gemini_client.api_key:
+            return self.gemini_client.get_text_answer(question, response_mode)
+        return self.perplexity_client.get_text_answer(question, response_mode)
+
+    def process_answers(self):
+        """Process questions and get answers from LLM"""
+        while self.running:
+            try:
+                item = self.question_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            request_id, source, kind, payload = item
+            try:
+                # Handle different types of queue items
+                if kind == 'question':
+                    question, response_mode = payload
+                    self.status("Processing question...")
+                    try:
+                        answer = self.answer_question(question, response_mode)
+                    except Exception as e:
+                        self.fan_out_error(request_id, str(e))
+                        raise
+                    self.emit('answer', source=source, question=question, answer=answer, request_id=request_id)
+                    self.fan_out_answer(request_id, answer)
+                    self.status("Ready")
+
+                elif kind == 'duplicate':
+                    question, answer, primary_id = payload
+                    self.emit('answer', source=source, question=question, answer=answer,
+                              request_id=request_id, duplicate_of=primary_id)
+
+                elif kind == 'image':
+                    base64_image, model_key, response_mode = payload
+                    self.status("Processing image...")
+
+                    if model_key:
+                        answer = self.analyze_image(base64_image, model_key, response_mode)
+                    else:
+                        answer = self.analyze_image_fallback(base64_image, response_mode)
+
+                    self.emit('answer', source=source, question="Image Analysis", answer=answer, request_id=request_id)
+                    self.status("Ready")
+
+            except Exception as e:
+                self.logger.error(f"Answer processing error: {e}")
+                self.status("Error processing question")
+                self.emit('error', message=str(e), request_id=request_id)
+
+    def fan_out_answer(self, request_id, answer):
+        """Deliver a primary request's answer to the duplicates attached to it"""
+        if self.question_index is None:
+            return
+        for follower_id, source, question in self.question_index.complete(request_id, answer, is_error_answer(answer)):
+            self.emit('answer', source=source, question=question, answer=answer,
+                      request_id=follower_id, duplicate_of=request_id)
+
+    def fan_out_error(self, request_id, message):
+        """Fail the duplicates attached to a failed primary request"""
+        if self.question_index is None:
+            return
+        for follower_id, _, _ in self.question_index.complete(request_id, None, failed=True):
+            self.emit('error', message=message, request_id=follower_id)
+
+    # -- audio -----------------------------------------------------------
+
+    def start_audio_scanning(self):
+        """Start audio monitoring and the speech processing loop"""
+        if self.audio_running:
+            return True
+
+        if not self.components.is_ready('audio_capture'):
+            # Audio subsystem is still loading; start once the warm-up has built it
+            self.emit('audio_state', running=False, loading=True)
+            self.components.when_ready('audio_capture', lambda _: self.start_audio_scanning())
+            return False
+
+        self.audio_running = True
+
+        # Start dedicated audio capture thread
+        self.audio_capture.start_audio_monitoring()
+
+        # Start speech processing thread (lightweight)
+        self.audio_thread = threading.Thread(target=self.audio_scan_loop, daemon=True)
+        self.audio_thread.start()
+
+        self.config['audio_enabled'] = True
+        self.save_config()
+        self.emit('audio_state', running=True, loading=False)
+        self.status("Audio scanning started")
+        self.logger.info("Audio scanning started")
+        return True
+
+    def stop_audio_scanning(self):
+        """Stop audio monitoring"""
+        if not self.audio_running:
+            return
+
+        self.audio_running = False
+
+        # Stop audio capture thread first
+        self.audio_capture.stop_audio_monitoring()
+
+        self.config['audio_enabled'] = False
+        self.save_config()
+        self.emit('audio_state', running=False, loading=False)
+        self.status("Audio scanning stopped")
+        self.logger.info("Audio scanning stopped")
+
+    def audio_scan_loop(self):
+        """Lightweight speech processing loop - only processes queued speech"""
+        self.logger.info("Speech processing loop started")
+
+        while self.running and self.audio_running:
+            try:
+                # Get speech from queue (non-blocking)
+                audio_data = self.audio_capture.get_speech_from_queue()
+                if audio_data:
+                    # Process speech in this thread (not audio capture thread)
+                    question = self.audio_capture.process_speech_audio(audio_data)
+                    if question and self.is_likely_question(question):
+                        self.submit_question('Audio', question)
+                        self.logger.info(f"Audio Question detected: {question[:50]}...")
+
+            except Exception as e:
+                self.logger.error(f"Speech processing error: {e}")
+
+            # Sleep longer since we're just checking a queue
+            time.sleep(0.2)
+
+    def is_likely_question(self, text):
+        """Simple heuristic to determine if text is likely a question"""
+        question_indicators = ['?', 'what', 'how', 'why', 'when', 'where', 'which', 'who']
+        text_lower = text.lower()
+
+        # Check for question mark or question words
+        return ('?' in text or
+                any(indicator in text_lower for indicator in question_indicators) and
+                len(text.split()) > 3)  # Minimum word count
+
+    def transcribe_recording(self):
+        """Record and transcribe with the selected audio model (blocking); returns the transcription"""
+        try:
+            # Get selected duration and model
+            duration_str = self.config.get('audio_record_duration', '10s')
+            duration = int(duration_str.replace('s', ''))
+            selected_audio_model = self.config.get('selected_audio_model', 'OpenAI Whisper-1')
+
+            # Check which model is selected and use appropriate transcription
+            if selected_audio_model.startswith('OpenAI'):
+                # Use OpenAI models
+                api_key = self.config.get('openai_api_key')
+                if not api_key:
+                    self.status("Error: OpenAI API key not configured")
+                    return None
+
+                # Map display name to actual model name
+                model_mapping = {
+                    'OpenAI Whisper-1': 'whisper-1',
+                    'OpenAI GPT-4o-transcribe': 'gpt-4o-audio-preview',
+                    'OpenAI GPT-4o-mini-transcribe': 'gpt-4o-mini-audio-preview'
+                }
+
+                actual_model = model_mapping.get(selected_audio_model, 'gpt-4o-audio-preview')
+
+                # Use different methods based on model type
+                if selected_audio_model == 'OpenAI Whisper-1':
+                    # Use traditional Whisper API
+                    transcription = self.audio_capture.record_and_transcribe_with_whisper(
+                        duration=duration,
+                        api_key=api_key,
+                        model='whisper-1'
+                    )
+                else:
+                    # Use GPT-4o audio models
+                    transcription = self.audio_capture.record_and_transcribe_with_openai(
+                        duration=duration,
+                        api_key=api_key,
+                        model=actual_model,
+                        prompt=TRANSCRIBE_PROMPT
+                    )
+
+            elif selected_audio_model.startswith('Gemini'):
+                # Use Gemini models
+                api_key = self.config.get('gemini_api_key')
+                if not api_key:
+                    self.status("Error: Gemini API key not configured")
+                    return None
+
+                # Map display name to actual model name
+                model_mapping = {
+                    'Gemini 2.5 Pro': 'gemini-2.5-pro',
+                    'Gemini 2.5 Flash': 'gemini-1.5-flash'
+                }
+
+                actual_model = model_mapping.get(selected_audio_model, 'gemini-1.5-flash')
+
+                transcription = self.audio_capture.record_and_transcribe_with_gemini(
+                    duration=duration,
+                    gemini_client=self.gemini_client,
+                    model=actual_model,
+                    prompt=TRANSCRIBE_PROMPT
+                )
+            else:
+                self.status("Error: Unknown audio model selected")
+                return None
+
+            if transcription:
+                self.emit('transcription', text=transcription)
+                self.status("Audio transcribed successfully - check input box")
+            else:
+                self.status("Failed to transcribe audio")
+            return transcription
+
+        except Exception as e:
+            self.logger.error(f"OpenAI audio recording error: {e}")
+            self.status("Audio recording failed")
+            return None
+
+    # -- screen ----------------------------------------------------------
+
+    def capture_screen(self, model_name=None):
+        """Capture the screen and analyze it with the selected image model (blocking)"""
+        if model_name is None:
+            model_name, model_key = self.get_selected_image_model()
+        else:
+            model_key = IMAGE_MODELS[model_name]
+
+        # Capture screenshot excluding our window
+        self.status("Taking screenshot...")
+
+        base64_image = self.screenshot_capture.capture_and_encode(
+            exclude_window_title=self.window_title,
+            resize=True,
+            min_text_px=self.legible_text_px(),
+            format='JPEG' if model_key.startswith('openai') else 'PNG'
+        )
+
+        if not base64_image:
+            self.status("Failed to capture screenshot")
+            self.logger.error("Failed to capture or encode screenshot")
+            return None
+
+        self.status(f"Screenshot captured - analyzing with {model_name}...")
+        self.logger.info(f"Screenshot captured successfully for {model_name}")
+        self.emit('screenshot', image=base64_image)
+
+        answers = []
+
+        def on_answer(label, answer, from_text):
+            question = f"{model_name} {label}" if label else model_name
+            if from_text:
+                question += " (OCR text)"
+            self.emit('answer', source="Screen Analysis", question=question, answer=answer)
+            answers.append(answer)
+
+        self.answer_screen(base64_image, model_key, on_answer)
+        self.status(f"{model_name} analysis complete")
+        return '\n\n'.join(answers)
+
+    def ocr_screen(self):
+        """Capture the screen and extract its text with Gemini OCR (blocking)"""
+        # Capture screenshot excluding our window
+        self.status("Taking screenshot for OCR...")
+
+        base64_image = self.screenshot_capture.capture_and_encode(
+            exclude_window_title=self.window_title,
+            resize=True,
+            min_text_px=self.legible_text_px(),
+            format='PNG'
+        )
+
+        if not base64_image:
+            self.status("Failed to capture screenshot for OCR")
+            self.logger.error("Failed to capture or encode screenshot for OCR")
+            return None
+
+        self.status("Screenshot captured - extracting text with Gemini OCR...")
+        self.logger.info("Screenshot captured for OCR successfully")
+
+        # Extract text content using Gemini OCR
+        response_mode = self.config.get('response_mode', 'short')
+        extracted_text = self.gemini_client.extract_text_content(base64_image, response_mode)
+
+        self.emit('answer', source="OCR Screen", question="Text Extraction", answer=extracted_text)
+        self.status("OCR extraction complete")
+        return extracted_text
+
+    def answer_screen(self, base64_image, model_key, on_answer, response_mode=None):
+        """
+        Answer a screenshot from its OCR text when it reads cleanly, otherwise with
+        the vision model (blocking). With segment_questions enabled, a screen holding
+        several questions is answered with one concurrent request per question and
+        on_answer(label, answer, from_text) is called in question order as soon as
+        each answer and those before it are in; otherwise it is called once with
+        label None.
+        """
+        ocr = self.screen_ocr(base64_image)
+        from_text = self.is_screen_text_reliable(ocr)
+        if from_text or self.config.get('ocr_first_enabled', False):
+            with self.stats_lock:
+                self.ocr_first_stats['ocr' if from_text else 'vision'] += 1
+
+        segments = segment_lines(ocr['lines']) if ocr and self.config.get('segment_questions', False) else []
+        if len(segments) < 2:
+            if from_text:
+                answer = self.answer_question(SCREEN_TEXT_PROMPT.format(text=ocr['text']), response_mode)
+            else:
+                answer = self.analyze_image(base64_image, model_key, response_mode)
+            on_answer(None, answer, from_text)
+            return
+
+        self.logger.info(f"Screen split into {len(segments)} questions: {', '.join(segment['label'] for segment in segments)}")
+        futures = []
+        for segment in segments:
+            if from_text:
+                futures.append(self.segment_pool.submit(
+                    self.answer_question, SCREEN_TEXT_PROMPT.format(text=segment['text']), response_mode))
+            else:
+                crop = crop_segment(base64_image, segment['top'], segment['bottom'])
+                futures.append(self.segment_pool.submit(
+                    self.analyze_image, crop, model_key, response_mode, self.config.get('segment_max_tokens', 2000)))
+
+        for segment, future in zip(segments, futures):
+            try:
+                answer = future.result()
+            except Exception as e:
+                self.logger.error(f"{segment['label']} analysis error: {e}")
+                answer = f"Error: {e}"
+            on_answer(segment['label'], answer, from_text)
+
+    def screen_ocr(self, base64_image):
+        """Tesseract reading of a screenshot if OCR-first or segmentation needs it, else None"""
+        if not (self.config.get('ocr_first_enabled', False) or self.config.get('segment_questions', False)):
+            return None
+        if not self.ocr_capture.tesseract_available:
+            return None
+        return self.ocr_capture.read_image_text(base64_image)
+
+    def is_screen_text_reliable(self, ocr):
+        """Whether OCR-first may answer from the screen text instead of the vision model"""
+        # A custom image prompt asks about the picture itself, which text alone cannot answer
+        if ocr is None or not self.config.get('ocr_first_enabled', False) or self._custom_image_prompt():
+            return False
+
+        summary = (f"{ocr['words']} words, confidence {ocr['confidence']:.0f}, "
+                   f"diagram ratio {ocr['diagram_ratio']:.2f}")
+        if ocr['diagram_ratio'] > self.config.get('ocr_first_max_diagram', 0.4):
+            self.logger.info(f"OCR-first: diagram detected, using vision ({summary})")
+            return False
+        if ocr['words'] < self.config.get('ocr_first_min_words', 5) or not ocr['text']:
+            self.logger.info(f"OCR-first: too little text, using vision ({summary})")
+            return False
+        if ocr['confidence'] < self.config.get('ocr_first_min_confidence', 75):
+            self.logger.info(f"OCR-first: low confidence, using vision ({summary})")
+            return False
+
+        self.logger.info(f"OCR-first: answering from screen text ({summary})")
+        return True
+
+    def legible_text_px(self):
+        """Text height screenshots are sized for, or None for the fixed 1024px cap"""
+        if not self.config.get('legibility_resize', True):
+            return None
+        return self.config.get('legibility_min_text_px', 10)
+
+    def analyze_image(self, base64_image, model_key, response_mode=None, max_tokens=None):
+        """Send an image to the provider for model_key (blocking)"""
+        response_mode = response_mode or self.config.get('response_mode', 'short')
+        key = self.image_cache_key(base64_image, model_key, response_mode)
+        return self.cache.get_or_compute(key, lambda: self._analyze_image(base64_image, model_key, response_mode, max_tokens))
+
+    def image_cache_key(self, base64_image, model_key, response_mode):
+        """Cache key for an image analyzed with model_key"""
+        return ResponseCache.make_key('image', (model_key, self._custom_image_prompt()), response_mode, base64_image)
+
+    def _custom_image_prompt(self):
+        """Custom image prompt if enabled, else None"""
+        if self.config.get('use_custom_prompt', False):
+            return self.config.get('custom_image_prompt')
+        return None
+
+    def analyze_image_fallback(self, base64_image, response_mode=None):
+        """Analyze an image with Gemini if configured, otherwise the OpenAI client (blocking)"""
+        response_mode = response_mode or self.config.get('response_mode', 'short')
+        key = ResponseCache.make_key('image', None, response_mode, base64_image)
+
+        def compute():
+            # Try Gemini first for image analysis, fallback to OpenAI
+            if self.gemini_client.api_key:
+                return self.gemini_client.analyze_image(base64_image, response_mode)
+            return self.llm_client.analyze_image(base64_image, response_mode)
+
+        return self.cache.get_or_compute(key, compute)
+
+    def _analyze_image(self, base64_image, model_key, response_mode, max_tokens=None):
+        """Dispatch an image to the provider for model_key"""
+        if model_key.startswith('openai'):
+            return self._analyze_with_openai(base64_image, model_key, response_mode, max_tokens)
+        elif model_key.startswith('gemini'):
+            return self._analyze_with_gemini(base64_image, response_mode)
+        return "Error: Unsupported model selected."
+
+    def start_live_screen(self):
+        """Start live screen scanning"""
+        if self.live_screen_running:
+            return True
+
+        _, model_key = self.get_selected_image_model()
+        key_error = self.check_api_key(model_key)
+        if key_error:
+            self.status(f"Error: {key_error}")
+            return False
+
+        self.live_screen_running = True
+        self.last_live_thumbnail = None
+        if self.config.get('live_screen_adaptive', True):
+            self.live_screen_controller = AdaptiveIntervalController(
+                interval=self.config.get('live_screen_interval', 5),
+                min_interval=self.config.get('live_screen_min_interval', 2),
+                max_interval=self.config.get('live_screen_max_interval', 30)
+            )
+            interval_fn = self.live_screen_controller.next_interval
+        else:
+            self.live_screen_controller = None
+            interval_fn = lambda: self.config.get('live_screen_interval', 5)
+
+        self.live_screen_scheduler = LiveScreenScheduler(
+            capture=self.capture_live_frame,
+            analyze=self.analyze_live_frame,
+            interval_fn=interval_fn,
+            max_in_flight=self.config.get('live_screen_max_in_flight', 1)
+        )
+        self.live_screen_scheduler.start()
+
+        self.config['live_screen_enabled'] = True
+        self.save_config()
+        self.emit('live_screen_state', running=True)
+        self.status("Live screen scanning started")
+        self.logger.info("Live screen scanning started")
+        return True
+
+    def stop_live_screen(self):
+        """Stop live screen scanning"""
+        if not self.live_screen_running:
+            return
+
+        self.live_screen_running = False
+        self.live_screen_scheduler.stop()
+        self.last_live_thumbnail = None
+        self.config['live_screen_enabled'] = False
+        self.save_config()
+        self.emit('live_screen_state', running=False)
+        self.status("Live screen scanning stopped")
+        self.logger.info("Live screen scanning stopped")
+
+    def capture_live_frame(self):
+        """Capture one live screen frame for the selected image model"""
+        if not self.running:
+            return None
+
+        # Get selected model info
+        selected_model, model_key = self.get_selected_image_model()
+
+        # Capture screenshot excluding our window
+        base64_image = self.screenshot_capture.capture_and_encode(
+            exclude_window_title=self.window_title,
+            resize=True,
+            min_text_px=self.legible_text_px(),
+            format='JPEG' if model_key.startswith('openai') else 'PNG'
+        )
+
+        if not base64_image:
+            self.logger.error("Failed to capture live screen")
+            return None
+
+        self.logger.info(f"Live screen captured successfully for {selected_model}")
+        self.emit('screenshot', image=base64_image)
+
+        if self.live_screen_controller:
+            try:
+                thumbnail = frame_thumbnail(base64_image)
+                # The first frame of a run has nothing to compare with; it is not a change
+                if self.last_live_thumbnail is not None:
+                    self.live_screen_controller.observe_frame(frame_change(self.last_live_thumbnail, thumbnail))
+                self.last_live_thumbnail = thumbnail
+            except Exception as e:
+                self.logger.error(f"Live screen change detection error: {e}")
+
+        return selected_model, model_key, base64_image
+
+    def analyze_live_frame(self, frame):
+        """Analyze a live screen frame and emit meaningful answers"""
+        selected_model, model_key, base64_image = frame
+
+        def on_answer(label, answer, from_text):
+            if self.live_screen_controller:
+                self.live_screen_controller.observe_result(is_rate_limit_answer(answer))
+
+            # Only display if there's meaningful content (not just "I can see..." responses)
+            if self.is_meaningful_response(answer):
+                question = f"{selected_model} {label}" if label else f"{selected_model} Analysis"
+                self.emit('answer', source="Live Screen", question=question, answer=answer)
+
+        self.answer_screen(base64_image, model_key, on_answer)
+
+    def is_meaningful_response(self, response):
+        """Check if the response contains meaningful content worth displaying"""
+        if not response or len(response.strip()) < 20:
+            return False
+
+        # Skip generic responses that don't contain questions or useful information
+        generic_phrases = [
+            "i can see",
+            "this appears to be",
+            "the image shows",
+            "i don't see any questions",
+            "no questions visible",
+            "no text visible",
+            "unable to identify",
+            "cannot see any"
+        ]
+
+        response_lower = response.lower()
+
+        # If it's mostly generic phrases, skip it
+        if any(phrase in response_lower for phrase in generic_phrases) and len(response) < 100:
+            return False
+
+        # Look for question indicators or mathematical content
+        question_indicators = ['?', 'what', 'how', 'why', 'when', 'where', 'which', 'who', 'calculate', 'solve', 'find', '=', '+', '-', '*', '/', 'answer']
+
+        return any(indicator in response_lower for indicator in question_indicators)
+
+    # -- providers -------------------------------------------------------
+
+    def build_openai_vision_request(self, base64_image, model_key, response_mode, max_tokens=None):
+        """Chat completion body for an OpenAI vision request (also used for provider batch files)"""
+        # Map model keys to actual OpenAI model names
+        openai_models = {
+            'openai_gpt4o': 'gpt-4o',
+            'openai_gpt4o_mini': 'gpt-4o-mini',
+            'openai_gpt4_turbo': 'gpt-4-turbo'
+        }
+
+        model_name = openai_models.get(model_key, 'gpt-4o')
+
+        # Use custom prompt only if checkbox is enabled, otherwise use hardcoded prompt
+        if self.config.get('use_custom_prompt', False):
+            instructions = self.config.get('custom_image_prompt', "What's in this image? Please analyze and describe what you see.")
+        else:
+            # Use hardcoded prompt from prompt.txt (cached; re-read only when the file changes)
+            base_prompt = prompts.read('prompt.txt', "What's in this image? Please analyze and describe what you see.")
+            instructions = vision_instructions(base_prompt, response_mode)
+
+        try:
+            width, height = image_size(base64_image)
+            detail = choose_detail(width, height, self.config.get('vision_detail', 'auto'))
+            tile_scale, boxes = plan_tiles(width, height, self.config.get('vision_max_tiles', 4))
+        except Exception:
+            detail, tile_scale, boxes = 'high', 1.0, []
+
+        if len(boxes) > 1:
+            # The provider would shrink the whole image below legibility; send overlapping tiles instead
+            content = [{"type": "text", "text": f"The screen is split into {len(boxes)} overlapping tiles, "
+                                                "left to right, top to bottom."}]
+            content += [{"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{tile}", "detail": "high"}}
+                        for tile in crop_tiles(base64_image, boxes, tile_scale)]
+        else:
+            content = [{"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}", "detail": detail}}]
+
+        # Static instructions first so consecutive requests share a cacheable prefix
+        payload = {
+            "model": model_name,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": instructions
+                },
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ],
+            "max_tokens": max_tokens or (10000 if response_mode == 'detailed' else 1000)
+        }
+        return payload
+
+    def _analyze_with_openai(self, base64_image, model_key, response_mode, max_tokens=None):
+        """Analyze image with OpenAI Vision API"""
+        try:
+            import requests
+
+            # Budget from past answers of this kind, capped at the fixed (or segment) limit
+            ceiling = max_tokens or (10000 if response_mode == 'detailed' else 1000)
+            kind = f"vision:{'segment' if max_tokens else 'screen'}:{response_mode}"
+            payload = self.build_openai_vision_request(base64_image, model_key, response_mode,
+                                                       request_sizer.max_tokens(kind, ceiling))
+            model_name = payload['model']
+
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.config.get('openai_api_key')}"
+            }
+
+            base_url = (self.config.get('openai_base_url') or "https://api.openai.com/v1").rstrip('/')
+
+            def post(body):
+                request_start = time.perf_counter()
+                with profiler.span('llm_request', provider='openai', model=model_name):
+                    # Image data is streamed from the payload rather than copied by json=
+                    response = requests.post(
+                        f"{base_url}/chat/completions",
+                        headers=headers,
+                        data=StreamedJSONBody(body),
+                        timeout=30
+                    )
+                # Time to response headers - the closest thing to first token without streaming
+                profiler.record('first_token', request_start, response.elapsed.total_seconds(), provider='openai')
+                return response
+
+            response = post(payload)
+            if response.status_code == 200:
+                result = response.json()
+                choice = result['choices'][0]
+                if request_sizer.observe(kind, payload['max_tokens'], ceiling,
+                                         (result.get('usage') or {}).get('completion_tokens'),
+                                         choice.get('finish_reason'), estimate_request_tokens(payload)):
+                    # Cut off by the adaptive budget; ask again with the full one
+                    response = post({**payload, 'max_tokens': ceiling})
+
+            if response.status_code == 200:
+                result = response.json()
+                prompt_cache_stats.record_openai('openai', result.get('usage'))
+                return result['choices'][0]['message']['content']
+            else:
+                error_msg = f"OpenAI API error: {response.status_code}"
+                try:
+                    error_detail = response.json().get('error', {}).get('message', 'Unknown error')
+                    error_msg += f" - {error_detail}"
+                except:
+                    pass
+                return f"Error: {error_msg}"
+
+        except Exception as e:
+            return f"OpenAI analysis error: {str(e)}"
+
+    def _analyze_with_gemini(self, base64_image, response_mode):
+        """Analyze image with Gemini Vision API"""
+        try:
+            # Use custom prompt only if checkbox is enabled
+            custom_prompt = None
+            if self.config.get('use_custom_prompt', False):
+                custom_prompt = self.config.get('custom_image_prompt')
+            return self.gemini_client.analyze_image(base64_image, response_mode, custom_prompt)
+        except Exception as e:
+            return f"Gemini analysis error: {str(e)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Exam Helper engine without a GUI")
+    parser.add_argument('questions', nargs='*', help="Questions to answer, then exit")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--daemon', action='store_true', help="Keep running; read questions from stdin, one per line")
+    parser.add_argument('--audio', action='store_true', help="Listen for spoken questions")
+    parser.add_argument('--live-screen', action='store_true', help="Analyze the screen continuously")
+    parser.add_argument('--capture', action='store_true', help="Analyze the screen once, then exit")
+    parser.add_argument('--json', action='store_true', help="Print events as JSON lines")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler('exam_helper.log'), logging.StreamHandler(sys.stderr)])
+
+    config = load_config(args.config)
+    # The CLI decides what runs; never persist its choices over the GUI's config
+    config['audio_enabled'] = args.audio
+    config['live_screen_enabled'] = args.live_screen
+    profiler.enabled = config.get('profiling_enabled', True)
+
+    engine = ExamEngine(config)
+    # Request ids answered (or failed); capture results, screen segments and status errors carry none
+    finished = threading.Condition()
+    done_ids = set()
+
+    def print_event(event, **data):
+        if args.json:
+            if event != 'screenshot':
+                print(json.dumps({'event': event, **data}), flush=True)
+        elif event == 'answer':
+            print(f"[{data['source']}] {data['question']}\n{data['answer']}\n{'-' * 50}", flush=True)
+        elif event == 'transcription':
+            print(f"Transcription: {data['text']}", flush=True)
+
+    engine.subscribe('*', print_event)
+
+    def mark_done(request_id=None, **data):
+        if request_id is not None:
+            with finished:
+                done_ids.add(request_id)
+                finished.notify_all()
+
+    engine.subscribe('answer', mark_done)
+    engine.subscribe('error', mark_done)
+    engine.start(warm_up=args.daemon or args.audio or args.live_screen)
+
+    try:
+        if args.capture:
+            engine.capture_screen()
+
+        submitted = {engine.submit_question('CLI', question) for question in args.questions}
+
+        if args.daemon:
+            for line in sys.stdin:
+                if line.strip():
+                    submitted.add(engine.submit_question('CLI', line.strip()))
+        elif args.audio or args.live_screen:
+            while True:
+                time.sleep(1)
+
+        # Wait for every submitted question before exiting
+        with finished:
+            finished.wait_for(lambda: submitted <= done_ids)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
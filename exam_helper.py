@@ -1,64 +1,86 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
-import queue
 import time
 import json
 import os
 from datetime import datetime
 import logging
-import numpy as np
 import base64
 import io
 from PIL import Image
 
-# Import modules for different functionalities
-from ocr_module import OCRCapture
-from audio_module import AudioCapture
-from llm_module import LLMClient
+# Import modules for different functionalities. Heavy subsystems (OCR, audio,
+# AI SDKs) are registered with the component registry and imported lazily.
 from stealth_module import StealthWindow
-from screenshot_module import ScreenshotCapture
-from gemini_module import GeminiClient
-from perplexity_module import PerplexityClient
+from history_module import AnswerHistory
+from dispatcher_module import UIDispatcher
+from profiler_module import profiler
+from engine_module import ExamEngine, DEFAULT_CONFIG, IMAGE_MODELS, AUDIO_MODELS
+from config_module import ConfigStore
+from singleflight_module import SingleFlight
 
 class ExamHelper:
     def __init__(self):
         self.setup_logging()
         self.load_config()
         
-        # Initialize components
-        self.ocr_capture = OCRCapture()
-        self.audio_capture = AudioCapture()
-        self.screenshot_capture = ScreenshotCapture()
-        self.llm_client = LLMClient(self.config.get('openai_api_key', ''), self.config.get('openai_model', 'gpt-3.5-turbo'))
-        self.gemini_client = GeminiClient(self.config.get('gemini_api_key', ''))
-        self.perplexity_client = PerplexityClient(self.config.get('perplexity_api_key', ''))
-        
-        # Threading and queues
-        self.question_queue = queue.Queue()
-        self.answer_queue = queue.Queue()
-        self.running = True
+        # Capture/recognize/answer pipeline; this window is one of its subscribers.
+        # Components are built on first use or by the engine's warm-up thread.
+        self.engine = ExamEngine(self.config, save_config=self.save_config)
+        self.components = self.engine.components
+        profiler.enabled = self.config.get('profiling_enabled', True)
         
         # Store last AI response for copying
         self.last_ai_response = ""
         
-        # Thread control flags
-        self.ocr_running = False
-        self.audio_running = False
-        self.live_screen_running = False
-        self.last_ai_response = ""  # Store the last AI response for copying
-        self.ocr_thread = None
-        self.audio_thread = None
-        self.live_screen_thread = None
+        # Bounded answer history; the pane only renders the newest entries
+        self.answer_history = AnswerHistory(
+            max_entries=self.config.get('answer_history_limit', 200),
+            log_path='answer_history.jsonl'
+        )
+        self.rendered_entry_ids = []
+        
+        # Hotkey/button actions that must not overlap (capture, OCR)
+        self.flights = SingleFlight()
         
         # GUI setup
         self.setup_gui()
+        
+        # Worker threads post GUI updates here; drained once per frame on the Tk thread
+        self.ui = UIDispatcher(self.root, frame_ms=self.config.get('ui_frame_ms', 25))
+        self.ui.start()
+        self.subscribe_to_engine()
         self.setup_stealth()
         self.setup_hotkeys()
         
-        # Start background threads
+        # Start the engine's worker threads and component warm-up
         self.start_background_threads()
         
+    @property
+    def ocr_capture(self):
+        return self.components.get('ocr_capture')
+        
+    @property
+    def audio_capture(self):
+        return self.components.get('audio_capture')
+        
+    @property
+    def screenshot_capture(self):
+        return self.components.get('screenshot_capture')
+        
+    @property
+    def llm_client(self):
+        return self.components.get('llm_client')
+        
+    @property
+    def gemini_client(self):
+        return self.components.get('gemini_client')
+        
+    @property
+    def perplexity_client(self):
+        return self.components.get('perplexity_client')
+        
     def setup_logging(self):
         logging.basicConfig(
             level=logging.INFO,
@@ -71,87 +93,54 @@ class ExamHelper:
         self.logger = logging.getLogger(__name__)
         
     def load_config(self):
-        """Load configuration from config.json"""
-        try:
-            with open('config.json', 'r') as f:
-                self.config = json.load(f)
-        except FileNotFoundError:
-            self.config = {
-                'openai_api_key': '',
-                'gemini_api_key': '',
-                'perplexity_api_key': '',
-                'scan_interval': 3,
-                'live_screen_interval': 5,
-                'audio_enabled': True,
-                'ocr_enabled': True,
-                'live_screen_enabled': False,
-                'response_mode': 'short',  # 'short' or 'detailed'
-                'always_on_top': True,
-                'openai_model': 'gpt-3.5-turbo',
-                'gemini_model': 'gemini-1.5-flash',
-                'working_models': [],
-                'working_gemini_models': [],
-                'selected_image_model': 'OpenAI GPT-4o',  # Default image recognition model
-                'selected_audio_model': 'OpenAI Whisper-1',  # Default audio recognition model
-                'use_custom_prompt': False,  # Whether to use custom prompt or hardcoded prompt
-                'custom_image_prompt': "What's in this image? Please analyze and describe what you see.",  # Default prompt
-                'audio_record_duration': '10s'  # OpenAI audio recording duration
-            }
-            self.save_config()
-            
-    def save_config(self):
-        """Save configuration to config.json"""
-        with open('config.json', 'w') as f:
-            json.dump(self.config, f, indent=2)
-        
-        # Update LLM client with new model if it changed
-        if hasattr(self, 'llm_client') and self.llm_client:
+        """Load configuration from config.json into the in-memory store"""
+        # Saves are debounced and written in the background; hand edits are reloaded
+        self.config_store = ConfigStore('config.json', defaults=DEFAULT_CONFIG)
+        self.config = self.config_store.data
+        self.config_store.watch(on_change=lambda: self.save_config(persist=False))
+            
+    def save_config(self, persist=True):
+        """Save configuration to config.json and apply it to built clients"""
+        if persist:
+            self.config_store.save()
+        
+        # Update LLM client with new model if it changed (an unbuilt client picks up the config when created)
+        llm_ready = hasattr(self, 'components') and self.components.is_ready('llm_client')
+        if llm_ready:
             new_model = self.config.get('openai_model', 'gpt-3.5-turbo')
             if self.llm_client.get_current_model() != new_model:
                 self.llm_client.set_model(new_model)
                 self.logger.info(f"Updated LLM model to: {new_model}")
                 
-                # Update model label in GUI
-                if hasattr(self, 'model_label'):
-                    self.model_label.config(text=f"🤖 {new_model}")
+                # Update model label in GUI (save_config also runs on engine threads)
+                if hasattr(self, 'model_label') and hasattr(self, 'ui'):
+                    self.ui.post(self.model_label.config, text=f"🤖 {new_model}", key='model_label')
         
         # Update API key if it changed
-        if hasattr(self, 'llm_client') and self.llm_client:
+        if llm_ready:
             new_api_key = self.config.get('openai_api_key', '')
             if self.llm_client.api_key != new_api_key:
                 self.llm_client.api_key = new_api_key
                 if new_api_key:
                     from openai import OpenAI
-                    self.llm_client.client = OpenAI(api_key=new_api_key)
+                    self.llm_client.client = OpenAI(api_key=new_api_key, base_url=self.llm_client.base_url)
                     # Reset model checking when API key changes
                     self.llm_client.models_checked = False
                     self.llm_client.working_models = []
                 else:
                     self.llm_client.client = None
         
-        # Refresh response model dropdown if working models changed
-        self.refresh_response_model_dropdown()
+        # Refresh response model dropdown only if working models changed
+        working_models = tuple(self.config.get('working_models', []))
+        if working_models != getattr(self, 'dropdown_working_models', None) and hasattr(self, 'ui'):
+            self.dropdown_working_models = working_models
+            self.ui.post(self.refresh_response_model_dropdown, key='response_model_dropdown')
     
     def refresh_response_model_dropdown(self):
         """Refresh the response model dropdown with updated working models"""
         if hasattr(self, 'response_model_combo'):
             # Update response models with new working models
-            self.response_models = {}
-            
-            # Add OpenAI models from config
-            working_models = self.config.get('working_models', [])
-            if not working_models:
-                working_models = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-turbo', 'gpt-4o', 'gpt-4o-mini']
-            
-            for model in working_models:
-                self.response_models[f"OpenAI {model}"] = f"openai_{model}"
-            
-            # Add Gemini models
-            gemini_models = {
-                'Gemini 1.5 Flash': 'gemini_flash',
-                'Gemini 1.5 Pro': 'gemini_pro'
-            }
-            self.response_models.update(gemini_models)
+            self.response_models = self.engine.get_response_models()
             
             # Update dropdown values
             self.response_model_combo['values'] = list(self.response_models.keys())
@@ -425,13 +414,7 @@ class ExamHelper:
         image_model_label.pack(anchor=tk.W, pady=(0, 5))
         
         # Available image models
-        self.image_models = {
-            'OpenAI GPT-4o': 'openai_gpt4o',
-            'OpenAI GPT-4o-mini': 'openai_gpt4o_mini', 
-            'OpenAI GPT-4 Turbo': 'openai_gpt4_turbo',
-            'Gemini Pro Vision': 'gemini_pro_vision',
-            'Gemini Flash': 'gemini_flash'
-        }
+        self.image_models = dict(IMAGE_MODELS)
         
         # Create styled combobox
         self.setup_model_selector_style()
@@ -469,13 +452,7 @@ class ExamHelper:
         audio_model_label.pack(anchor=tk.W, pady=(0, 5))
         
         # Available audio models
-        self.audio_models = {
-            'OpenAI Whisper-1': 'openai_whisper1',
-            'OpenAI GPT-4o-transcribe': 'openai_gpt4o_transcribe',
-            'OpenAI GPT-4o-mini-transcribe': 'openai_gpt4o_mini_transcribe',
-            'Gemini 2.5 Pro': 'gemini_2_5_pro',
-            'Gemini 2.5 Flash': 'gemini_2_5_flash'
-        }
+        self.audio_models = dict(AUDIO_MODELS)
         
         audio_combo_frame = tk.Frame(audio_model_frame, bg=self.colors['bg_secondary'])
         audio_combo_frame.pack(fill=tk.X)
@@ -510,32 +487,12 @@ class ExamHelper:
         response_model_label.pack(anchor=tk.W, pady=(0, 5))
         
         # Available response models (OpenAI + Gemini)
-        self.response_models = {}
-        
-        # Add OpenAI models from config
-        working_models = self.config.get('working_models', [])
-        if not working_models:
-            working_models = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-turbo', 'gpt-4o', 'gpt-4o-mini']
-        
-        for model in working_models:
-            self.response_models[f"OpenAI {model}"] = f"openai_{model}"
-        
-        # Add Gemini models
-        gemini_models = {
-            'Gemini 1.5 Flash': 'gemini_flash',
-            'Gemini 1.5 Pro': 'gemini_pro'
-        }
-        self.response_models.update(gemini_models)
+        self.response_models = self.engine.get_response_models()
         
         response_combo_frame = tk.Frame(response_model_frame, bg=self.colors['bg_secondary'])
         response_combo_frame.pack(fill=tk.X)
         
-        self.selected_response_model = tk.StringVar(value=self.config.get('openai_model', 'gpt-4o'))
-        # Convert current model to display format
-        current_model = self.config.get('openai_model', 'gpt-4o')
-        display_model = f"OpenAI {current_model}"
-        if display_model in self.response_models:
-            self.selected_response_model.set(display_model)
+        self.selected_response_model = tk.StringVar(value=self.engine.get_selected_response_model())
         
         self.response_model_combo = ttk.Combobox(
             response_combo_frame,
@@ -716,8 +673,13 @@ class ExamHelper:
             self.copy_last_response()
             return "break"
         
+        def _on_search_shortcut(event):
+            self.open_history_search()
+            return "break"
+        
         self.root.bind("<Control-l>", _on_clear_shortcut)
         self.root.bind("<Control-Shift-C>", _on_copy_shortcut)
+        self.root.bind("<Control-f>", _on_search_shortcut)
         
         # Modern submit button
         submit_btn = tk.Button(input_section, text="🚀 Submit Question", 
@@ -778,6 +740,21 @@ class ExamHelper:
                             command=self.copy_last_response)
         copy_btn.pack(side=tk.RIGHT, padx=(5, 0))
         
+        # Search button for the full answer history
+        search_btn = tk.Button(response_header_frame, text="🔍 Search", 
+                              font=('Segoe UI', 9),
+                              fg=self.colors['text_primary'],
+                              bg=self.colors['bg_tertiary'],
+                              activebackground=self.colors['accent'],
+                              activeforeground='white',
+                              relief='flat',
+                              bd=0,
+                              padx=8,
+                              pady=4,
+                              cursor='hand2',
+                              command=self.open_history_search)
+        search_btn.pack(side=tk.RIGHT, padx=(5, 0))
+        
         # Modern scrolled text with dark theme
         display_container = tk.Frame(answer_section, bg=self.colors['bg_tertiary'], relief='flat', bd=0)
         display_container.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 12))
@@ -838,6 +815,8 @@ class ExamHelper:
                             "Clear all AI responses\nShortcut: Ctrl+L\nRequires confirmation")
         create_button_effects(copy_btn, '#28a745', '#218838', 
                             "Copy last AI response\nShortcut: Ctrl+Shift+C")
+        create_button_effects(search_btn, self.colors['bg_tertiary'], self.colors['accent'], 
+                            "Search all AI responses\nShortcut: Ctrl+F")
         
         text_frame.pack(fill=tk.BOTH, expand=True, padx=2, pady=2)
         
@@ -1059,17 +1038,19 @@ class ExamHelper:
         """Setup global hotkeys"""
         from pynput import keyboard
         
+        # Hotkeys fire on the listener thread; run their handlers on the Tk thread.
+        # Keyed posts also merge key-repeat presses that land in the same frame.
         def on_hide_hotkey():
-            self.toggle_visibility()
+            self.ui.post(self.toggle_visibility, key='hotkey_hide')
             
         def on_capture_hotkey():
-            self.capture_screen_now()
+            self.ui.post(self.capture_screen_with_selected_model, key='hotkey_capture')
             
         def on_live_screen_hotkey():
-            self.toggle_live_screen()
+            self.ui.post(self.toggle_live_screen, key='hotkey_live_screen')
             
         def on_ocr_screen_hotkey():
-            self.ocr_screen_now()
+            self.ui.post(self.ocr_screen_now, key='hotkey_ocr')
             
         # Register hotkeys
         self.hotkey_listener = keyboard.GlobalHotKeys({
@@ -1080,124 +1061,57 @@ class ExamHelper:
         })
         self.hotkey_listener.start()
         
+    def subscribe_to_engine(self):
+        """Render engine events; they arrive on worker threads and are posted to the Tk thread"""
+        self.engine.window_title = self.root.title()
+        self.engine.subscribe('status', lambda text: self.post_status(text))
+        self.engine.subscribe('answer', self._on_engine_answer)
+        self.engine.subscribe('transcription', lambda text: self.ui.post(self._show_transcription_in_input, text))
+        self.engine.subscribe('screenshot', lambda image: self.ui.post(self.copy_image_to_clipboard, image))
+        self.engine.subscribe('audio_state', lambda running, loading: self.ui.post(self._on_audio_state, running, loading, key='audio_state'))
+        self.engine.subscribe('live_screen_state', lambda running: self.ui.post(self._on_live_screen_state, running, key='live_screen_state'))
+        
+    def _on_engine_answer(self, source, question, answer, duplicate_of=None, **_):
+        """Display an answer; spoken or API duplicates of a question already shown only update the status"""
+        if duplicate_of is not None and source != 'Manual':
+            self.post_status(f"{source} question already answered above")
+            return
+        self.ui.post(self.display_answer, source, question, answer)
+
     def start_background_threads(self):
         """Start background scanning threads"""
-        # Always start answer processing thread
-        answer_thread = threading.Thread(target=self.process_answers, daemon=True)
-        answer_thread.start()
-        
-        # Initialize button states based on config
-        if self.config.get('audio_enabled', True):
-            self.start_audio_scanning()
-        else:
-            self.audio_btn.config(text="Enable Audio")
-            self.audio_status_label.config(text="Audio: Off", foreground='red')
-            
-        # Initialize live screen based on config (default off for safety)
-        if self.config.get('live_screen_enabled', False):
-            self.start_live_screen()
-        else:
-            self.live_screen_btn.config(text="🔴 Live Screen")
-            self.live_screen_status_label.config(text="Live: Off", foreground='red')
+        # Answer processing, audio/live screen per config and component warm-up
+        self.engine.start()
+
+        # Optional local API so other tools share this engine's queue and cache
+        self.api_server = None
+        if self.config.get('api_server_enabled', False):
+            self.start_api_server()
         
         # Initialize model statuses
         self.on_image_model_change()
         self.on_response_model_change()
         
+    def start_api_server(self):
+        """Serve the engine over the local HTTP API"""
+        try:
+            from api_server_module import ExamApiServer
+            self.api_server = ExamApiServer(
+                self.engine,
+                port=self.config.get('api_server_port', 8766),
+                max_pending=self.config.get('api_max_pending', 32),
+                token=self.config.get('api_token', '')
+            )
+            self.api_server.start()
+        except Exception as e:
+            self.logger.error(f"Failed to start local API server: {e}")
+            self.api_server = None
 
-    def audio_scan_loop(self):
-        """Lightweight speech processing loop - only processes queued speech"""
-        self.logger.info("Speech processing loop started")
-        
-        while self.running and self.audio_running:
-            try:
-                # Get speech from queue (non-blocking)
-                audio_data = self.audio_capture.get_speech_from_queue()
-                if audio_data:
-                    # Process speech in this thread (not audio capture thread)
-                    question = self.audio_capture.process_speech_audio(audio_data)
-                    if question and self.is_likely_question(question):
-                        self.question_queue.put(('Audio', question))
-                        self.logger.info(f"Audio Question detected: {question[:50]}...")
-                    
-            except Exception as e:
-                self.logger.error(f"Speech processing error: {e}")
-                
-            # Sleep longer since we're just checking a queue
-            time.sleep(0.2)
-            
-    def is_likely_question(self, text):
-        """Simple heuristic to determine if text is likely a question"""
-        question_indicators = ['?', 'what', 'how', 'why', 'when', 'where', 'which', 'who']
-        text_lower = text.lower()
-        
-        # Check for question mark or question words
-        return ('?' in text or 
-                any(indicator in text_lower for indicator in question_indicators) and
-                len(text.split()) > 3)  # Minimum word count
-                
-    def process_answers(self):
-        """Process questions and get answers from LLM"""
-        while self.running:
-            try:
-                if not self.question_queue.empty():
-                    item = self.question_queue.get()
-                    
-                    # Handle different types of queue items
-                    if len(item) == 2:
-                        source, question = item
-                        # Update status
-                        self.root.after(0, lambda: self.update_status("Processing question..."))
-                        
-                        # Get answer from selected response model
-                        response_mode = self.config.get('response_mode', 'short')
-                        selected_model = self.selected_response_model.get()
-                        model_key = self.response_models.get(selected_model)
-                        
-                        if model_key and model_key.startswith('openai') and self.llm_client.client:
-                            answer = self.llm_client.get_answer(question, response_mode)
-                        elif model_key and model_key.startswith('gemini') and self.gemini_client.api_key:
-                            answer = self.gemini_client.get_text_answer(question, response_mode)
-                        else:
-                            # Fallback logic
-                            if self.llm_client.client:
-                                answer = self.llm_client.get_answer(question, response_mode)
-                            elif self.gemini_client.api_key:
-                                answer = self.gemini_client.get_text_answer(question, response_mode)
-                            else:
-                                answer = self.perplexity_client.get_text_answer(question, response_mode)
-                        
-                        # Display answer
-                        self.root.after(0, lambda: self.display_answer(source, question, answer))
-                        self.root.after(0, lambda: self.update_status("Ready"))
-                    
-                    elif len(item) == 3:
-                        # Handle image-based processing (source, type, data)
-                        source, item_type, data = item
-                        if item_type == 'image':
-                            self.root.after(0, lambda: self.update_status("Processing image..."))
-                            
-                            response_mode = self.config.get('response_mode', 'short')
-                            # Try Gemini first for image analysis, fallback to OpenAI
-                            if self.gemini_client.api_key:
-                                answer = self.gemini_client.analyze_image(data, response_mode)
-                            else:
-                                answer = self.llm_client.analyze_image(data, response_mode)
-                            
-                            self.root.after(0, lambda: self.display_answer(source, "Image Analysis", answer))
-                            self.root.after(0, lambda: self.update_status("Ready"))
-                    
-            except Exception as e:
-                self.logger.error(f"Answer processing error: {e}")
-                self.root.after(0, lambda: self.update_status("Error processing question"))
-                
-            time.sleep(0.1)
-            
     def submit_manual_question(self):
         """Submit manually entered question"""
         question = self.manual_input.get("1.0", tk.END).strip()
         if question:
-            self.question_queue.put(('Manual', question))
+            self.engine.submit_question('Manual', question)
             self.manual_input.delete("1.0", tk.END)
             
     def record_audio_with_ai(self):
@@ -1224,86 +1138,12 @@ class ExamHelper:
         recording_thread.start()
         
     def _perform_ai_audio_recording(self):
-        """Perform the actual audio recording and transcription using selected model"""
+        """Record and transcribe; the transcription event fills the input box"""
         try:
-            # Get selected duration and model
-            duration_str = self.config.get('audio_record_duration', '10s')
-            duration = int(duration_str.replace('s', ''))
-            selected_audio_model = self.config.get('selected_audio_model', 'OpenAI Whisper-1')
-            
-            # Check which model is selected and use appropriate transcription
-            if selected_audio_model.startswith('OpenAI'):
-                # Use OpenAI models
-                api_key = self.config.get('openai_api_key')
-                if not api_key:
-                    self.root.after(0, lambda: self.update_status("Error: OpenAI API key not configured"))
-                    return
-                
-                # Map display name to actual model name
-                model_mapping = {
-                    'OpenAI Whisper-1': 'whisper-1',
-                    'OpenAI GPT-4o-transcribe': 'gpt-4o-audio-preview',
-                    'OpenAI GPT-4o-mini-transcribe': 'gpt-4o-mini-audio-preview'
-                }
-                
-                actual_model = model_mapping.get(selected_audio_model, 'gpt-4o-audio-preview')
-                
-                # Use different methods based on model type
-                if selected_audio_model == 'OpenAI Whisper-1':
-                    # Use traditional Whisper API
-                    transcription = self.audio_capture.record_and_transcribe_with_whisper(
-                        duration=duration, 
-                        api_key=api_key,
-                        model='whisper-1'
-                    )
-                else:
-                    # Use GPT-4o audio models
-                    transcription = self.audio_capture.record_and_transcribe_with_openai(
-                        duration=duration, 
-                        api_key=api_key,
-                        model=actual_model,
-                        prompt="Please transcribe this audio accurately. If it sounds like a question, provide the exact question being asked."
-                    )
-                    
-            elif selected_audio_model.startswith('Gemini'):
-                # Use Gemini models
-                api_key = self.config.get('gemini_api_key')
-                if not api_key:
-                    self.root.after(0, lambda: self.update_status("Error: Gemini API key not configured"))
-                    return
-                
-                # Map display name to actual model name
-                model_mapping = {
-                    'Gemini 2.5 Pro': 'gemini-2.5-pro',
-                    'Gemini 2.5 Flash': 'gemini-1.5-flash'
-                }
-                
-                actual_model = model_mapping.get(selected_audio_model, 'gemini-1.5-flash')
-                
-                transcription = self.audio_capture.record_and_transcribe_with_gemini(
-                    duration=duration,
-                    gemini_client=self.gemini_client,
-                    model=actual_model,
-                    prompt="Please transcribe this audio accurately. If it sounds like a question, provide the exact question being asked."
-                )
-            else:
-                self.root.after(0, lambda: self.update_status("Error: Unknown audio model selected"))
-                return
-            
-            if transcription:
-                # Show transcription in the input box for user to modify
-                self.root.after(0, lambda: self._show_transcription_in_input(transcription))
-                self.root.after(0, lambda: self.update_status("Audio transcribed successfully - check input box"))
-            else:
-                self.root.after(0, lambda: self.update_status("Failed to transcribe audio"))
-                
-        except Exception as e:
-            self.logger.error(f"OpenAI audio recording error: {e}")
-            self.root.after(0, lambda: self.update_status("Audio recording failed"))
-            
+            self.engine.transcribe_recording()
         finally:
             # Re-enable button
-            self.root.after(0, lambda: self.audio_record_btn.config(text="🎙️ Record", state='normal'))
+            self.ui.post(self.audio_record_btn.config, text="🎙️ Record", state='normal', key='audio_record_btn')
             
     def _show_transcription_in_input(self, transcription):
         """Show the transcription in the manual input box"""
@@ -1322,23 +1162,50 @@ class ExamHelper:
         # Show a brief notification
         self.update_status("Transcription ready - edit and press Enter to ask")
             
-    def _add_to_answer_display(self, text):
+    def _add_to_answer_display(self, text, tag=None):
         """Helper method to safely add text to read-only answer display"""
         self.answer_display.config(state='normal')
-        self.answer_display.insert(tk.END, text)
+        if tag:
+            self.answer_display.insert(tk.END, text, (tag,))
+        else:
+            self.answer_display.insert(tk.END, text)
+        self._trim_answer_display()
         self.answer_display.see(tk.END)
         self.answer_display.config(state='disabled')
+        
+    def _trim_answer_display(self):
+        """Remove the oldest rendered entries beyond the display limit"""
+        display_limit = max(1, int(self.config.get('answer_display_limit', 30)))
+        while len(self.rendered_entry_ids) > display_limit:
+            tag = f"entry_{self.rendered_entry_ids.pop(0)}"
+            ranges = self.answer_display.tag_ranges(tag)
+            if ranges:
+                self.answer_display.delete(ranges[0], ranges[-1])
+            self.answer_display.tag_delete(tag)
+    
+    def format_history_entry(self, entry):
+        """Format a history entry the way the answer pane shows it"""
+        return f"\n[{entry['timestamp']}] {entry['source']} Question:\n{entry['question']}\n\nAnswer:\n{entry['answer']}\n{'-' * 50}\n"
     
     def display_answer(self, source, question, answer):
         """Display answer in the GUI"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        
         # Store the last response for copying
         self.last_ai_response = answer
         
-        # Use helper method to add text safely
-        formatted_text = f"\n[{timestamp}] {source} Question:\n{question}\n\nAnswer:\n{answer}\n{'-' * 50}\n"
-        self._add_to_answer_display(formatted_text)
+        with profiler.span('display', source=source):
+            entry = self.answer_history.add(source, question, answer)
+            self.rendered_entry_ids.append(entry['id'])
+            
+            # Use helper method to add text safely
+            self._add_to_answer_display(self.format_history_entry(entry), tag=f"entry_{entry['id']}")
+        
+    def open_history_search(self):
+        """Open the answer history search window"""
+        HistorySearchWindow(self.root, self.answer_history, self.format_history_entry)
+        
+    def post_status(self, status):
+        """Update status label from any thread (merged with other pending status updates)"""
+        self.ui.post(self.update_status, status, key='status')
         
     def update_status(self, status):
         """Update status label with modern styling"""
@@ -1380,55 +1247,31 @@ class ExamHelper:
             
     def toggle_audio_scanning(self):
         """Toggle Audio scanning on/off"""
-        if self.audio_running:
-            self.stop_audio_scanning()
+        if self.engine.audio_running:
+            self.engine.stop_audio_scanning()
         else:
-            self.start_audio_scanning()
-            
-    def start_audio_scanning(self):
-        """Start Audio scanning with proper thread separation"""
-        if not self.audio_running:
-            self.audio_running = True
-            
-            # Start dedicated audio capture thread
-            self.audio_capture.start_audio_monitoring()
-            
-            # Start speech processing thread (lightweight)
-            self.audio_thread = threading.Thread(target=self.audio_scan_loop, daemon=True)
-            self.audio_thread.start()
-            
+            self.engine.start_audio_scanning()
+            
+    def _on_audio_state(self, running, loading):
+        """Reflect the engine's audio state in the GUI"""
+        if loading:
+            # Audio subsystem is still loading; the engine starts it once built
+            self.audio_btn.config(text="🎤 Loading...")
+        elif running:
             # Show visualization and start GUI updates
             self.start_audio_visualization()
-            
             self.audio_btn.config(text="Disable Audio")
             self.audio_status_label.config(text="Audio: On", foreground='green')
-            self.config['audio_enabled'] = True
-            self.save_config()
-            self.update_status("Audio scanning started")
-            self.logger.info("Audio scanning started")
-            
-    def stop_audio_scanning(self):
-        """Stop Audio scanning"""
-        if self.audio_running:
-            self.audio_running = False
-            
-            # Stop audio capture thread first
-            self.audio_capture.stop_audio_monitoring()
-            
+        else:
             # Hide visualization
             self.stop_audio_visualization()
-            
             self.audio_btn.config(text="Enable Audio")
             self.audio_status_label.config(text="Audio: Off", foreground='red')
-            self.config['audio_enabled'] = False
-            self.save_config()
-            self.update_status("Audio scanning stopped")
-            self.logger.info("Audio scanning stopped")
             
     def toggle_live_screen(self):
         """Toggle Live Screen scanning on/off"""
-        if self.live_screen_running:
-            self.stop_live_screen()
+        if self.engine.live_screen_running:
+            self.engine.stop_live_screen()
         else:
             self.start_live_screen()
             
@@ -1438,161 +1281,49 @@ class ExamHelper:
         selected_model = self.selected_image_model.get()
         model_key = self.image_models.get(selected_model)
         
-        if model_key.startswith('openai') and not self.config.get('openai_api_key'):
-            messagebox.showwarning("API Error", "OpenAI API key is not configured.\nPlease set your API key in settings.")
-            return
-        elif model_key.startswith('gemini') and not self.config.get('gemini_api_key'):
-            messagebox.showwarning("API Error", "Gemini API key is not configured.\nPlease set your API key in settings.")
+        key_error = self.engine.check_api_key(model_key)
+        if key_error:
+            messagebox.showwarning("API Error", f"{key_error}\nPlease set your API key in settings.")
             return
             
-        if not self.live_screen_running:
-            self.live_screen_running = True
-            self.live_screen_thread = threading.Thread(target=self.live_screen_loop, daemon=True)
-            self.live_screen_thread.start()
+        self.engine.start_live_screen()
+        
+    def _on_live_screen_state(self, running):
+        """Reflect the engine's live screen state in the GUI"""
+        if running:
             self.live_screen_btn.config(text="⏹️ Stop Live")
             self.live_screen_status_label.config(text="Live: On", foreground='green')
-            self.config['live_screen_enabled'] = True
-            self.save_config()
-            self.update_status("Live screen scanning started")
-            self.logger.info("Live screen scanning started")
-            
-    def stop_live_screen(self):
-        """Stop Live Screen scanning"""
-        if self.live_screen_running:
-            self.live_screen_running = False
+        else:
             self.live_screen_btn.config(text="🔴 Live Screen")
             self.live_screen_status_label.config(text="Live: Off", foreground='red')
-            self.config['live_screen_enabled'] = False
-            self.save_config()
-            self.update_status("Live screen scanning stopped")
-            self.logger.info("Live screen scanning stopped")
-            
-    def live_screen_loop(self):
-        """Continuously capture and analyze screen using selected model"""
-        while self.running and self.live_screen_running:
-            try:
-                # Get selected model info
-                selected_model = self.selected_image_model.get()
-                model_key = self.image_models.get(selected_model)
-                
-                # Capture screenshot excluding our window
-                base64_image = self.screenshot_capture.capture_and_encode(
-                    exclude_window_title=self.root.title(),
-                    resize=True,
-                    format='JPEG' if model_key.startswith('openai') else 'PNG'
-                )
-                
-                if base64_image:
-                    self.logger.info(f"Live screen captured successfully for {selected_model}")
-                    
-                    # Copy screenshot to clipboard
-                    self.root.after(0, lambda img=base64_image: self.copy_image_to_clipboard(img))
-                    
-                    # Get response mode
-                    response_mode = self.config.get('response_mode', 'short')
-                    
-                    # Send to appropriate API based on selected model
-                    if model_key.startswith('openai'):
-                        answer = self._analyze_with_openai(base64_image, model_key, response_mode)
-                    elif model_key.startswith('gemini'):
-                        answer = self._analyze_with_gemini(base64_image, response_mode)
-                    else:
-                        answer = "Unsupported model selected."
-                    
-                    # Only display if there's meaningful content (not just "I can see..." responses)
-                    if self.is_meaningful_response(answer):
-                        # Display the result
-                        self.root.after(0, lambda: self.display_answer("Live Screen", f"{selected_model} Analysis", answer))
-                    
-                else:
-                    self.logger.error("Failed to capture live screen")
-                    
-            except Exception as e:
-                self.logger.error(f"Live screen capture error: {e}")
-                
-            # Wait before next capture (configurable interval)
-            time.sleep(self.config.get('live_screen_interval', 5))
-            
-    def is_meaningful_response(self, response):
-        """Check if the response contains meaningful content worth displaying"""
-        if not response or len(response.strip()) < 20:
-            return False
-            
-        # Skip generic responses that don't contain questions or useful information
-        generic_phrases = [
-            "i can see",
-            "this appears to be",
-            "the image shows",
-            "i don't see any questions",
-            "no questions visible",
-            "no text visible",
-            "unable to identify",
-            "cannot see any"
-        ]
-        
-        response_lower = response.lower()
-        
-        # If it's mostly generic phrases, skip it
-        if any(phrase in response_lower for phrase in generic_phrases) and len(response) < 100:
-            return False
-            
-        # Look for question indicators or mathematical content
-        question_indicators = ['?', 'what', 'how', 'why', 'when', 'where', 'which', 'who', 'calculate', 'solve', 'find', '=', '+', '-', '*', '/', 'answer']
-        
-        return any(indicator in response_lower for indicator in question_indicators)
-            
-
             
     def ocr_screen_now(self):
         """Capture screen and extract text content using Gemini OCR"""
-        if not self.gemini_client.api_key:
+        if not self.config.get('gemini_api_key'):
             messagebox.showwarning("API Error", "Gemini API key is not configured.\nPlease set your API key in settings.")
             return
             
-        self.update_status("Capturing screen for OCR...")
-        self.ocr_screen_btn.config(text="📝 Processing...", state='disabled')
-        
-        # Run OCR capture in a separate thread to avoid blocking UI
-        ocr_thread = threading.Thread(target=self._perform_ocr_capture, daemon=True)
-        ocr_thread.start()
+        # One OCR request at a time; repeated presses attach to it or queue one follow-up
+        outcome = self.flights.run('ocr', self._perform_ocr_capture)
+        if outcome == 'started':
+            self.update_status("Capturing screen for OCR...")
+            self.ocr_screen_btn.config(text="📝 Processing...", state='disabled')
+        elif outcome == 'queued':
+            self.update_status("OCR in progress - one more capture queued")
         
     def _perform_ocr_capture(self):
         """Perform the actual screenshot capture and Gemini OCR processing"""
+        self.ui.post(self.ocr_screen_btn.config, text="📝 Processing...", state='disabled', key='ocr_screen_btn')
         try:
-            # Capture screenshot excluding our window
-            self.root.after(0, lambda: self.update_status("Taking screenshot for OCR..."))
+            self.engine.ocr_screen()
             
-            base64_image = self.screenshot_capture.capture_and_encode(
-                exclude_window_title=self.root.title(),
-                resize=True,
-                format='PNG'
-            )
-            
-            if base64_image:
-                self.root.after(0, lambda: self.update_status("Screenshot captured - extracting text with Gemini OCR..."))
-                self.logger.info("Screenshot captured for OCR successfully")
-                
-                # Get response mode
-                response_mode = self.config.get('response_mode', 'short')
-                
-                # Extract text content using Gemini OCR
-                extracted_text = self.gemini_client.extract_text_content(base64_image, response_mode)
-                
-                # Display the result
-                self.root.after(0, lambda: self.display_answer("OCR Screen", "Text Extraction", extracted_text))
-                self.root.after(0, lambda: self.update_status("OCR extraction complete"))
-                
-            else:
-                self.root.after(0, lambda: self.update_status("Failed to capture screenshot for OCR"))
-                self.logger.error("Failed to capture or encode screenshot for OCR")
-                
         except Exception as e:
             self.logger.error(f"OCR capture error: {e}")
-            self.root.after(0, lambda: self.update_status("OCR capture failed"))
+            self.post_status("OCR capture failed")
             
         finally:
             # Re-enable the button
-            self.root.after(0, lambda: self.ocr_screen_btn.config(text="📝 OCR Screen", state='normal'))
+            self.ui.post(self.ocr_screen_btn.config, text="📝 OCR Screen", state='normal', key='ocr_screen_btn')
             
     def toggle_always_on_top(self):
         """Toggle always on top setting"""
@@ -1676,7 +1407,8 @@ class ExamHelper:
             # For Gemini models, we might need to update gemini client model
             # This would require updating the gemini_module to support model selection
             
-        # Save config
+        # Save config; the engine answers with the selected model
+        self.config['selected_response_model'] = selected_model
         self.save_config()
         
         # Update the model label in the header
@@ -1731,7 +1463,7 @@ class ExamHelper:
             # Clear canvas
             self.audio_canvas.delete("all")
             
-            if not self.audio_running:
+            if not self.engine.audio_running:
                 return
             
             # Get current RMS and history from audio capture
@@ -1745,6 +1477,9 @@ class ExamHelper:
             # Draw background grid
             self.draw_background_grid()
             
+            # Draw frequency spectrum behind the waveform
+            self.draw_frequency_spectrum()
+            
             # Draw threshold line
             self.draw_threshold_line(threshold, max_rms_seen)
             
@@ -1758,7 +1493,7 @@ class ExamHelper:
             pass  # Ignore visualization errors
         
         # Schedule next update (GUI thread only)
-        if self.audio_running:
+        if self.engine.audio_running:
             self.root.after(100, self.update_audio_visualization)  # Update 10 times per second (less CPU intensive)
     
     def draw_background_grid(self):
@@ -1773,6 +1508,25 @@ class ExamHelper:
             self.audio_canvas.create_line(i, 0, i, self.canvas_height, 
                                        fill='#333333', width=1)
     
+    def draw_frequency_spectrum(self):
+        """Draw log-spaced frequency bands as dim bars behind the waveform"""
+        spectrum = self.audio_capture.get_frequency_spectrum()
+        if not spectrum:
+            return
+        
+        # Available width for spectrum (excluding level bar area)
+        spectrum_width = self.canvas_width - 40
+        bar_width = spectrum_width / len(spectrum)
+        
+        for i, level in enumerate(spectrum):
+            if level <= 0:
+                continue
+            x1 = i * bar_width + 1
+            x2 = (i + 1) * bar_width - 1
+            y1 = self.canvas_height - level * self.canvas_height
+            self.audio_canvas.create_rectangle(x1, y1, x2, self.canvas_height,
+                                           fill='#264d5a', outline='')
+    
     def draw_threshold_line(self, threshold, max_rms_seen):
         """Draw the silence threshold line - same as voice translator"""
         if max_rms_seen > 0:
@@ -1871,205 +1625,34 @@ class ExamHelper:
             messagebox.showwarning("API Error", "Gemini API key is not configured.\nPlease set your API key in settings.")
             return
             
-        self.update_status(f"Capturing screen with {selected_model}...")
-        self.capture_btn.config(text="📸 Processing...", state='disabled')
-        
-        # Run capture in a separate thread to avoid blocking UI
-        capture_thread = threading.Thread(target=self._perform_model_screen_capture, args=(model_key,), daemon=True)
-        capture_thread.start()
+        # One capture+analysis at a time; repeated presses attach to it or queue one follow-up
+        outcome = self.flights.run('capture', self._perform_model_screen_capture, selected_model)
+        if outcome == 'started':
+            self.update_status(f"Capturing screen with {selected_model}...")
+            self.capture_btn.config(text="📸 Processing...", state='disabled')
+        elif outcome == 'queued':
+            self.update_status("Capture in progress - one more capture queued")
     
-    def _perform_model_screen_capture(self, model_key):
+    def _perform_model_screen_capture(self, model_name):
         """Perform the actual screenshot capture and analysis with selected model"""
+        self.ui.post(self.capture_btn.config, text="📸 Processing...", state='disabled', key='capture_btn')
         try:
-            # Capture screenshot excluding our window
-            self.root.after(0, lambda: self.update_status("Taking screenshot..."))
-            
-            base64_image = self.screenshot_capture.capture_and_encode(
-                exclude_window_title=self.root.title(),
-                resize=True,
-                format='JPEG' if model_key.startswith('openai') else 'PNG'
-            )
-            
-            if base64_image:
-                selected_model_name = self.selected_image_model.get()
-                self.root.after(0, lambda: self.update_status(f"Screenshot captured - analyzing with {selected_model_name}..."))
-                self.logger.info(f"Screenshot captured successfully for {selected_model_name}")
-                
-                # Copy screenshot to clipboard
-                self.root.after(0, lambda: self.copy_image_to_clipboard(base64_image))
-                
-                # Get response mode
-                response_mode = self.config.get('response_mode', 'short')
-                
-                # Send to appropriate API based on model
-                if model_key.startswith('openai'):
-                    answer = self._analyze_with_openai(base64_image, model_key, response_mode)
-                elif model_key.startswith('gemini'):
-                    answer = self._analyze_with_gemini(base64_image, response_mode)
-                else:
-                    answer = "Unsupported model selected."
-                
-                # Display the result
-                self.root.after(0, lambda: self.display_answer("Screen Analysis", selected_model_name, answer))
-                self.root.after(0, lambda: self.update_status(f"{selected_model_name} analysis complete"))
-                
-            else:
-                self.root.after(0, lambda: self.update_status("Failed to capture screenshot"))
-                self.logger.error("Failed to capture or encode screenshot")
+            self.engine.capture_screen(model_name)
                 
         except Exception as e:
             self.logger.error(f"Model screen capture error: {e}")
-            self.root.after(0, lambda: self.update_status("Screen capture failed"))
-            self.root.after(0, lambda: messagebox.showerror("Error", f"Failed to analyze screen: {str(e)}"))
+            self.post_status("Screen capture failed")
+            self.ui.post(messagebox.showerror, "Error", f"Failed to analyze screen: {str(e)}")
             
         finally:
             # Re-enable the button
-            self.root.after(0, lambda: self.capture_btn.config(text="📸 Capture Screen", state='normal'))
+            self.ui.post(self.capture_btn.config, text="📸 Capture Screen", state='normal', key='capture_btn')
     
-    def _analyze_with_openai(self, base64_image, model_key, response_mode):
-        """Analyze image with OpenAI Vision API"""
-        try:
-            import requests
-            
-            # Map model keys to actual OpenAI model names
-            openai_models = {
-                'openai_gpt4o': 'gpt-4o',
-                'openai_gpt4o_mini': 'gpt-4o-mini',
-                'openai_gpt4_turbo': 'gpt-4-turbo'
-            }
-            
-            model_name = openai_models.get(model_key, 'gpt-4o')
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.config.get('openai_api_key')}"
-            }
-            
-            # Use custom prompt only if checkbox is enabled, otherwise use hardcoded prompt
-            if self.config.get('use_custom_prompt', False):
-                prompt = self.config.get('custom_image_prompt', "What's in this image? Please analyze and describe what you see.")
-            else:
-                # Use hardcoded prompt from prompt.txt
-                try:
-                    with open('prompt.txt', 'r', encoding='utf-8') as f:
-                        prompt = f.read().strip()
-                except FileNotFoundError:
-                    prompt = "What's in this image? Please analyze and describe what you see."
-            
-            if response_mode == 'detailed' and not self.config.get('use_custom_prompt', False):
-                prompt += """
-**Role:**
-You are an **exam-solving and coding assistant**. Your job is to analyze images and provide the most accurate, concise answers for exam-style and coding questions. You specialize in:
-
-* Arithmetic Aptitude
-* Data Interpretation
-* Verbal Ability
-* Logical Reasoning
-* Verbal Reasoning
-* Nonverbal Reasoning
-* Programming questions (code writing only)
-
-**Task Instructions:**
-
-1. **Multiple Choice Questions (MCQs):**
-
-   * Solve the question logically using reasoning, calculations, or analysis.
-   * Choose the **best correct option** from the given choices.
-   * If no option matches your solution, reply with: **“No matched answer found.”**
-   * Do **not** explain—only provide the direct answer.
-
-2. **Programming Questions:**
-
-   * Provide only the code solution.
-   * Place it exactly where the question specifies: **“write your code here.”**
-
-3. **Answer Formatting:**
-
-   * Always prefix each response with the **question number**.
-   * Examples:
-
-     * `Q1: B 3/4`
-     * `Q2: print("Hello World")`
-
-4. **Non-Exam Images:**
-
-   * If the image does not contain exam-related or coding questions, briefly describe what you see in the image.
-
-5. **General Rules:**
-
-   * Be accurate, concise, and logical.
-   * Do not provide explanations unless the image is unrelated to exams or programming.
-   * For multiple questions in one image, answer sequentially: Q1, Q2, Q3…
-
-                """
-           
-            
-            payload = {
-                "model": model_name,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": prompt
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                "max_tokens": 10000 if response_mode == 'detailed' else 1000
-            }
-            
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            else:
-                error_msg = f"OpenAI API error: {response.status_code}"
-                try:
-                    error_detail = response.json().get('error', {}).get('message', 'Unknown error')
-                    error_msg += f" - {error_detail}"
-                except:
-                    pass
-                return f"Error: {error_msg}"
-                
-        except Exception as e:
-            return f"OpenAI analysis error: {str(e)}"
-    
-    def _analyze_with_gemini(self, base64_image, response_mode):
-        """Analyze image with Gemini Vision API"""
-        try:
-            # Use custom prompt only if checkbox is enabled
-            custom_prompt = None
-            if self.config.get('use_custom_prompt', False):
-                custom_prompt = self.config.get('custom_image_prompt')
-            return self.gemini_client.analyze_image(base64_image, response_mode, custom_prompt)
-        except Exception as e:
-            return f"Gemini analysis error: {str(e)}"
-        
     def get_scanning_status(self):
         """Get current scanning status"""
-        return {
-            'ocr_running': self.ocr_running,
-            'audio_running': self.audio_running,
-            'ocr_available': self.ocr_capture.tesseract_available,
-            'threads_active': {
-                'ocr': self.ocr_thread.is_alive() if self.ocr_thread else False,
-                'audio': self.audio_thread.is_alive() if self.audio_thread else False
-            }
-        }
+        status = self.engine.get_status()
+        status['ui_dispatcher'] = self.ui.get_stats()
+        return status
         
     def open_settings(self):
         """Open settings window"""
@@ -2089,7 +1672,11 @@ You are an **exam-solving and coding assistant**. Your job is to analyze images
             
     def on_closing(self):
         """Clean up when closing the application"""
-        self.running = False
+        if getattr(self, 'api_server', None):
+            self.api_server.stop()
+        self.engine.stop()
+        self.config_store.close()
+        self.ui.stop()
         if hasattr(self, 'hotkey_listener'):
             self.hotkey_listener.stop()
         self.root.quit()
@@ -2099,8 +1686,7 @@ You are an **exam-solving and coding assistant**. Your job is to analyze images
         """Clear all AI responses from the display area with confirmation"""
         try:
             # Check if there's content to clear
-            current_content = self.answer_display.get('1.0', tk.END).strip()
-            if not current_content:
+            if not len(self.answer_history) and not self.rendered_entry_ids:
                 self.update_status("No responses to clear")
                 return
             
@@ -2116,9 +1702,15 @@ You are an **exam-solving and coding assistant**. Your job is to analyze images
                 # Temporarily enable the widget to clear content
                 self.answer_display.config(state='normal')
                 self.answer_display.delete('1.0', tk.END)
+                for entry_id in self.rendered_entry_ids:
+                    self.answer_display.tag_delete(f"entry_{entry_id}")
+                self.rendered_entry_ids = []
                 # Disable it again to maintain read-only state
                 self.answer_display.config(state='disabled')
                 
+                # Move cleared answers out of memory (still searchable from the log)
+                self.answer_history.clear()
+                
                 # Clear the stored last response as well
                 self.last_ai_response = ""
                 
@@ -2384,9 +1976,21 @@ class SettingsWindow:
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, pady=(20, 0))
         
+        ttk.Button(button_frame, text="📊 Performance", command=self.open_performance_panel).pack(side=tk.LEFT)
         ttk.Button(button_frame, text="Save", command=self.save_settings).pack(side=tk.RIGHT, padx=(5, 0))
         ttk.Button(button_frame, text="Cancel", command=self.window.destroy).pack(side=tk.RIGHT)
         
+    def open_performance_panel(self):
+        """Open the per-stage latency debug panel"""
+        PerformanceWindow(self.window, self.parent)
+        
+    def _post(self, callback, *args, key=None, **kwargs):
+        """Schedule a GUI update from a worker thread"""
+        if self.parent and hasattr(self.parent, 'ui'):
+            self.parent.ui.post(callback, *args, key=key, **kwargs)
+        else:
+            self.window.after(0, lambda: callback(*args, **kwargs))
+        
     def scan_working_models(self):
         """Scan for working OpenAI models"""
         api_key = self.api_key_var.get().strip()
@@ -2404,8 +2008,8 @@ class SettingsWindow:
         """Perform the actual model scanning in a separate thread"""
         try:
             # Update UI on main thread
-            self.window.after(0, lambda: self.scan_btn.config(text="🔍 Scanning...", state='disabled'))
-            self.window.after(0, lambda: self.model_status_label.config(text="Fetching available models...", foreground='orange'))
+            self._post(self.scan_btn.config, text="🔍 Scanning...", state='disabled', key='scan_btn')
+            self._post(self.model_status_label.config, text="Fetching available models...", foreground='orange', key='model_status_label')
             
             # Import here to avoid circular imports
             from llm_module import LLMClient
@@ -2414,16 +2018,15 @@ class SettingsWindow:
             temp_client = LLMClient(api_key)
             
             # First get all available models
-            self.window.after(0, lambda: self.model_status_label.config(text="Getting model list from OpenAI...", foreground='orange'))
+            self._post(self.model_status_label.config, text="Getting model list from OpenAI...", foreground='orange', key='model_status_label')
             all_models = temp_client.get_all_available_models()
             
             if not all_models:
-                self.window.after(0, lambda: self._scan_complete([], "No models found from API"))
+                self._post(self._scan_complete, [], "No models found from API")
                 return
             
             # Update status with model count
-            self.window.after(0, lambda: self.model_status_label.config(
-                text=f"Testing {len(all_models)} models... (this may take a moment)", foreground='orange'))
+            self._post(self.model_status_label.config, text=f"Testing {len(all_models)} models... (this may take a moment)", foreground='orange', key='model_status_label')
             
             # Test models with progress updates
             working_models = []
@@ -2431,7 +2034,7 @@ class SettingsWindow:
                 try:
                     # Update progress
                     progress_text = f"Testing {i+1}/{len(all_models)}: {model[:20]}..."
-                    self.window.after(0, lambda text=progress_text: self.model_status_label.config(text=text, foreground='orange'))
+                    self._post(self.model_status_label.config, text=progress_text, foreground='orange', key='model_status_label')
                     
                     # Test the model
                     response = temp_client.client.chat.completions.create(
@@ -2445,7 +2048,7 @@ class SettingsWindow:
                 except Exception as e:
                     error_msg = str(e).lower()
                     if "authentication" in error_msg or "api key" in error_msg:
-                        self.window.after(0, lambda: self._scan_complete([], "API key authentication failed"))
+                        self._post(self._scan_complete, [], "API key authentication failed")
                         return
                     elif "rate limit" in error_msg:
                         # If rate limited, assume the model works
@@ -2453,11 +2056,11 @@ class SettingsWindow:
                     # Continue with other models for other errors
             
             # Complete the scan
-            self.window.after(0, lambda: self._scan_complete(working_models, None))
+            self._post(self._scan_complete, working_models, None)
             
         except Exception as e:
             error_msg = f"Failed to scan models: {str(e)}"
-            self.window.after(0, lambda: self._scan_complete([], error_msg))
+            self._post(self._scan_complete, [], error_msg)
     
     def _scan_complete(self, working_models, error_msg):
         """Handle scan completion on the main thread"""
@@ -2555,8 +2158,8 @@ class SettingsWindow:
         """Perform the actual Gemini model scanning in a separate thread"""
         try:
             # Update UI on main thread
-            self.window.after(0, lambda: self.scan_gemini_btn.config(text="🔍 Scanning...", state='disabled'))
-            self.window.after(0, lambda: self.gemini_model_status_label.config(text="Testing Gemini models...", foreground='orange'))
+            self._post(self.scan_gemini_btn.config, text="🔍 Scanning...", state='disabled', key='scan_gemini_btn')
+            self._post(self.gemini_model_status_label.config, text="Testing Gemini models...", foreground='orange', key='gemini_model_status_label')
             
             # Import here to avoid circular imports
             from gemini_module import GeminiClient
@@ -2572,7 +2175,7 @@ class SettingsWindow:
                 try:
                     # Update progress
                     progress_text = f"Testing {i+1}/{len(test_models)}: {model}..."
-                    self.window.after(0, lambda text=progress_text: self.gemini_model_status_label.config(text=text, foreground='orange'))
+                    self._post(self.gemini_model_status_label.config, text=progress_text, foreground='orange', key='gemini_model_status_label')
                     
                     # Test the model by making a simple request
                     import google.generativeai as genai
@@ -2586,16 +2189,16 @@ class SettingsWindow:
                 except Exception as e:
                     error_msg = str(e).lower()
                     if "authentication" in error_msg or "api key" in error_msg:
-                        self.window.after(0, lambda: self._gemini_scan_complete([], "Gemini API key authentication failed"))
+                        self._post(self._gemini_scan_complete, [], "Gemini API key authentication failed")
                         return
                     # Continue with other models for other errors
             
             # Complete the scan
-            self.window.after(0, lambda: self._gemini_scan_complete(working_models, None))
+            self._post(self._gemini_scan_complete, working_models, None)
             
         except Exception as e:
             error_msg = f"Failed to scan Gemini models: {str(e)}"
-            self.window.after(0, lambda: self._gemini_scan_complete([], error_msg))
+            self._post(self._gemini_scan_complete, [], error_msg)
     
     def _gemini_scan_complete(self, working_models, error_msg):
         """Handle Gemini scan completion on the main thread"""
@@ -2667,6 +2270,179 @@ class SettingsWindow:
             messagebox.showerror("Error", "Please enter valid values for all fields.")
 
 
+class HistorySearchWindow:
+    def __init__(self, parent, history, format_entry):
+        self.history = history
+        self.format_entry = format_entry
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title("Search AI Responses")
+        self.window.geometry("600x500")
+        self.window.transient(parent)
+        
+        self.setup_search_gui()
+        
+    def setup_search_gui(self):
+        """Setup search GUI"""
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.query_var = tk.StringVar()
+        query_entry = ttk.Entry(search_frame, textvariable=self.query_var)
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
+        query_entry.bind("<Return>", lambda event: self.run_search())
+        query_entry.focus_set()
+        
+        ttk.Button(search_frame, text="Search", command=self.run_search).pack(side=tk.LEFT)
+        
+        self.result_label = ttk.Label(main_frame, text="Search covers the full answer history", 
+                                     font=('Segoe UI', 8), foreground='gray')
+        self.result_label.pack(anchor=tk.W, pady=(0, 5))
+        
+        text_frame = ttk.Frame(main_frame)
+        text_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.results_text = tk.Text(text_frame, wrap=tk.WORD, font=('Segoe UI', 9), state='disabled')
+        scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=self.results_text.yview)
+        self.results_text.config(yscrollcommand=scrollbar.set)
+        self.results_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+    def run_search(self):
+        """Search the history and show matching entries"""
+        results = self.history.search(self.query_var.get())
+        
+        self.results_text.config(state='normal')
+        self.results_text.delete('1.0', tk.END)
+        for entry in results:
+            self.results_text.insert(tk.END, self.format_entry(entry))
+        self.results_text.config(state='disabled')
+        
+        self.result_label.config(text=f"{len(results)} matching responses")
+
+
+class PerformanceWindow:
+    def __init__(self, parent, main_app=None, refresh_ms=1000):
+        self.parent = parent
+        self.main_app = main_app
+        self.refresh_ms = refresh_ms
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title("Performance")
+        self.window.geometry("560x460")
+        self.window.transient(parent)
+        self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        self.setup_performance_gui()
+        self.refresh()
+        
+    def setup_performance_gui(self):
+        """Setup performance GUI"""
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        ttk.Label(main_frame, text="Stage latency (ms)").pack(anchor=tk.W, pady=(0, 5))
+        
+        columns = ('count', 'p50', 'p95', 'p99', 'mean')
+        self.stage_tree = ttk.Treeview(main_frame, columns=columns, height=10)
+        self.stage_tree.heading('#0', text='Stage')
+        self.stage_tree.column('#0', width=140)
+        for column in columns:
+            self.stage_tree.heading(column, text=column)
+            self.stage_tree.column(column, width=70, anchor=tk.E)
+        self.stage_tree.pack(fill=tk.BOTH, expand=True)
+        
+        # GUI dispatcher and startup costs
+        self.details_label = ttk.Label(main_frame, text="", font=('Consolas', 8), justify=tk.LEFT)
+        self.details_label.pack(anchor=tk.W, pady=(10, 0))
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Button(button_frame, text="Export Chrome Trace", command=self.export_trace).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(button_frame, text="Close", command=self.close).pack(side=tk.RIGHT)
+        
+    def refresh(self):
+        """Reload statistics periodically while the window is open"""
+        if not self.window.winfo_exists():
+            return
+        self.update_stats()
+        self.window.after(self.refresh_ms, self.refresh)
+        
+    def update_stats(self):
+        """Reload stage statistics"""
+        stats = profiler.stage_stats()
+        self.stage_tree.delete(*self.stage_tree.get_children())
+        for name in sorted(stats):
+            stage = stats[name]
+            self.stage_tree.insert('', tk.END, text=name, values=(
+                stage['count'], f"{stage['p50']:.1f}", f"{stage['p95']:.1f}",
+                f"{stage['p99']:.1f}", f"{stage['mean']:.1f}"))
+        
+        details = []
+        if self.main_app and hasattr(self.main_app, 'ui'):
+            ui_stats = self.main_app.ui.get_stats()
+            details.append(f"GUI updates: {ui_stats['executed']} run, {ui_stats['merged']} merged, "
+                           f"p95 {ui_stats['p95_latency_ms']:.1f} ms, queue {ui_stats['queue_depth']}")
+        if self.main_app and hasattr(self.main_app, 'engine'):
+            engine_status = self.main_app.engine.get_status()
+            live = engine_status['live_screen']
+            if live:
+                details.append(f"Live screen: {live['captures_per_minute']} captures/min, "
+                               f"{live['analyses_per_minute']} analyses/min, {live['dropped']} frames dropped, "
+                               f"{live['in_flight']} in flight, interval {live['interval'] or 0:.1f}s")
+            ocr_first = engine_status['ocr_first']
+            if ocr_first:
+                details.append(f"OCR-first: {ocr_first['ocr']} screens answered from text, "
+                               f"{ocr_first['vision']} sent to vision")
+            for provider, stats in sorted(engine_status['prompt_cache'].items()):
+                details.append(f"Prompt cache ({provider}): {stats['cached_ratio']:.0%} of "
+                               f"{stats['prompt_tokens']} prompt tokens over {stats['requests']} requests")
+            sizing = engine_status['request_sizing']
+            if sizing['kinds']:
+                budgets = ', '.join(f"{kind} {stats['max_tokens']}" for kind, stats in sorted(sizing['kinds'].items()))
+                truncated = sum(stats['truncated'] for stats in sizing['kinds'].values())
+                details.append(f"max_tokens: {budgets} ({truncated} retried in full)")
+            adaptive = engine_status['live_screen_interval']
+            if adaptive and adaptive['recent_decisions']:
+                last = adaptive['recent_decisions'][-1]
+                details.append(f"Adaptive interval: {last['interval']:.1f}s ({last['reason']})")
+        if self.main_app and hasattr(self.main_app, 'components'):
+            details.append(self.main_app.components.format_timings())
+        self.details_label.config(text="\n".join(details))
+        
+    def export_trace(self):
+        """Save recorded spans as Chrome trace JSON"""
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".json",
+                                            initialfile=f"exam_helper_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if not path:
+            return
+        if profiler.export_chrome_trace(path):
+            messagebox.showinfo("Trace Exported", f"Open {os.path.basename(path)} in chrome://tracing or ui.perfetto.dev", parent=self.window)
+        else:
+            messagebox.showerror("Error", "Failed to export trace", parent=self.window)
+            
+    def reset(self):
+        """Clear recorded spans"""
+        profiler.reset()
+        self.update_stats()
+        
+    def close(self):
+        """Close and hand the input grab back to the settings window"""
+        self.window.destroy()
+        try:
+            self.parent.grab_set()
+        except tk.TclError:
+            pass
+
+
 class ShortcutsWindow:
     def __init__(self, parent):
         self.window = tk.Toplevel(parent)
@@ -2732,6 +2508,7 @@ class ShortcutsWindow:
         shortcuts = [
             ("Window Controls", [
                 ("Ctrl+Shift+H", "Hide/Show Window", "Toggle window visibility instantly"),
+                ("Ctrl+F", "🔍 Search Responses", "Search the full AI response history"),
             ]),
             ("Screen Capture", [
                 ("Ctrl+Shift+C", "📸 Capture Screen", "Take screenshot and analyze with AI"),
@@ -5,14 +5,24 @@ from typing import Optional
 import io
 import base64
 from PIL import Image
+from profiler_module import profiler
+from prompt_module import (ANSWER_SYSTEM_PROMPTS, VISION_SYSTEM_PROMPTS, IMAGE_QUESTION_SYSTEM_PROMPTS,
+                           OCR_SYSTEM_PROMPTS, QUESTION_TEMPLATE, IMAGE_QUESTION_TEMPLATE, VISION_USER_TEXT,
+                           mode_prompt, prompt_cache_stats)
 
 class GeminiClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, api_endpoint: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
         self.api_key = api_key
+        self.api_endpoint = api_endpoint or None
         
         if api_key:
-            genai.configure(api_key=api_key)
+            if self.api_endpoint:
+                # Endpoint override (e.g. a local mock server) needs the REST transport
+                genai.configure(api_key=api_key, transport='rest',
+                                client_options={'api_endpoint': self.api_endpoint})
+            else:
+                genai.configure(api_key=api_key)
             # Use current Gemini models - gemini-1.5-flash supports both text and vision
             self.model = genai.GenerativeModel('gemini-1.5-flash')
             self.text_model = genai.GenerativeModel('gemini-1.5-flash')
@@ -21,10 +31,31 @@ class GeminiClient:
             self.text_model = None
             self.logger.warning("No Gemini API key provided")
             
+        # Models with a fixed system_instruction, built once per instruction text
+        self.instruction_models = {}
+            
         # Rate limiting
         self.last_request_time = 0
         self.min_request_interval = 1  # Minimum seconds between requests
         
+    def _instruction_model(self, system_instruction: str):
+        """gemini-1.5-flash with static instructions sent as system_instruction (a stable, cacheable prefix)"""
+        model = self.instruction_models.get(system_instruction)
+        if model is None:
+            if len(self.instruction_models) >= 16:
+                # Custom prompts can change; keep only recent instruction sets
+                self.instruction_models.clear()
+            model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=system_instruction)
+            self.instruction_models[system_instruction] = model
+        return model
+        
+    def _generate(self, system_instruction: str, contents):
+        """generate_content with system_instruction, recording cached prompt tokens"""
+        with profiler.span('llm_request', provider='gemini'):
+            response = self._instruction_model(system_instruction).generate_content(contents)
+        prompt_cache_stats.record_gemini(getattr(response, 'usage_metadata', None))
+        return response
+        
     def analyze_image(self, base64_image: str, response_mode: str = 'short', custom_prompt: str = None) -> str:
         """Analyze image using Gemini Vision API"""
         if not self.model:
@@ -40,31 +71,9 @@ class GeminiClient:
             image_data = base64.b64decode(base64_image)
             image = Image.open(io.BytesIO(image_data))
             
-            # Prepare prompt based on response mode
-            if custom_prompt:
-                prompt = custom_prompt
-            elif response_mode == 'detailed':
-                prompt = """You are an intelligent exam helper with vision capabilities. Analyze this image and:
-
-1. Identify any questions, problems, or text that needs answering
-2. Provide detailed, comprehensive answers with explanations
-3. Include step-by-step solutions for math problems
-4. Explain concepts and provide relevant context
-5. If multiple questions are visible, answer all of them clearly
-
-Be thorough and educational in your responses. Look carefully at all text, diagrams, charts, and mathematical expressions in the image."""
-            else:
-                prompt = """You are an intelligent exam helper with vision capabilities. Analyze this image and:
-
-1. Identify any questions, problems, or text that needs answering
-2. Provide concise, direct answers
-3. Be brief but accurate
-4. Focus on the essential information needed
-
-If multiple questions are visible, answer all of them concisely. Look at all text and content in the image."""
-            
-            # Generate response
-            response = self.model.generate_content([prompt, image])
+            # Static instructions go in system_instruction; the request only adds the image
+            system_instruction = custom_prompt or mode_prompt(VISION_SYSTEM_PROMPTS, response_mode)
+            response = self._generate(system_instruction, [VISION_USER_TEXT, image])
             
             self.last_request_time = time.time()
             
@@ -100,21 +109,8 @@ If multiple questions are visible, answer all of them concisely. Look at all tex
             image_data = base64.b64decode(base64_image)
             image = Image.open(io.BytesIO(image_data))
             
-            # Prepare prompt
-            if response_mode == 'detailed':
-                prompt = f"""You are an intelligent exam helper. Look at this image and answer the following question with detailed explanations:
-
-Question: {question}
-
-Please analyze the image carefully and provide a comprehensive answer with explanations."""
-            else:
-                prompt = f"""You are an intelligent exam helper. Look at this image and answer the following question concisely:
-
-Question: {question}
-
-Please analyze the image and provide a direct, brief answer."""
-            
-            response = self.model.generate_content([prompt, image])
+            system_instruction = mode_prompt(IMAGE_QUESTION_SYSTEM_PROMPTS, response_mode)
+            response = self._generate(system_instruction, [IMAGE_QUESTION_TEMPLATE.format(question=question), image])
             self.last_request_time = time.time()
             
             if response.text:
@@ -137,17 +133,8 @@ Please analyze the image and provide a direct, brief answer."""
             if current_time - self.last_request_time < self.min_request_interval:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
-            # Prepare prompt based on response mode
-            if response_mode == 'detailed':
-                prompt = f"""You are an intelligent exam helper. Provide detailed, comprehensive answers with explanations, examples, and step-by-step solutions when applicable. Include relevant context and background information.
-
-Question: {question}"""
-            else:
-                prompt = f"""You are an intelligent exam helper. Provide concise, direct answers. Be brief but accurate. Focus on the essential information needed to answer the question.
-
-Question: {question}"""
-            
-            response = self.text_model.generate_content(prompt)
+            system_instruction = mode_prompt(ANSWER_SYSTEM_PROMPTS, response_mode)
+            response = self._generate(system_instruction, QUESTION_TEMPLATE.format(question=question))
             self.last_request_time = time.time()
             
             if response.text:
@@ -200,30 +187,8 @@ Question: {question}"""
             image_data = base64.b64decode(base64_image)
             image = Image.open(io.BytesIO(image_data))
             
-            # Prepare OCR-focused prompt
-            if response_mode == 'detailed':
-                prompt = """You are an intelligent OCR assistant. Analyze this image and extract all text content in a well-organized format:
-
-1. **QUESTIONS**: If there are any questions, list them clearly with numbers/letters
-2. **MULTIPLE CHOICE OPTIONS**: If there are options (A, B, C, D, etc.), format them properly
-3. **TEXT CONTENT**: Extract all readable text, maintaining structure and formatting
-4. **MATHEMATICAL EXPRESSIONS**: Preserve mathematical notation and formulas
-5. **TABLES/LISTS**: Format any tabular data or lists clearly
-
-Please organize the extracted text in a readable, structured format. If there are questions with options, present them clearly. Include any instructions, headings, or important text elements."""
-            else:
-                prompt = """You are an intelligent OCR assistant. Extract and organize all text from this image:
-
-- List any QUESTIONS clearly
-- Show MULTIPLE CHOICE OPTIONS (A, B, C, D) if present
-- Extract all readable TEXT content
-- Preserve MATHEMATICAL expressions
-- Maintain structure and formatting
-
-Present the extracted text in a clear, organized format."""
-            
-            # Generate response
-            response = self.model.generate_content([prompt, image])
+            # OCR-focused instructions as system_instruction
+            response = self._generate(mode_prompt(OCR_SYSTEM_PROMPTS, response_mode), [image])
             
             self.last_request_time = time.time()
             
@@ -244,6 +209,12 @@ Present the extracted text in a clear, organized format."""
                 self.logger.error(f"Gemini OCR error: {e}")
                 return f"Error extracting text: {str(e)}"
     
+    def _get_transcribe_model(self, model):
+        """Create model instance for the specific transcription model"""
+        if model == "gemini-2.5-pro":
+            return genai.GenerativeModel('gemini-2.0-flash-exp')  # Using available model
+        return genai.GenerativeModel('gemini-1.5-flash')
+    
     def transcribe_audio(self, audio_file_path, model="gemini-1.5-flash", prompt="Please transcribe this audio accurately. If it sounds like a question, provide the exact question being asked."):
         """Transcribe audio using Gemini"""
         try:
@@ -252,11 +223,7 @@ Present the extracted text in a clear, organized format."""
             if current_time - self.last_request_time < self.min_request_interval:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
-            # Create model instance for the specific model
-            if model == "gemini-2.5-pro":
-                transcribe_model = genai.GenerativeModel('gemini-2.0-flash-exp')  # Using available model
-            else:
-                transcribe_model = genai.GenerativeModel('gemini-1.5-flash')
+            transcribe_model = self._get_transcribe_model(model)
             
             # Upload audio file to Gemini
             audio_file = genai.upload_file(path=audio_file_path, mime_type="audio/wav")
@@ -279,6 +246,37 @@ Present the extracted text in a clear, organized format."""
             self.logger.error(f"Gemini audio transcription error: {e}")
             return f"Error: Gemini audio transcription not fully supported yet. Please try OpenAI models. ({str(e)})"
     
+    def transcribe_audio_data(self, audio_bytes: bytes, mime_type: str = "audio/wav", model="gemini-1.5-flash", prompt="Please transcribe this audio accurately. If it sounds like a question, provide the exact question being asked.") -> str:
+        """Transcribe in-memory audio using Gemini inline data (no file upload round trip)"""
+        if not self.api_key:
+            return "Error: No Gemini API key configured."
+            
+        try:
+            # Rate limiting
+            current_time = time.time()
+            if current_time - self.last_request_time < self.min_request_interval:
+                time.sleep(self.min_request_interval - (current_time - self.last_request_time))
+            
+            transcribe_model = self._get_transcribe_model(model)
+            
+            # Inline parts are sent as raw bytes in the request body
+            response = transcribe_model.generate_content([
+                prompt,
+                {"mime_type": mime_type, "data": audio_bytes}
+            ])
+            
+            self.last_request_time = time.time()
+            
+            if response.text:
+                self.logger.info(f"Gemini audio transcription successful: {response.text[:50]}...")
+                return response.text.strip()
+            else:
+                return "Error: No transcription generated from Gemini API"
+                
+        except Exception as e:
+            self.logger.error(f"Gemini audio transcription error: {e}")
+            return f"Error: Gemini audio transcription failed ({str(e)})"
+    
     def get_model_info(self):
         """Get information about current models"""
         return {
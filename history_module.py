@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class AnswerHistory:
+    """
+    Bounded in-memory history of AI answers.
+    Entries evicted from memory are appended to an on-disk JSONL log so
+    search still covers older answers. Once the log passes max_log_bytes it is
+    rotated to log_path + '.1' (replacing the previous rotation), so at most
+    about twice that is kept on disk.
+    """
+
+    def __init__(self, max_entries=200, log_path='answer_history.jsonl', max_log_bytes=5 * 1024 * 1024):
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max(1, int(max_entries))
+        self.log_path = log_path
+        self.max_log_bytes = max_log_bytes
+
+        self.entries = deque()
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def add(self, source, question, answer):
+        """Add an answer and return the stored entry"""
+        with self.lock:
+            entry = {
+                'id': self.next_id,
+                'timestamp': datetime.now().strftime("%H:%M:%S"),
+                'date': datetime.now().strftime("%Y-%m-%d"),
+                'source': source,
+                'question': question,
+                'answer': answer
+            }
+            self.next_id += 1
+            self.entries.append(entry)
+
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popleft())
+            if evicted:
+                self._spill(evicted)
+
+        return entry
+
+    def _spill(self, entries):
+        """Append evicted entries to the on-disk log"""
+        if not self.log_path:
+            return
+
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            if self.max_log_bytes and os.path.getsize(self.log_path) > self.max_log_bytes:
+                os.replace(self.log_path, self.log_path + '.1')
+        except Exception as e:
+            self.logger.error(f"Answer history spill error: {e}")
+
+    def set_max_entries(self, max_entries):
+        """Change the in-memory cap, spilling any excess entries"""
+        with self.lock:
+            self.max_entries = max(1, int(max_entries))
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popleft())
+            if evicted:
+                self._spill(evicted)
+
+    def recent(self, limit=None):
+        """Get the most recent entries, oldest first"""
+        with self.lock:
+            entries = list(self.entries)
+        return entries if limit is None else entries[-limit:]
+
+    def last(self):
+        """Get the newest entry or None"""
+        with self.lock:
+            return self.entries[-1] if self.entries else None
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def clear(self):
+        """Clear the in-memory history (entries are kept in the on-disk log)"""
+        with self.lock:
+            if self.entries:
+                self._spill(list(self.entries))
+            self.entries.clear()
+
+    def search(self, query, limit=100):
+        """Case-insensitive search over memory and the on-disk log, newest first"""
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+
+        def matches(entry):
+            return (query in str(entry.get('question', '')).lower() or
+                    query in str(entry.get('answer', '')).lower() or
+                    query in str(entry.get('source', '')).lower())
+
+        results = []
+        with self.lock:
+            in_memory = list(self.entries)
+
+        for entry in reversed(in_memory):
+            if matches(entry):
+                results.append(entry)
+                if len(results) >= limit:
+                    return results
+
+        if not self.log_path:
+            return results
+
+        # Current log first, then the rotated one; both are oldest first
+        for path in (self.log_path, self.log_path + '.1'):
+            remaining = limit - len(results)
+            if remaining <= 0:
+                break
+            results.extend(reversed(self._search_log(path, matches, remaining)))
+
+        return results
+
+    def _search_log(self, path, matches, limit):
+        """The newest limit matching entries of a JSONL log, oldest first, streamed line by line"""
+        found = deque(maxlen=limit)
+        if not os.path.exists(path):
+            return found
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if matches(entry):
+                        found.append(entry)
+        except Exception as e:
+            self.logger.error(f"Answer history read error: {e}")
+        return found
@@ -0,0 +1,92 @@
+import base64
+import io
+import math
+
+import numpy as np
+from PIL import Image
+
+# OpenAI high detail sends images within these bounds without downscaling them
+PROVIDER_MAX_LONG_SIDE = 2048
+PROVIDER_MAX_SHORT_SIDE = 768
+
+
+def estimate_text_height(image, strip_width=256, edge_threshold=40, min_band=4, max_band=120):
+    """
+    Median height in pixels of text lines (ascender to descender), or None if no text is found.
+    Text has dense vertical edges; within each vertical strip, consecutive rows
+    containing such edges form a band per text line. Works for dark and light
+    themes; rules, borders and large pictures fall outside the band limits.
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.int16)
+    edges = np.abs(np.diff(gray, axis=1)) > edge_threshold
+
+    heights = []
+    for left in range(0, edges.shape[1], strip_width):
+        rows = edges[:, left:left + strip_width].sum(axis=1) >= 2
+        padded = np.concatenate(([False], rows, [False]))
+        changes = np.flatnonzero(padded[1:] != padded[:-1])
+        runs = changes[1::2] - changes[::2]
+        heights.extend(runs[(runs >= min_band) & (runs <= max_band)].tolist())
+
+    if len(heights) < 3:
+        return None
+    return float(np.median(heights))
+
+
+def legible_scale(text_height, size, min_text_px=10, min_side=512):
+    """Smallest downscale factor (at most 1) that keeps text_height at or above min_text_px"""
+    scale = min(1.0, min_text_px / text_height)
+    # Keep a usable minimum size for screens with very large text
+    return min(1.0, max(scale, min_side / max(size)))
+
+
+def plan_tiles(width, height, max_tiles=4, overlap=32):
+    """
+    Scale and crop boxes (in scaled coordinates) covering the image so no tile is
+    downscaled by the provider. Uses the grid of at most max_tiles tiles that
+    keeps the most resolution; returns (scale, [one full box]) when the whole
+    image already fits.
+    """
+    if max(width, height) <= PROVIDER_MAX_LONG_SIDE and min(width, height) <= PROVIDER_MAX_SHORT_SIDE:
+        return 1.0, [(0, 0, width, height)]
+
+    # Leave room for the overlap on both sides of a tile
+    long_limit, short_limit = PROVIDER_MAX_LONG_SIDE - 2 * overlap, PROVIDER_MAX_SHORT_SIDE - 2 * overlap
+    width_limit, height_limit = (long_limit, short_limit) if width >= height else (short_limit, long_limit)
+
+    best = None
+    for cols in range(1, max_tiles + 1):
+        for rows in range(1, max_tiles // cols + 1):
+            scale = min(1.0, cols * width_limit / width, rows * height_limit / height)
+            if best is None or scale > best[0] + 1e-9 or (abs(scale - best[0]) <= 1e-9 and cols * rows < best[1] * best[2]):
+                best = (scale, cols, rows)
+    scale, cols, rows = best
+
+    # A single tile is the whole image; the provider's own downscale is no worse
+    if cols * rows == 1:
+        return 1.0, [(0, 0, width, height)]
+
+    scaled_width, scaled_height = int(width * scale), int(height * scale)
+    tile_width, tile_height = math.ceil(scaled_width / cols), math.ceil(scaled_height / rows)
+    boxes = []
+    for row in range(rows):
+        for col in range(cols):
+            # Overlap neighbours so a line of text is never cut in both tiles
+            boxes.append((max(0, col * tile_width - overlap), max(0, row * tile_height - overlap),
+                          min(scaled_width, (col + 1) * tile_width + overlap),
+                          min(scaled_height, (row + 1) * tile_height + overlap)))
+    return scale, boxes
+
+
+def crop_tiles(base64_image, boxes, scale=1.0, quality=85):
+    """Encode each crop box of a base64 image (JPEG, after scaling) as base64"""
+    tiles = []
+    with Image.open(io.BytesIO(base64.b64decode(base64_image))) as image:
+        image = image.convert('RGB')
+        if scale < 1:
+            image = image.resize((int(image.width * scale), int(image.height * scale)), Image.Resampling.LANCZOS)
+        for box in boxes:
+            buffer = io.BytesIO()
+            image.crop(box).save(buffer, format='JPEG', quality=quality, optimize=True)
+            tiles.append(base64.b64encode(buffer.getvalue()).decode('utf-8'))
+    return tiles
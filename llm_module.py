@@ -2,15 +2,21 @@ from openai import OpenAI
 import logging
 import time
 from typing import Optional
+from profiler_module import profiler
+from sizing_module import request_sizer, question_type, estimate_request_tokens
+from prompt_module import (ANSWER_SYSTEM_PROMPTS, VISION_SYSTEM_PROMPTS, IMAGE_QUESTION_SYSTEM_PROMPTS,
+                           QUESTION_TEMPLATE, IMAGE_QUESTION_TEMPLATE, VISION_USER_TEXT, mode_prompt,
+                           prompt_cache_stats)
 
 class LLMClient:
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", base_url: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
         self.api_key = api_key
         self.model = model
+        self.base_url = base_url or None  # OpenAI-compatible endpoint override (e.g. a local mock server)
         
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            self.client = OpenAI(api_key=api_key, base_url=self.base_url)
         else:
             self.client = None
             self.logger.warning("No OpenAI API key provided")
@@ -32,6 +38,18 @@ class LLMClient:
         self.working_models = []
         self.models_checked = False
         
+    def build_answer_request(self, question: str, response_mode: str = 'short', max_tokens: Optional[int] = None) -> dict:
+        """Chat completion parameters for a question (also used for provider batch files)"""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": mode_prompt(ANSWER_SYSTEM_PROMPTS, response_mode)},
+                {"role": "user", "content": QUESTION_TEMPLATE.format(question=question)}
+            ],
+            "max_tokens": max_tokens or (500 if response_mode == 'short' else 1000),
+            "temperature": 0.3
+        }
+
     def get_answer(self, question: str, response_mode: str = 'short') -> str:
         """Get answer from OpenAI GPT"""
         if not self.client:
@@ -43,24 +61,22 @@ class LLMClient:
             if current_time - self.last_request_time < self.min_request_interval:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
                 
-            # Prepare prompt based on response mode
-            if response_mode == 'detailed':
-                system_prompt = """You are an intelligent exam helper. Provide detailed, comprehensive answers with explanations, examples, and step-by-step solutions when applicable. Include relevant context and background information."""
-            else:
-                system_prompt = """You are an intelligent exam helper. Provide concise, direct answers. Be brief but accurate. Focus on the essential information needed to answer the question."""
-                
+            # Budget from past answers of this kind; a sizing-truncated answer is asked again in full
+            ceiling = 500 if response_mode == 'short' else 1000
+            kind = f"text:{question_type(question)}:{response_mode}"
+            request = self.build_answer_request(question, response_mode, request_sizer.max_tokens(kind, ceiling))
+            
             # Make API call using the selected model
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Question: {question}"}
-                ],
-                max_tokens=500 if response_mode == 'short' else 1000,
-                temperature=0.3
-            )
+            with profiler.span('llm_request', provider='openai'):
+                response = self.client.chat.completions.create(**request)
+            usage = getattr(response, 'usage', None)
+            if request_sizer.observe(kind, request['max_tokens'], ceiling, getattr(usage, 'completion_tokens', None),
+                                     response.choices[0].finish_reason, estimate_request_tokens(request)):
+                with profiler.span('llm_request', provider='openai'):
+                    response = self.client.chat.completions.create(**{**request, 'max_tokens': ceiling})
             
             self.last_request_time = time.time()
+            prompt_cache_stats.record_openai('openai', getattr(response, 'usage', None))
             
             answer = response.choices[0].message.content.strip()
             return answer
@@ -103,15 +119,16 @@ class LLMClient:
             return "Error: No API key configured."
             
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Provide only a single, direct sentence answer. Be extremely concise."},
-                    {"role": "user", "content": question}
-                ],
-                max_tokens=50,
-                temperature=0.1
-            )
+            with profiler.span('llm_request', provider='openai'):
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "Provide only a single, direct sentence answer. Be extremely concise."},
+                        {"role": "user", "content": question}
+                    ],
+                    max_tokens=50,
+                    temperature=0.1
+                )
             
             return response.choices[0].message.content.strip()
             
@@ -121,18 +138,7 @@ class LLMClient:
             
     def analyze_question_type(self, question: str) -> str:
         """Analyze what type of question this is"""
-        question_lower = question.lower()
-        
-        if any(word in question_lower for word in ['calculate', 'solve', 'find', 'compute']):
-            return 'math'
-        elif any(word in question_lower for word in ['define', 'what is', 'meaning']):
-            return 'definition'
-        elif any(word in question_lower for word in ['explain', 'how', 'why']):
-            return 'explanation'
-        elif any(word in question_lower for word in ['list', 'name', 'identify']):
-            return 'listing'
-        else:
-            return 'general'
+        return question_type(question)
             
     def get_contextual_answer(self, question: str, context: str = "") -> str:
         """Get answer with additional context"""
@@ -142,15 +148,16 @@ class LLMClient:
         try:
             prompt = f"Context: {context}\n\nQuestion: {question}" if context else question
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful exam assistant. Use the provided context to give accurate answers."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.3
-            )
+            with profiler.span('llm_request', provider='openai'):
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You are a helpful exam assistant. Use the provided context to give accurate answers."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=800,
+                    temperature=0.3
+                )
             
             return response.choices[0].message.content.strip()
             
@@ -170,25 +177,7 @@ class LLMClient:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
             # Prepare prompt based on response mode
-            if custom_prompt:
-                system_prompt = custom_prompt
-            elif response_mode == 'detailed':
-                system_prompt = """You are an intelligent exam helper with vision capabilities. Analyze the image and:
-1. Identify any questions, problems, or text that needs answering
-2. Provide detailed, comprehensive answers with explanations
-3. Include step-by-step solutions for math problems
-4. Explain concepts and provide relevant context
-5. If multiple questions are visible, answer all of them clearly
-
-Be thorough and educational in your responses."""
-            else:
-                system_prompt = """You are an intelligent exam helper with vision capabilities. Analyze the image and:
-1. Identify any questions, problems, or text that needs answering
-2. Provide concise, direct answers
-3. Be brief but accurate
-4. Focus on the essential information needed
-
-If multiple questions are visible, answer all of them concisely."""
+            system_prompt = custom_prompt or mode_prompt(VISION_SYSTEM_PROMPTS, response_mode)
             
             # Prepare the message with image
             messages = [
@@ -201,7 +190,7 @@ If multiple questions are visible, answer all of them concisely."""
                     "content": [
                         {
                             "type": "text",
-                            "text": "Please analyze this image and answer any questions or problems you can see."
+                            "text": VISION_USER_TEXT
                         },
                         {
                             "type": "image_url",
@@ -215,14 +204,16 @@ If multiple questions are visible, answer all of them concisely."""
             ]
             
             # Make API call to GPT-4 Vision
-            response = self.client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=messages,
-                max_tokens=800 if response_mode == 'short' else 1500,
-                temperature=0.3
-            )
+            with profiler.span('llm_request', provider='openai'):
+                response = self.client.chat.completions.create(
+                    model="gpt-4-vision-preview",
+                    messages=messages,
+                    max_tokens=800 if response_mode == 'short' else 1500,
+                    temperature=0.3
+                )
             
             self.last_request_time = time.time()
+            prompt_cache_stats.record_openai('openai', getattr(response, 'usage', None))
             
             answer = response.choices[0].message.content.strip()
             return answer
@@ -252,11 +243,7 @@ If multiple questions are visible, answer all of them concisely."""
             if current_time - self.last_request_time < self.min_request_interval:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
-            # Prepare prompt
-            if response_mode == 'detailed':
-                system_prompt = "You are an intelligent exam helper. Analyze the image and provide detailed answers with explanations."
-            else:
-                system_prompt = "You are an intelligent exam helper. Analyze the image and provide concise, direct answers."
+            system_prompt = mode_prompt(IMAGE_QUESTION_SYSTEM_PROMPTS, response_mode)
             
             messages = [
                 {
@@ -268,7 +255,7 @@ If multiple questions are visible, answer all of them concisely."""
                     "content": [
                         {
                             "type": "text",
-                            "text": f"Question: {question}\n\nPlease analyze this image and answer the question above."
+                            "text": IMAGE_QUESTION_TEMPLATE.format(question=question)
                         },
                         {
                             "type": "image_url",
@@ -281,14 +268,16 @@ If multiple questions are visible, answer all of them concisely."""
                 }
             ]
             
-            response = self.client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=messages,
-                max_tokens=800 if response_mode == 'short' else 1500,
-                temperature=0.3
-            )
+            with profiler.span('llm_request', provider='openai'):
+                response = self.client.chat.completions.create(
+                    model="gpt-4-vision-preview",
+                    messages=messages,
+                    max_tokens=800 if response_mode == 'short' else 1500,
+                    temperature=0.3
+                )
             
             self.last_request_time = time.time()
+            prompt_cache_stats.record_openai('openai', getattr(response, 'usage', None))
             return response.choices[0].message.content.strip()
             
         except Exception as e:
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI, Perplexity and Gemini endpoints used by Exam Helper.
+
+Point the clients at it with config.json:
+    "openai_base_url": "http://127.0.0.1:8765/v1",
+    "perplexity_base_url": "http://127.0.0.1:8765/chat/completions",
+    "gemini_api_endpoint": "http://127.0.0.1:8765"
+
+Latency, error rate and 429 behaviour are configurable from the command line
+or at runtime with POST /_mock/config, so pooling, retries, hedging and
+caching can be load-tested offline. The OpenAI Files/Batches endpoints are
+simulated too: a batch moves from validating to completed over
+batch_duration_s and its output file answers every request line.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_SETTINGS = {
+    'latency_ms': 0.0,         # Base delay before the response starts
+    'jitter_ms': 0.0,          # Uniform random extra delay
+    'error_rate': 0.0,         # Fraction of requests answered with a 500
+    'rate_limit_rate': 0.0,    # Fraction of requests answered with a 429
+    'max_rps': 0.0,            # Requests per second before 429s (0 = unlimited)
+    'retry_after': 1.0,        # Retry-After seconds sent with 429s
+    'stream_chunk_ms': 10.0,   # Delay between streamed chunks
+    'batch_duration_s': 2.0,   # Time a batch job takes from validating to completed
+    'prompt_cache_min_tokens': 1024,  # Repeated system prompts at least this long report cached tokens
+    'answer': "B) O(log n) - binary search halves the search interval on every step.",
+    'transcript': "What is the time complexity of binary search?",
+    'seed': None
+}
+
+MOCK_MODELS = ['gpt-4o', 'gpt-4o-mini', 'gpt-4-turbo', 'gpt-4', 'gpt-3.5-turbo', 'whisper-1', 'gpt-4o-audio-preview']
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """Routes provider-shaped requests to canned responses"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(format % args)
+
+    # -- helpers -----------------------------------------------------------
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status, payload, extra_headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_text(self, status, text):
+        data = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_sse(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, payload):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self.wfile.write(f"data: {data}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _inject_failure(self, gemini=False):
+        """Apply latency and injected errors; return True if the request was answered"""
+        server = self.server
+        settings = server.settings
+
+        if server.over_rate_limit() or server.roll(settings['rate_limit_rate']):
+            server.count('429')
+            message = "Rate limit reached for requests"
+            payload = ({'error': {'code': 429, 'message': message, 'status': 'RESOURCE_EXHAUSTED'}} if gemini else
+                       {'error': {'message': message, 'type': 'requests', 'code': 'rate_limit_exceeded'}})
+            self._send_json(429, payload, {'Retry-After': f"{settings['retry_after']:g}"})
+            return True
+
+        delay = settings['latency_ms'] + server.random.uniform(0, settings['jitter_ms'])
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if server.roll(settings['error_rate']):
+            server.count('500')
+            payload = ({'error': {'code': 500, 'message': "Internal error", 'status': 'INTERNAL'}} if gemini else
+                       {'error': {'message': "The server had an error while processing your request.", 'type': 'server_error'}})
+            self._send_json(500, payload)
+            return True
+
+        return False
+
+    def _words(self, text):
+        """Split an answer into stream chunks"""
+        words = text.split(' ')
+        return [word if index == 0 else ' ' + word for index, word in enumerate(words)]
+
+    # -- routes ------------------------------------------------------------
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if '/files/' in path:
+            self.handle_get_file(path)
+        elif '/batches/' in path:
+            self.handle_get_batch(path)
+        elif path.endswith('/models'):
+            self.server.count('models')
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'mock'} for model in MOCK_MODELS]})
+        elif path == '/_mock/stats':
+            self._send_json(200, self.server.get_stats())
+        else:
+            self._send_json(404, {'error': {'message': f"Unknown route {path}"}})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+
+        if path == '/_mock/config':
+            try:
+                self.server.configure(**json.loads(body or b'{}'))
+                self._send_json(200, self.server.settings)
+            except (ValueError, TypeError) as e:
+                self._send_json(400, {'error': {'message': str(e)}})
+        elif path.endswith('/chat/completions'):
+            self.handle_chat_completions(body)
+        elif path.endswith('/audio/transcriptions'):
+            self.handle_transcription(body)
+        elif ':generateContent' in path or ':streamGenerateContent' in path:
+            self.handle_generate_content(path, body)
+        elif path.endswith('/files'):
+            self.handle_upload_file(body)
+        elif path.endswith('/batches'):
+            self.handle_create_batch(body)
+        elif '/batches/' in path and path.endswith('/cancel'):
+            self.handle_cancel_batch(path)
+        else:
+            self._send_json(404, {'error': {'message': f"Unknown route {path}"}})
+
+    def handle_chat_completions(self, body):
+        """OpenAI/Perplexity chat completions, including vision, audio input and SSE streaming"""
+        self.server.count('chat_completions')
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': "Invalid JSON body"}})
+            return
+
+        if self._inject_failure():
+            return
+
+        model = request.get('model', 'mock')
+        answer = self.server.settings['answer']
+        created = int(time.time())
+
+        if request.get('stream'):
+            self._start_sse()
+            chunk_delay = self.server.settings['stream_chunk_ms'] / 1000
+            base = {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': created, 'model': model}
+            self._send_event({**base, 'choices': [{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}]})
+            for word in self._words(answer):
+                if chunk_delay:
+                    time.sleep(chunk_delay)
+                self._send_event({**base, 'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]})
+            self._send_event({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+            self._send_event('[DONE]')
+            return
+
+        system_text = ''.join(message.get('content', '') for message in request.get('messages', [])
+                              if message.get('role') == 'system' and isinstance(message.get('content'), str))
+        self._send_json(200, self.server.chat_completion(model, len(body), self.server.cached_tokens(system_text)))
+
+    def handle_transcription(self, body):
+        """Whisper-style multipart transcription"""
+        self.server.count('audio_transcriptions')
+        if self._inject_failure():
+            return
+
+        transcript = self.server.settings['transcript']
+        if b'name="response_format"\r\n\r\ntext' in body:
+            self._send_text(200, transcript)
+        else:
+            self._send_json(200, {'text': transcript})
+
+    def handle_generate_content(self, path, body):
+        """Gemini generateContent / streamGenerateContent"""
+        self.server.count('generate_content')
+        if self._inject_failure(gemini=True):
+            return
+
+        answer = self.server.settings['answer']
+        usage = {'promptTokenCount': max(1, len(body) // 4), 'candidatesTokenCount': max(1, len(answer) // 4)}
+        usage['totalTokenCount'] = usage['promptTokenCount'] + usage['candidatesTokenCount']
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            request = {}
+        instruction = request.get('systemInstruction') or request.get('system_instruction') or {}
+        cached = self.server.cached_tokens(''.join(part.get('text', '') for part in instruction.get('parts', [])))
+        if cached:
+            usage['cachedContentTokenCount'] = cached
+
+        def candidate(text, finished):
+            item = {'content': {'role': 'model', 'parts': [{'text': text}]}, 'index': 0}
+            if finished:
+                item['finishReason'] = 'STOP'
+            return item
+
+        if ':streamGenerateContent' in path:
+            self._start_sse()
+            chunk_delay = self.server.settings['stream_chunk_ms'] / 1000
+            words = self._words(answer)
+            for index, word in enumerate(words):
+                if chunk_delay:
+                    time.sleep(chunk_delay)
+                finished = index == len(words) - 1
+                payload = {'candidates': [candidate(word, finished)]}
+                if finished:
+                    payload['usageMetadata'] = usage
+                self._send_event(payload)
+            return
+
+        self._send_json(200, {'candidates': [candidate(answer, True)], 'usageMetadata': usage})
+
+    def handle_upload_file(self, body):
+        """OpenAI Files API multipart upload"""
+        self.server.count('files')
+        content_type = self.headers.get('Content-Type', '')
+        message = BytesParser(policy=default_policy).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+
+        fields, data, filename = {}, None, 'upload.jsonl'
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'file':
+                data = part.get_payload(decode=True)
+                filename = part.get_filename() or filename
+            elif name:
+                fields[name] = part.get_content().strip()
+
+        if data is None:
+            self._send_json(400, {'error': {'message': "Missing 'file' field"}})
+            return
+
+        self._send_json(200, self.server.add_file(data, filename, fields.get('purpose', 'batch')))
+
+    def handle_get_file(self, path):
+        """File metadata or, for */content, the raw file bytes"""
+        file_id = path.split('/files/', 1)[1].split('/')[0]
+        item = self.server.files.get(file_id)
+        if item is None:
+            self._send_json(404, {'error': {'message': f"No such file {file_id}"}})
+        elif path.endswith('/content'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(item['data'])))
+            self.end_headers()
+            self.wfile.write(item['data'])
+        else:
+            self._send_json(200, item['meta'])
+
+    def handle_create_batch(self, body):
+        """OpenAI Batches API: create a job from an uploaded JSONL file"""
+        self.server.count('batches')
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': "Invalid JSON body"}})
+            return
+
+        if request.get('input_file_id') not in self.server.files:
+            self._send_json(400, {'error': {'message': "input_file_id does not exist"}})
+            return
+        if self._inject_failure():
+            return
+
+        self._send_json(200, self.server.create_batch(request))
+
+    def handle_get_batch(self, path):
+        batch_id = path.split('/batches/', 1)[1].split('/')[0]
+        batch = self.server.get_batch(batch_id)
+        if batch is None:
+            self._send_json(404, {'error': {'message': f"No such batch {batch_id}"}})
+        else:
+            self._send_json(200, batch)
+
+    def handle_cancel_batch(self, path):
+        batch_id = path.split('/batches/', 1)[1].split('/')[0]
+        batch = self.server.cancel_batch(batch_id)
+        if batch is None:
+            self._send_json(404, {'error': {'message': f"No such batch {batch_id}"}})
+        else:
+            self._send_json(200, batch)
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    """Threaded localhost server with runtime-configurable failure injection"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, **settings):
+        super().__init__((host, port), MockProviderHandler)
+        self.logger = logging.getLogger(__name__)
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.request_times = []
+        self.random = random.Random()
+        self.files = {}
+        self.batches = {}
+        self.seen_prefixes = set()
+        self.thread = None
+        self.configure(**settings)
+
+    @property
+    def url(self):
+        """Base URL of the running server"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def configure(self, **settings):
+        """Update latency, error and rate-limit settings"""
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown mock settings: {', '.join(sorted(unknown))}")
+        self.settings.update(settings)
+        if 'seed' in settings:
+            self.random.seed(settings['seed'])
+
+    def roll(self, probability):
+        """Return True with the given probability"""
+        with self.stats_lock:
+            return probability > 0 and self.random.random() < probability
+
+    def over_rate_limit(self):
+        """Sliding one-second window against max_rps"""
+        max_rps = self.settings['max_rps']
+        if not max_rps:
+            return False
+        now = time.monotonic()
+        with self.stats_lock:
+            self.request_times = [t for t in self.request_times if now - t < 1.0]
+            if len(self.request_times) >= max_rps:
+                return True
+            self.request_times.append(now)
+            return False
+
+    def count(self, name):
+        """Increment a request/outcome counter"""
+        with self.stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def get_stats(self):
+        """Get request and injected-failure counts"""
+        with self.stats_lock:
+            return dict(self.stats)
+
+    def cached_tokens(self, prefix):
+        """Simulated provider prompt caching: a repeated prefix of prompt_cache_min_tokens or more
+        is served from cache in 128-token blocks"""
+        tokens = len(prefix) // 4
+        if not prefix or tokens < self.settings['prompt_cache_min_tokens']:
+            return 0
+        digest = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+        with self.stats_lock:
+            seen = digest in self.seen_prefixes
+            self.seen_prefixes.add(digest)
+        return tokens // 128 * 128 if seen else 0
+
+    def chat_completion(self, model, prompt_chars, cached_tokens=0):
+        """Non-streaming chat completion body"""
+        answer = self.settings['answer']
+        prompt_tokens = max(1, prompt_chars // 4, cached_tokens)
+        completion_tokens = max(1, len(answer) // 4)
+        return {
+            'id': 'chatcmpl-mock',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens,
+                      'prompt_tokens_details': {'cached_tokens': cached_tokens}}
+        }
+
+    # -- batch lifecycle -----------------------------------------------------
+
+    def add_file(self, data, filename, purpose):
+        """Store an uploaded or generated file and return its metadata"""
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        meta = {'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()),
+                'filename': filename, 'purpose': purpose}
+        with self.stats_lock:
+            self.files[file_id] = {'meta': meta, 'data': data}
+        return meta
+
+    def create_batch(self, request):
+        """Start a simulated batch job"""
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        lines = [line for line in self.files[request['input_file_id']]['data'].splitlines() if line.strip()]
+        now = time.time()
+        batch = {
+            'id': batch_id,
+            'object': 'batch',
+            'endpoint': request.get('endpoint', '/v1/chat/completions'),
+            'input_file_id': request['input_file_id'],
+            'completion_window': request.get('completion_window', '24h'),
+            'status': 'validating',
+            'output_file_id': None,
+            'error_file_id': None,
+            'created_at': int(now),
+            'completed_at': None,
+            'request_counts': {'total': len(lines), 'completed': 0, 'failed': 0},
+            'metadata': request.get('metadata'),
+            '_started': now
+        }
+        with self.stats_lock:
+            self.batches[batch_id] = batch
+        return self._public_batch(batch)
+
+    def get_batch(self, batch_id):
+        """Advance a batch through its lifecycle by elapsed time and return it"""
+        with self.stats_lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+
+        if batch['status'] in ('validating', 'in_progress', 'finalizing'):
+            duration = max(self.settings['batch_duration_s'], 1e-6)
+            progress = (time.time() - batch['_started']) / duration
+            if progress >= 1:
+                self._complete_batch(batch)
+            elif progress >= 0.8:
+                batch['status'] = 'finalizing'
+            elif progress >= 0.1:
+                batch['status'] = 'in_progress'
+                total = batch['request_counts']['total']
+                batch['request_counts']['completed'] = int(total * min(1, (progress - 0.1) / 0.7))
+        return self._public_batch(batch)
+
+    def cancel_batch(self, batch_id):
+        with self.stats_lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        if batch['status'] not in ('completed', 'failed', 'expired'):
+            batch['status'] = 'cancelled'
+        return self._public_batch(batch)
+
+    def _complete_batch(self, batch):
+        """Answer every request line, splitting failures into the error file"""
+        outputs, errors = [], []
+        for line in self.files[batch['input_file_id']]['data'].splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            result = {'id': f"batch_req_{uuid.uuid4().hex[:24]}", 'custom_id': request.get('custom_id'), 'error': None}
+            if self.roll(self.settings['error_rate']):
+                result['response'] = {'status_code': 500, 'request_id': uuid.uuid4().hex,
+                                      'body': {'error': {'message': "The server had an error while processing your request.",
+                                                         'type': 'server_error'}}}
+                errors.append(result)
+            else:
+                body = request.get('body', {})
+                result['response'] = {'status_code': 200, 'request_id': uuid.uuid4().hex,
+                                      'body': self.chat_completion(body.get('model', 'mock'), len(line))}
+                outputs.append(result)
+
+        to_jsonl = lambda results: ''.join(json.dumps(result) + '\n' for result in results).encode('utf-8')
+        batch['output_file_id'] = self.add_file(to_jsonl(outputs), f"{batch['id']}_output.jsonl", 'batch_output')['id']
+        if errors:
+            batch['error_file_id'] = self.add_file(to_jsonl(errors), f"{batch['id']}_error.jsonl", 'batch_output')['id']
+        batch['request_counts'].update(completed=len(outputs), failed=len(errors))
+        batch['status'] = 'completed'
+        batch['completed_at'] = int(time.time())
+
+    @staticmethod
+    def _public_batch(batch):
+        return {key: value for key, value in batch.items() if not key.startswith('_')}
+
+    def start(self):
+        """Serve in a background thread and return the base URL"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI/Perplexity/Gemini endpoints")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--max-rps', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--stream-chunk-ms', type=float, default=10.0)
+    parser.add_argument('--batch-duration-s', type=float, default=2.0)
+    parser.add_argument('--prompt-cache-min-tokens', type=int, default=1024)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    server = MockProviderServer(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                max_rps=args.max_rps, retry_after=args.retry_after,
+                                stream_chunk_ms=args.stream_chunk_ms, batch_duration_s=args.batch_duration_s,
+                                prompt_cache_min_tokens=args.prompt_cache_min_tokens, seed=args.seed)
+    server.logger.info(f"Mock provider server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,14 @@ import cv2
 import numpy as np
 import pytesseract
 from PIL import ImageGrab, Image
+import base64
+import io
 import logging
 import time
 import os
 import platform
 import subprocess
+from profiler_module import profiler
 
 class OCRCapture:
     def __init__(self):
@@ -85,7 +88,8 @@ class OCRCapture:
             
         try:
             # Capture screenshot
-            screenshot = ImageGrab.grab()
+            with profiler.span('capture'):
+                screenshot = ImageGrab.grab()
             
             # Convert to OpenCV format
             screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
@@ -94,7 +98,8 @@ class OCRCapture:
             processed_image = self.preprocess_image(screenshot_cv)
             
             # Perform OCR
-            text = pytesseract.image_to_string(processed_image, config='--psm 6')
+            with profiler.span('ocr'):
+                text = pytesseract.image_to_string(processed_image, config='--psm 6')
             
             # Clean and filter text
             cleaned_text = self.clean_text(text)
@@ -118,7 +123,8 @@ class OCRCapture:
             
         try:
             # Capture screenshot
-            screenshot = ImageGrab.grab()
+            with profiler.span('capture'):
+                screenshot = ImageGrab.grab()
             
             # Convert to OpenCV format
             screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
@@ -127,7 +133,8 @@ class OCRCapture:
             processed_image = self.preprocess_image(screenshot_cv)
             
             # Perform OCR with different config for better accuracy
-            text = pytesseract.image_to_string(processed_image, config='--psm 3')
+            with profiler.span('ocr'):
+                text = pytesseract.image_to_string(processed_image, config='--psm 3')
             
             # Clean and filter text
             cleaned_text = self.clean_text(text)
@@ -170,6 +177,67 @@ class OCRCapture:
             
         return cleaned_text
         
+    def read_image_text(self, base64_image):
+        """
+        OCR an encoded screenshot with per-word confidences.
+        Returns {'text', 'lines', 'confidence', 'words', 'diagram_ratio'} or None;
+        lines are {'text', 'top', 'bottom'} in reading order, confidence is the
+        mean word confidence (0-100, weighted by word length) and diagram_ratio
+        the share of edge pixels outside any word box, which is high for
+        charts, figures and circuit diagrams.
+        """
+        if not self.tesseract_available:
+            return None
+
+        try:
+            with Image.open(io.BytesIO(base64.b64decode(base64_image))) as image:
+                screenshot_cv = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+
+            processed_image = self.preprocess_image(screenshot_cv)
+            with profiler.span('ocr'):
+                data = pytesseract.image_to_data(processed_image, config='--psm 3',
+                                                 output_type=pytesseract.Output.DICT)
+
+            lines = {}
+            word_mask = np.zeros(processed_image.shape[:2], dtype=bool)
+            weighted_confidence = 0.0
+            characters = 0
+            words = 0
+            for index, word in enumerate(data['text']):
+                word = word.strip()
+                confidence = float(data['conf'][index])
+                if not word or confidence < 0:
+                    continue
+                top, bottom = data['top'][index], data['top'][index] + data['height'][index]
+                line_key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+                line = lines.setdefault(line_key, {'words': [], 'top': top, 'bottom': bottom})
+                line['words'].append(word)
+                line['top'] = min(line['top'], top)
+                line['bottom'] = max(line['bottom'], bottom)
+                weighted_confidence += confidence * len(word)
+                characters += len(word)
+                words += 1
+                left = data['left'][index]
+                word_mask[top:bottom, left:left + data['width'][index]] = True
+
+            edges = cv2.Canny(cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY), 100, 200) > 0
+            edge_pixels = int(edges.sum())
+            diagram_ratio = float((edges & ~word_mask).sum()) / edge_pixels if edge_pixels else 0.0
+
+            ordered_lines = [{'text': ' '.join(line['words']), 'top': line['top'], 'bottom': line['bottom']}
+                             for _, line in sorted(lines.items())]
+            return {
+                'text': self.clean_text('\n'.join(line['text'] for line in ordered_lines)),
+                'lines': ordered_lines,
+                'confidence': weighted_confidence / characters if characters else 0.0,
+                'words': words,
+                'diagram_ratio': diagram_ratio
+            }
+
+        except Exception as e:
+            self.logger.error(f"Image OCR error: {e}")
+            return None
+
     def capture_region_text(self, x, y, width, height):
         """Capture text from a specific screen region"""
         if not self.tesseract_available:
@@ -184,7 +252,8 @@ class OCRCapture:
             
             # Preprocess and OCR
             processed_image = self.preprocess_image(screenshot_cv)
-            text = pytesseract.image_to_string(processed_image, config='--psm 6')
+            with profiler.span('ocr'):
+                text = pytesseract.image_to_string(processed_image, config='--psm 6')
             
             return self.clean_text(text)
             
@@ -3,17 +3,47 @@ import logging
 import time
 from typing import Optional
 import json
+from profiler_module import profiler
+from body_module import StreamedJSONBody
+from sizing_module import request_sizer, question_type, estimate_request_tokens
+from prompt_module import (ANSWER_SYSTEM_PROMPTS, VISION_SYSTEM_PROMPTS, IMAGE_QUESTION_SYSTEM_PROMPTS,
+                           QUESTION_TEMPLATE, IMAGE_QUESTION_TEMPLATE, VISION_USER_TEXT, mode_prompt,
+                           prompt_cache_stats)
 
 class PerplexityClient:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
         self.api_key = api_key
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = base_url or "https://api.perplexity.ai/chat/completions"
         
         # Rate limiting
         self.last_request_time = 0
         self.min_request_interval = 1  # Minimum seconds between requests
         
+    def _post(self, headers, payload, kind):
+        """POST with an adaptive max_tokens budget (payload's max_tokens is the ceiling), retried in full if cut off"""
+        ceiling = payload['max_tokens']
+        payload = {**payload, 'max_tokens': request_sizer.max_tokens(kind, ceiling)}
+        
+        def post(body):
+            request_start = time.perf_counter()
+            with profiler.span('llm_request', provider='perplexity'):
+                # Image data is streamed from the payload rather than copied by json=
+                response = requests.post(self.base_url, headers=headers, data=StreamedJSONBody(body), timeout=30)
+            # Time to response headers - the closest thing to first token without streaming
+            profiler.record('first_token', request_start, response.elapsed.total_seconds(), provider='perplexity')
+            return response
+        
+        response = post(payload)
+        if response.status_code == 200:
+            result = response.json()
+            choices = result.get('choices') or [{}]
+            if request_sizer.observe(kind, payload['max_tokens'], ceiling,
+                                     (result.get('usage') or {}).get('completion_tokens'),
+                                     choices[0].get('finish_reason'), estimate_request_tokens(payload)):
+                response = post({**payload, 'max_tokens': ceiling})
+        return response
+        
     def analyze_image(self, base64_image: str, response_mode: str = 'short', custom_prompt: str = None) -> str:
         """Analyze image using Perplexity Vision API"""
         if not self.api_key:
@@ -26,25 +56,7 @@ class PerplexityClient:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
             # Prepare prompt based on response mode
-            if custom_prompt:
-                system_prompt = custom_prompt
-            elif response_mode == 'detailed':
-                system_prompt = """You are an intelligent exam helper with vision capabilities. Analyze the image and:
-1. Identify any questions, problems, or text that needs answering
-2. Provide detailed, comprehensive answers with explanations
-3. Include step-by-step solutions for math problems
-4. Explain concepts and provide relevant context
-5. If multiple questions are visible, answer all of them clearly
-
-Be thorough and educational in your responses."""
-            else:
-                system_prompt = """You are an intelligent exam helper with vision capabilities. Analyze the image and:
-1. Identify any questions, problems, or text that needs answering
-2. Provide concise, direct answers
-3. Be brief but accurate
-4. Focus on the essential information needed
-
-If multiple questions are visible, answer all of them concisely."""
+            system_prompt = custom_prompt or mode_prompt(VISION_SYSTEM_PROMPTS, response_mode)
             
             # Prepare the request payload
             headers = {
@@ -64,7 +76,7 @@ If multiple questions are visible, answer all of them concisely."""
                         "content": [
                             {
                                 "type": "text",
-                                "text": "Please analyze this image and answer any questions or problems you can see."
+                                "text": VISION_USER_TEXT
                             },
                             {
                                 "type": "image_url",
@@ -81,12 +93,13 @@ If multiple questions are visible, answer all of them concisely."""
             }
             
             # Make API call
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+            response = self._post(headers, payload, f"perplexity:vision:{response_mode}")
             
             self.last_request_time = time.time()
             
             if response.status_code == 200:
                 result = response.json()
+                prompt_cache_stats.record_openai('perplexity', result.get('usage'))
                 if 'choices' in result and len(result['choices']) > 0:
                     answer = result['choices'][0]['message']['content'].strip()
                     return answer
@@ -124,11 +137,7 @@ If multiple questions are visible, answer all of them concisely."""
             if current_time - self.last_request_time < self.min_request_interval:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
-            # Prepare prompt
-            if response_mode == 'detailed':
-                system_prompt = "You are an intelligent exam helper. Analyze the image and provide detailed answers with explanations."
-            else:
-                system_prompt = "You are an intelligent exam helper. Analyze the image and provide concise, direct answers."
+            system_prompt = mode_prompt(IMAGE_QUESTION_SYSTEM_PROMPTS, response_mode)
             
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -147,7 +156,7 @@ If multiple questions are visible, answer all of them concisely."""
                         "content": [
                             {
                                 "type": "text",
-                                "text": f"Question: {question}\n\nPlease analyze this image and answer the question above."
+                                "text": IMAGE_QUESTION_TEMPLATE.format(question=question)
                             },
                             {
                                 "type": "image_url",
@@ -163,11 +172,12 @@ If multiple questions are visible, answer all of them concisely."""
                 "stream": False
             }
             
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+            response = self._post(headers, payload, f"perplexity:vision:question:{response_mode}")
             self.last_request_time = time.time()
             
             if response.status_code == 200:
                 result = response.json()
+                prompt_cache_stats.record_openai('perplexity', result.get('usage'))
                 if 'choices' in result and len(result['choices']) > 0:
                     return result['choices'][0]['message']['content'].strip()
                 else:
@@ -190,11 +200,7 @@ If multiple questions are visible, answer all of them concisely."""
             if current_time - self.last_request_time < self.min_request_interval:
                 time.sleep(self.min_request_interval - (current_time - self.last_request_time))
             
-            # Prepare prompt based on response mode
-            if response_mode == 'detailed':
-                system_prompt = """You are an intelligent exam helper. Provide detailed, comprehensive answers with explanations, examples, and step-by-step solutions when applicable. Include relevant context and background information."""
-            else:
-                system_prompt = """You are an intelligent exam helper. Provide concise, direct answers. Be brief but accurate. Focus on the essential information needed to answer the question."""
+            system_prompt = mode_prompt(ANSWER_SYSTEM_PROMPTS, response_mode)
             
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -210,7 +216,7 @@ If multiple questions are visible, answer all of them concisely."""
                     },
                     {
                         "role": "user",
-                        "content": f"Question: {question}"
+                        "content": QUESTION_TEMPLATE.format(question=question)
                     }
                 ],
                 "max_tokens": 500 if response_mode == 'short' else 1000,
@@ -218,11 +224,12 @@ If multiple questions are visible, answer all of them concisely."""
                 "stream": False
             }
             
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+            response = self._post(headers, payload, f"perplexity:text:{question_type(question)}:{response_mode}")
             self.last_request_time = time.time()
             
             if response.status_code == 200:
                 result = response.json()
+                prompt_cache_stats.record_openai('perplexity', result.get('usage'))
                 if 'choices' in result and len(result['choices']) > 0:
                     return result['choices'][0]['message']['content'].strip()
                 else:
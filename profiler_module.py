@@ -0,0 +1,113 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Span timers for the capture -> recognize -> answer -> display pipeline.
+    Spans go into a fixed-size ring buffer. Recording takes no lock: the slot
+    index comes from itertools.count, whose next() is atomic under the GIL.
+    """
+
+    def __init__(self, capacity=20000):
+        self.logger = logging.getLogger(__name__)
+        self.capacity = capacity
+        self.buffer = [None] * capacity
+        self.counter = itertools.count()
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+
+    def record(self, name, start, duration, **args):
+        """Record a finished span (start is a time.perf_counter() value)"""
+        if not self.enabled:
+            return
+        index = next(self.counter)
+        self.buffer[index % self.capacity] = (name, start, duration, threading.get_ident(), args or None)
+
+    @contextmanager
+    def span(self, name, **args):
+        """Time the enclosed block as a span"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+
+    def mark(self, name, **args):
+        """Record an instant event"""
+        self.record(name, time.perf_counter(), 0.0, **args)
+
+    def reset(self):
+        """Drop all recorded spans"""
+        self.buffer = [None] * self.capacity
+        self.counter = itertools.count()
+
+    def spans(self):
+        """Snapshot of recorded spans ordered by start time"""
+        return sorted((item for item in list(self.buffer) if item is not None), key=lambda item: item[1])
+
+    def stage_stats(self):
+        """Get count, mean and p50/p95/p99 in milliseconds per stage"""
+        durations = {}
+        for name, _start, duration, _tid, _args in self.spans():
+            durations.setdefault(name, []).append(duration * 1000)
+
+        def percentile(values, fraction):
+            return values[min(len(values) - 1, int(len(values) * fraction))]
+
+        stats = {}
+        for name, values in durations.items():
+            values.sort()
+            stats[name] = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'p99': percentile(values, 0.99)
+            }
+        return stats
+
+    def export_chrome_trace(self, path):
+        """Write spans as Chrome trace JSON (load in chrome://tracing or Perfetto)"""
+        events = []
+        for name, start, duration, tid, args in self.spans():
+            event = {
+                'name': name,
+                'cat': 'exam_helper',
+                'ts': (start - self.origin) * 1e6,
+                'pid': self.pid,
+                'tid': tid
+            }
+            if duration > 0:
+                event['ph'] = 'X'
+                event['dur'] = duration * 1e6
+            else:
+                event['ph'] = 'i'
+                event['s'] = 't'
+            if args:
+                event['args'] = args
+            events.append(event)
+
+        try:
+            with open(path, 'w') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+            self.logger.info(f"Exported {len(events)} trace events to {path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Trace export error: {e}")
+            return False
+
+
+# Shared instance used by all modules
+profiler = Profiler()
+span = profiler.span
@@ -0,0 +1,123 @@
+import importlib
+import logging
+import threading
+import time
+
+
+class ComponentRegistry:
+    """
+    Lazily imports and initializes heavy subsystems (OCR, audio, AI clients).
+    Each component is built on first use or by a background warm-up thread,
+    and the import and init cost of each one is recorded.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.factories = {}   # name -> (module name, factory(module) -> instance)
+        self.instances = {}
+        self.locks = {}
+        self.callbacks = {}   # name -> callbacks waiting for the component
+        self.timings = {}     # name -> {'module', 'import', 'init'}
+        self.registry_lock = threading.Lock()
+        self.warm_up_thread = None
+
+    def register(self, name, module_name, factory):
+        """Register a component built by factory(module) on first use"""
+        with self.registry_lock:
+            self.factories[name] = (module_name, factory)
+            self.locks[name] = threading.Lock()
+            self.callbacks.setdefault(name, [])
+
+    def is_ready(self, name):
+        """Check whether a component has been built"""
+        return name in self.instances
+
+    def get(self, name):
+        """Get a component, importing and building it if needed"""
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self.factories:
+            raise KeyError(f"Unknown component: {name}")
+
+        with self.locks[name]:
+            # Another thread may have finished building it while we waited
+            if name in self.instances:
+                return self.instances[name]
+
+            module_name, factory = self.factories[name]
+
+            # Import cost is incremental: modules already loaded by an
+            # earlier component are not counted again
+            start = time.perf_counter()
+            module = importlib.import_module(module_name)
+            imported = time.perf_counter()
+            instance = factory(module)
+            built = time.perf_counter()
+
+            self.timings[name] = {
+                'module': module_name,
+                'import': imported - start,
+                'init': built - imported
+            }
+            self.instances[name] = instance
+            self.logger.info(f"Component {name} ready (import {imported - start:.3f}s, init {built - imported:.3f}s)")
+
+            with self.registry_lock:
+                callbacks = self.callbacks.get(name, [])
+                self.callbacks[name] = []
+
+        for callback in callbacks:
+            try:
+                callback(instance)
+            except Exception as e:
+                self.logger.error(f"Component {name} ready callback error: {e}")
+
+        return instance
+
+    def when_ready(self, name, callback):
+        """Call callback(instance) once the component is built (immediately if it already is)"""
+        with self.registry_lock:
+            if name not in self.instances:
+                self.callbacks.setdefault(name, []).append(callback)
+                return
+        callback(self.instances[name])
+
+    def warm_up(self, names=None, on_done=None):
+        """Build components in a background thread, in the given order"""
+        names = list(names) if names else list(self.factories)
+
+        def _warm_up():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    self.logger.error(f"Component {name} failed to initialize: {e}")
+            if on_done:
+                try:
+                    on_done()
+                except Exception as e:
+                    self.logger.error(f"Warm-up completion callback error: {e}")
+
+        self.warm_up_thread = threading.Thread(target=_warm_up, daemon=True)
+        self.warm_up_thread.start()
+        return self.warm_up_thread
+
+    def get_timings(self):
+        """Get per-component import and init timings"""
+        return {name: dict(timing) for name, timing in self.timings.items()}
+
+    def format_timings(self):
+        """Format the startup cost breakdown as a text table"""
+        lines = [f"{'Component':<20} {'Module':<22} {'Import':>8} {'Init':>8} {'Total':>8}"]
+        total_import = 0.0
+        total_init = 0.0
+        for name, timing in self.timings.items():
+            total_import += timing['import']
+            total_init += timing['init']
+            lines.append(f"{name:<20} {timing['module']:<22} {timing['import']:>7.3f}s {timing['init']:>7.3f}s "
+                         f"{timing['import'] + timing['init']:>7.3f}s")
+        lines.append(f"{'Total':<20} {'':<22} {total_import:>7.3f}s {total_init:>7.3f}s "
+                     f"{total_import + total_init:>7.3f}s")
+        return "\n".join(lines)
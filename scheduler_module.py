@@ -0,0 +1,229 @@
+import base64
+import io
+import logging
+import threading
+import time
+from collections import deque
+
+from PIL import Image, ImageChops, ImageStat
+
+
+class LiveScreenScheduler:
+    """
+    Fixed-cadence capture with latest-wins analysis.
+    A ticker thread captures a frame every interval_fn() seconds, measured from
+    the previous tick rather than from when the last analysis finished, so the
+    cadence does not drift with model latency. Up to max_in_flight worker
+    threads analyze frames; while all are busy only the newest frame waits and
+    older ones are dropped.
+    """
+
+    def __init__(self, capture, analyze, interval_fn, max_in_flight=1, name='live_screen'):
+        self.logger = logging.getLogger(__name__)
+        self.capture = capture  # () -> frame or None
+        self.analyze = analyze  # (frame) -> None
+        self.interval_fn = interval_fn  # () -> seconds until the next capture
+        self.max_in_flight = max(1, max_in_flight)
+        self.name = name
+
+        self.stop_event = threading.Event()
+        self.condition = threading.Condition()
+        self.pending = None  # (captured_at, frame) waiting for a free worker
+        self.in_flight = 0
+        self.threads = []
+
+        self.captured = 0
+        self.analyzed = 0
+        self.dropped = 0
+        self.capture_failures = 0
+        self.late_ticks = 0
+        self.capture_times = deque(maxlen=600)
+        self.analysis_times = deque(maxlen=600)
+        self.analysis_latency = deque(maxlen=100)
+        self.frame_age = deque(maxlen=100)
+        self.last_interval = None
+
+    @property
+    def running(self):
+        return bool(self.threads) and not self.stop_event.is_set()
+
+    def start(self):
+        """Start the ticker and analysis workers"""
+        if self.running:
+            return
+        # A fresh event per run: threads of an earlier run keep seeing theirs set and exit
+        self.stop_event = stop_event = threading.Event()
+        self.threads = [threading.Thread(target=self._tick_loop, args=(stop_event,), daemon=True,
+                                         name=f"{self.name}-ticker")]
+        self.threads += [threading.Thread(target=self._worker_loop, args=(stop_event,), daemon=True,
+                                          name=f"{self.name}-worker-{index}")
+                         for index in range(self.max_in_flight)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop capturing; analyses already running finish in the background"""
+        self.stop_event.set()
+        with self.condition:
+            self.pending = None
+            self.condition.notify_all()
+
+    def _tick_loop(self, stop_event):
+        next_tick = time.monotonic()
+        while not stop_event.is_set():
+            try:
+                frame = self.capture()
+            except Exception as e:
+                self.logger.error(f"{self.name} capture error: {e}")
+                frame = None
+
+            now = time.monotonic()
+            if frame is None:
+                self.capture_failures += 1
+            else:
+                self.captured += 1
+                self.capture_times.append(now)
+                self.offer(frame, now)
+
+            self.last_interval = max(0.1, float(self.interval_fn()))
+            next_tick += self.last_interval
+            if next_tick < now:
+                # Capture took longer than the interval; skip missed ticks instead of bursting
+                self.late_ticks += 1
+                next_tick = now + self.last_interval
+            stop_event.wait(next_tick - now)
+
+    def offer(self, frame, captured_at=None):
+        """Hand a frame to the workers, replacing any frame still waiting"""
+        with self.condition:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = (captured_at or time.monotonic(), frame)
+            self.condition.notify()
+
+    def _worker_loop(self, stop_event):
+        while True:
+            with self.condition:
+                # Analyses left over from a previous run still count against max_in_flight
+                while (self.pending is None or self.in_flight >= self.max_in_flight) and not stop_event.is_set():
+                    self.condition.wait()
+                if stop_event.is_set():
+                    return
+                captured_at, frame = self.pending
+                self.pending = None
+                self.in_flight += 1
+
+            started = time.monotonic()
+            try:
+                self.analyze(frame)
+            except Exception as e:
+                self.logger.error(f"{self.name} analysis error: {e}")
+            finally:
+                finished = time.monotonic()
+                with self.condition:
+                    self.in_flight -= 1
+                    self.condition.notify_all()
+                    self.analyzed += 1
+                    self.analysis_times.append(finished)
+                    self.analysis_latency.append(finished - started)
+                    self.frame_age.append(finished - captured_at)
+
+    def get_stats(self):
+        """Real capture/analysis rates, drops and latency"""
+        now = time.monotonic()
+        with self.condition:
+            latency = sorted(self.analysis_latency)
+            ages = list(self.frame_age)
+            return {
+                'running': self.running,
+                'interval': self.last_interval,
+                'captured': self.captured,
+                'analyzed': self.analyzed,
+                'dropped': self.dropped,
+                'capture_failures': self.capture_failures,
+                'late_ticks': self.late_ticks,
+                'in_flight': self.in_flight,
+                'captures_per_minute': sum(1 for t in self.capture_times if now - t <= 60),
+                'analyses_per_minute': sum(1 for t in self.analysis_times if now - t <= 60),
+                'analysis_p50': latency[len(latency) // 2] if latency else None,
+                'mean_frame_age': sum(ages) / len(ages) if ages else None
+            }
+
+
+def frame_thumbnail(base64_image, size=(32, 32)):
+    """Tiny grayscale thumbnail of a base64 frame for change detection"""
+    with Image.open(io.BytesIO(base64.b64decode(base64_image))) as image:
+        return image.convert('L').resize(size, Image.Resampling.BILINEAR)
+
+
+def frame_change(previous, current):
+    """Mean absolute pixel difference between two thumbnails, 0.0 (same) to 1.0"""
+    if previous is None or current is None:
+        return 1.0
+    return ImageStat.Stat(ImageChops.difference(previous, current)).mean[0] / 255
+
+
+class AdaptiveIntervalController:
+    """
+    Live screen interval policy.
+    The interval halves toward min_interval while the screen is changing, grows
+    by backoff per static frame toward max_interval, and doubles (held for the
+    cooldown) whenever the provider reports a rate limit or exhausted quota.
+    Every change is logged with its reason so the thresholds can be tuned.
+    """
+
+    def __init__(self, interval=5, min_interval=2, max_interval=30, change_threshold=0.02,
+                 backoff=1.5, speedup=0.5):
+        self.logger = logging.getLogger(__name__)
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.change_threshold = change_threshold
+        self.backoff = backoff
+        self.speedup = speedup
+
+        self.lock = threading.Lock()
+        self.rate_limited_until = 0
+        self.static_frames = 0
+        self.decisions = deque(maxlen=200)  # (time, interval, reason, change)
+
+    def _set(self, interval, reason, change=None):
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        if abs(interval - self.interval) >= 0.05:
+            detail = f", change {change:.3f}" if change is not None else ""
+            self.logger.info(f"Live screen interval {self.interval:.1f}s -> {interval:.1f}s ({reason}{detail})")
+            self.decisions.append((time.time(), interval, reason, change))
+        self.interval = interval
+
+    def observe_frame(self, change):
+        """Adjust for how much the screen changed since the previous frame"""
+        with self.lock:
+            if change >= self.change_threshold:
+                self.static_frames = 0
+                if time.monotonic() < self.rate_limited_until:
+                    return  # Stay backed off until the rate-limit cooldown ends
+                self._set(self.interval * self.speedup, 'screen changing', change)
+            else:
+                self.static_frames += 1
+                self._set(self.interval * self.backoff, f'static x{self.static_frames}', change)
+
+    def observe_result(self, rate_limited):
+        """Back off when the provider reports a rate limit or exhausted quota"""
+        if not rate_limited:
+            return
+        with self.lock:
+            self._set(self.interval * 2, 'rate limited')
+            self.rate_limited_until = time.monotonic() + self.interval * 2
+
+    def next_interval(self):
+        with self.lock:
+            return self.interval
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'interval': self.interval,
+                'static_frames': self.static_frames,
+                'rate_limited': time.monotonic() < self.rate_limited_until,
+                'recent_decisions': [{'interval': interval, 'reason': reason} for _, interval, reason, _ in list(self.decisions)[-5:]]
+            }
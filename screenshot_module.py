@@ -6,6 +6,8 @@ import logging
 import time
 import win32gui
 import win32con
+from profiler_module import profiler
+from legibility_module import estimate_text_height, legible_scale
 
 class ScreenshotCapture:
     def __init__(self):
@@ -34,7 +36,8 @@ class ScreenshotCapture:
                     time.sleep(0.2)
             
             # Capture the screen
-            screenshot = ImageGrab.grab()
+            with profiler.span('capture'):
+                screenshot = ImageGrab.grab()
             
             # Restore the window if we minimized it
             if was_minimized and exclude_hwnd:
@@ -66,18 +69,19 @@ class ScreenshotCapture:
             if screenshot.mode != 'RGB':
                 screenshot = screenshot.convert('RGB')
             
-            # Save to bytes buffer
-            buffer = io.BytesIO()
-            
-            if format.upper() == 'JPEG':
-                screenshot.save(buffer, format='JPEG', quality=quality, optimize=True)
-            else:
-                screenshot.save(buffer, format='PNG', optimize=True)
-            
-            # Get base64 string
-            buffer.seek(0)
-            image_bytes = buffer.getvalue()
-            base64_string = base64.b64encode(image_bytes).decode('utf-8')
+            with profiler.span('encode', kind='image', format=format.upper()):
+                # Save to bytes buffer
+                buffer = io.BytesIO()
+                
+                if format.upper() == 'JPEG':
+                    screenshot.save(buffer, format='JPEG', quality=quality, optimize=True)
+                else:
+                    screenshot.save(buffer, format='PNG', optimize=True)
+                
+                # Get base64 string
+                buffer.seek(0)
+                image_bytes = buffer.getvalue()
+                base64_string = base64.b64encode(image_bytes).decode('utf-8')
             
             return base64_string
             
@@ -121,8 +125,30 @@ class ScreenshotCapture:
             self.logger.error(f"Screenshot resize error: {e}")
             return screenshot
     
-    def capture_and_encode(self, exclude_window_title="Exam Helper", resize=True, format='PNG'):
-        """Capture screen and return base64 encoded image"""
+    def resize_for_legibility(self, screenshot, min_text_px=10):
+        """Downscale as far as text stays min_text_px tall; falls back to the 1024 cap when no text is found"""
+        try:
+            with profiler.span('legibility'):
+                text_height = estimate_text_height(screenshot)
+            if text_height is None:
+                return self.resize_screenshot(screenshot)
+            
+            width, height = screenshot.size
+            scale = legible_scale(text_height, screenshot.size, min_text_px)
+            if scale < 1:
+                new_width = int(width * scale)
+                new_height = int(height * scale)
+                screenshot = screenshot.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            self.logger.info(f"Text height {text_height:.0f}px: screenshot {width}x{height} -> "
+                             f"{screenshot.width}x{screenshot.height}")
+            return screenshot
+            
+        except Exception as e:
+            self.logger.error(f"Legibility resize error: {e}")
+            return self.resize_screenshot(screenshot)
+    
+    def capture_and_encode(self, exclude_window_title="Exam Helper", resize=True, format='PNG', min_text_px=None):
+        """Capture screen and return base64 encoded image (resized by text legibility when min_text_px is set)"""
         try:
             # Capture screenshot excluding our window
             screenshot = self.capture_screen_excluding_window(exclude_window_title)
@@ -131,7 +157,9 @@ class ScreenshotCapture:
                 return None
             
             # Resize if requested to reduce API costs
-            if resize:
+            if resize and min_text_px:
+                screenshot = self.resize_for_legibility(screenshot, min_text_px)
+            elif resize:
                 screenshot = self.resize_screenshot(screenshot)
             
             # Convert to base64
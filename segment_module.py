@@ -0,0 +1,74 @@
+import base64
+import io
+import re
+
+from PIL import Image
+
+# "Q3", "Q.3", "Question 3" - preferred over bare numbering when present
+EXPLICIT_LABEL = re.compile(r'^\s*Q(?:uestion)?\s*\.?\s*(\d+)\b', re.IGNORECASE)
+# "3." or "3)" followed by text
+NUMBERED_LABEL = re.compile(r'^\s*(\d+)\s*[.)](?=\s|$)')
+
+
+def question_starts(lines):
+    """(line index, number) of OCR lines that start a new question"""
+    explicit, numbered = [], []
+    for index, line in enumerate(lines):
+        match = EXPLICIT_LABEL.match(line['text'])
+        if match:
+            explicit.append((index, int(match.group(1))))
+            continue
+        match = NUMBERED_LABEL.match(line['text'])
+        if match:
+            numbered.append((index, int(match.group(1))))
+
+    # Follow one increasing run so numbered answer options inside a question are not split off
+    starts = []
+    for index, number in explicit or numbered:
+        if not starts or number == starts[-1][1] + 1:
+            starts.append((index, number))
+    return starts
+
+
+def segment_lines(lines, max_preamble_lines=3):
+    """
+    Split OCR lines into one segment per question.
+    Returns [{'label', 'text', 'top', 'bottom'}] (bottom is None for the last
+    question, which runs to the end of the image), or [] when there are fewer
+    than two questions, a long passage above them that they may depend on, or
+    bands that do not run down the screen in question order.
+    """
+    # Tesseract orders lines by block; on column or sidebar layouts a later block can start higher up
+    lines = sorted(lines, key=lambda line: line['top'])
+    starts = question_starts(lines)
+    if len(starts) < 2 or starts[0][0] > max_preamble_lines:
+        return []
+
+    segments = []
+    for position, (index, number) in enumerate(starts):
+        end = starts[position + 1][0] if position + 1 < len(starts) else len(lines)
+        segments.append({
+            'label': f"Q{number}",
+            'text': '\n'.join(line['text'] for line in lines[index:end]),
+            'top': lines[index]['top'],
+            'bottom': lines[end]['top'] if end < len(lines) else None
+        })
+
+    # Question lines on the same row (side-by-side columns) give empty bands; send the whole frame instead
+    if any(segment['bottom'] is not None and segment['bottom'] <= segment['top'] for segment in segments):
+        return []
+    return segments
+
+
+def crop_segment(base64_image, top, bottom=None, padding=8):
+    """Full-width band of an encoded image between top and bottom, re-encoded in its format"""
+    with Image.open(io.BytesIO(base64.b64decode(base64_image))) as image:
+        image_format = image.format or 'PNG'
+        bottom = image.height if bottom is None else min(image.height, bottom + padding)
+        band = image.crop((0, max(0, top - padding), image.width, bottom))
+        buffer = io.BytesIO()
+        if image_format == 'JPEG':
+            band.save(buffer, format='JPEG', quality=85, optimize=True)
+        else:
+            band.save(buffer, format=image_format)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
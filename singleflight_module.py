@@ -0,0 +1,63 @@
+import logging
+import threading
+import time
+
+
+class SingleFlight:
+    """
+    At most one background run per action key.
+    Calls made while a run is in flight attach to it if they arrive within
+    attach_window seconds of its start (key repeat, double presses), otherwise
+    they queue a single follow-up run; further calls replace that follow-up.
+    """
+
+    def __init__(self, attach_window=0.5):
+        self.logger = logging.getLogger(__name__)
+        self.attach_window = attach_window
+        self.flights = {}  # key -> {'started': float, 'follow_up': callable or None}
+        self.lock = threading.Lock()
+        self.stats = {'started': 0, 'attached': 0, 'queued': 0}
+
+    def run(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) for key; returns 'started', 'attached' or 'queued'"""
+        call = lambda: func(*args, **kwargs)
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                if time.monotonic() - flight['started'] < self.attach_window:
+                    outcome = 'attached'
+                else:
+                    # Latest call wins so the follow-up uses the newest settings
+                    flight['follow_up'] = call
+                    outcome = 'queued'
+                self.stats[outcome] += 1
+                return outcome
+
+            self.flights[key] = {'started': time.monotonic(), 'follow_up': None}
+            self.stats['started'] += 1
+
+        threading.Thread(target=self._fly, args=(key, call), daemon=True, name=f"singleflight-{key}").start()
+        return 'started'
+
+    def _fly(self, key, call):
+        while call is not None:
+            try:
+                call()
+            except Exception as e:
+                self.logger.error(f"{key} failed: {e}")
+
+            with self.lock:
+                flight = self.flights[key]
+                call, flight['follow_up'] = flight['follow_up'], None
+                if call is None:
+                    del self.flights[key]
+                else:
+                    flight['started'] = time.monotonic()
+
+    def in_flight(self, key):
+        with self.lock:
+            return key in self.flights
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
@@ -0,0 +1,191 @@
+"""
+Request sizing.
+
+Prompt tokens are counted locally (tiktoken when it is installed, otherwise
+about four characters per token) and image tokens estimated from the encoded
+dimensions and detail level. max_tokens is picked per request kind from the
+completion lengths seen so far; a response cut off at an adaptive budget is
+retried once at the full budget, so sizing never truncates an answer.
+"""
+
+import base64
+import io
+import logging
+import math
+import threading
+from collections import deque
+
+from PIL import Image
+
+# Detail "low" sends a single 512px tile; larger images need "high" to stay legible
+LOW_DETAIL_MAX_SIDE = 512
+
+# Base64 prefixes (multiples of 4) tried for the image header: PNG IHDR, then typical JPEG SOF offsets
+HEADER_PREFIX_LENGTHS = (64, 8192, 65536)
+
+QUESTION_TYPE_KEYWORDS = [
+    ('code', ['write a program', 'write a function', 'write code', 'code', 'program', 'function', 'algorithm']),
+    ('math', ['calculate', 'solve', 'find', 'compute']),
+    ('definition', ['define', 'what is', 'meaning']),
+    ('explanation', ['explain', 'how', 'why']),
+    ('listing', ['list', 'name', 'identify'])
+]
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model_name):
+    """tiktoken encoding for model_name, False if tiktoken is not installed"""
+    with _encodings_lock:
+        if model_name not in _encodings:
+            try:
+                import tiktoken
+                try:
+                    _encodings[model_name] = tiktoken.encoding_for_model(model_name)
+                except KeyError:
+                    _encodings[model_name] = tiktoken.get_encoding('o200k_base')
+            except ImportError:
+                _encodings[model_name] = False
+        return _encodings[model_name]
+
+
+def estimate_tokens(text, model_name='gpt-4o'):
+    """Prompt tokens for text: exact with tiktoken, otherwise about four characters per token"""
+    encoding = _encoding(model_name)
+    if encoding:
+        return max(1, len(encoding.encode(text or '', disallowed_special=())))
+    return max(1, len(text or '') // 4)
+
+
+def estimate_image_tokens(width, height, model_name, detail='high'):
+    """Approximate image input tokens for the provider's tiling scheme"""
+    if model_name.startswith('gemini'):
+        return 258
+    if detail == 'low':
+        return 85
+
+    # OpenAI high detail: fit in 2048x2048, shortest side to 768, then 170 tokens per 512px tile
+    scale = min(1, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = -(-int(width) // 512) * -(-int(height) // 512)
+    return 85 + 170 * tiles
+
+
+def image_size(base64_image):
+    """(width, height) of an encoded image, decoding only as much base64 as the header needs"""
+    for length in HEADER_PREFIX_LENGTHS:
+        if length >= len(base64_image):
+            break
+        try:
+            with Image.open(io.BytesIO(base64.b64decode(base64_image[:length]))) as image:
+                return image.size
+        except Exception:
+            continue  # Header (e.g. a JPEG with large EXIF/ICC segments) runs past the prefix
+    with Image.open(io.BytesIO(base64.b64decode(base64_image))) as image:
+        return image.size
+
+
+def choose_detail(width, height, preference='auto'):
+    """OpenAI image detail level: 'low' when a single tile already holds the whole image"""
+    if preference in ('low', 'high'):
+        return preference
+    return 'low' if max(width, height) <= LOW_DETAIL_MAX_SIDE else 'high'
+
+
+def estimate_request_tokens(body):
+    """Input tokens of a chat completion body, including images"""
+    model_name = body.get('model', 'gpt-4o')
+    total = 0
+    for message in body.get('messages', []):
+        total += 4  # Role and message framing
+        content = message.get('content')
+        if isinstance(content, str):
+            total += estimate_tokens(content, model_name)
+            continue
+        for part in content or []:
+            if part.get('type') == 'text':
+                total += estimate_tokens(part['text'], model_name)
+            elif part.get('type') == 'image_url':
+                image_url = part['image_url']
+                try:
+                    width, height = image_size(image_url['url'].split(',', 1)[1])
+                    total += estimate_image_tokens(width, height, model_name, image_url.get('detail', 'high'))
+                except Exception:
+                    total += 85
+    return total
+
+
+def question_type(question):
+    """Coarse question category used to size answers"""
+    question_lower = (question or '').lower()
+    for category, keywords in QUESTION_TYPE_KEYWORDS:
+        if any(keyword in question_lower for keyword in keywords):
+            return category
+    return 'general'
+
+
+class RequestSizer:
+    """
+    Adaptive max_tokens.
+    Each request kind (e.g. 'text:math:short', 'vision:detailed') keeps a window
+    of completion lengths; its budget is the 95th percentile times headroom,
+    rounded up to 64 tokens, between floor and the caller's fixed ceiling.
+    Until min_samples completions are seen the ceiling is used.
+    """
+
+    def __init__(self, headroom=1.5, floor=128, min_samples=5, window=50):
+        self.logger = logging.getLogger(__name__)
+        self.headroom = headroom
+        self.floor = floor
+        self.min_samples = min_samples
+        self.window = window
+        self.enabled = True  # False: always use the ceiling
+
+        self.lock = threading.Lock()
+        self.samples = {}  # kind -> deque of completion tokens
+        self.truncated = {}  # kind -> responses cut off at an adaptive budget
+        self.budgets = {}  # kind -> last budget handed out
+        self.input_tokens = deque(maxlen=200)
+
+    def max_tokens(self, kind, ceiling):
+        """Completion budget for the next request of kind"""
+        with self.lock:
+            samples = sorted(self.samples.get(kind, ()))
+            if not self.enabled or len(samples) < self.min_samples:
+                budget = ceiling
+            else:
+                p95 = samples[math.ceil(len(samples) * 0.95) - 1]
+                budget = max(min(math.ceil(p95 * self.headroom / 64) * 64, ceiling), min(self.floor, ceiling))
+            self.budgets[kind] = budget
+            return budget
+
+    def observe(self, kind, budget, ceiling, completion_tokens, finish_reason, input_tokens=None):
+        """Record a completion; returns True if it was truncated by sizing and should be retried at ceiling"""
+        truncated = finish_reason == 'length' and budget < ceiling
+        with self.lock:
+            samples = self.samples.setdefault(kind, deque(maxlen=self.window))
+            if input_tokens:
+                self.input_tokens.append(input_tokens)
+            if truncated:
+                # The answer needed more than the budget; make sure the next one gets it
+                self.truncated[kind] = self.truncated.get(kind, 0) + 1
+                samples.append(min(ceiling, budget * 2))
+            elif completion_tokens:
+                samples.append(completion_tokens)
+        if truncated:
+            self.logger.info(f"{kind} answer hit max_tokens={budget}; retrying with {ceiling}")
+        return truncated
+
+    def get_stats(self):
+        with self.lock:
+            kinds = {kind: {'samples': len(samples), 'truncated': self.truncated.get(kind, 0),
+                            'max_tokens': self.budgets.get(kind)}
+                     for kind, samples in self.samples.items()}
+            inputs = list(self.input_tokens)
+        return {'kinds': kinds, 'mean_input_tokens': sum(inputs) / len(inputs) if inputs else None}
+
+
+request_sizer = RequestSizer()
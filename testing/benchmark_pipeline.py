@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark: throughput and latency of capture -> encode -> request,
+driven by fixture media and mocked provider endpoints on localhost.
+
+Exits with status 1 when a benchmark's p50 regresses past the stored baseline.
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import wave
+import base64
+import argparse
+import logging
+import tempfile
+import threading
+from types import SimpleNamespace
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from profiler_module import profiler
+from prompt_module import prompt_cache_stats
+from mock_provider_server import MockProviderServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+class SkipBenchmark(Exception):
+    """Raised when a benchmark's dependencies are not available"""
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def make_fixture_screenshot(width=1920, height=1080):
+    """Deterministic exam-page screenshot"""
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 0, width, 60], fill=(40, 60, 120))
+    draw.text((20, 20), "Online Exam - Section B", fill='white')
+    lines = [
+        "Q1. What is the time complexity of binary search on a sorted array?",
+        "    A) O(n)   B) O(log n)   C) O(n log n)   D) O(1)",
+        "Q2. Which layer of the OSI model is responsible for routing?",
+        "    A) Transport   B) Network   C) Data link   D) Session",
+        "Q3. Explain the difference between a process and a thread.",
+    ]
+    for index, line in enumerate(lines):
+        draw.text((60, 120 + index * 40), line, fill='black')
+    draw.rectangle([60, 400, 700, 800], outline='black')
+    draw.line([60, 800, 700, 400], fill='gray', width=3)
+    return image
+
+
+def make_fixture_wav(rate=44100, seconds=12.0):
+    """Deterministic WAV with speech-like bursts separated by silence"""
+    rng = np.random.default_rng(1234)
+    total = int(rate * seconds)
+    samples = rng.normal(0, 60, total)  # Background hiss below the VAD threshold
+
+    # 1.5s voiced bursts every 3s: harmonics with a syllable-rate envelope
+    for start in np.arange(0.5, seconds - 1.5, 3.0):
+        begin = int(start * rate)
+        t = np.arange(int(1.5 * rate)) / rate
+        voiced = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6))
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+        samples[begin:begin + len(t)] += 4000 * voiced * envelope
+
+    pcm = np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def load_fixtures(screenshot_path=None, wav_path=None):
+    """Load fixture media from disk, or build the synthetic defaults"""
+    if screenshot_path:
+        screenshot = Image.open(screenshot_path).convert('RGB')
+    else:
+        screenshot = make_fixture_screenshot()
+
+    if wav_path:
+        with open(wav_path, 'rb') as f:
+            wav_bytes = f.read()
+    else:
+        wav_bytes = make_fixture_wav()
+
+    with wave.open(io.BytesIO(wav_bytes), 'rb') as wav_file:
+        rate = wav_file.getframerate()
+        pcm = wav_file.readframes(wav_file.getnframes())
+
+    return screenshot, pcm, rate
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def measure(func, iterations, warmup=2, units_per_call=1):
+    """Time func() and return latency percentiles and throughput"""
+    for _ in range(warmup):
+        func()
+
+    durations = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    durations.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': durations[len(durations) // 2] * 1000,
+        'p95_ms': durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'throughput_per_sec': iterations * units_per_call / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def require(module_name):
+    """Import a module or skip the benchmark that needs it"""
+    try:
+        return __import__(module_name)
+    except Exception as e:
+        raise SkipBenchmark(f"{module_name} unavailable: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_capture_and_encode(ctx, iterations):
+    """ScreenshotCapture.capture_and_encode with the grab replaced by the fixture"""
+    screenshot_module = require('screenshot_module')
+
+    class FixtureScreenshotCapture(screenshot_module.ScreenshotCapture):
+        def capture_screen_excluding_window(self, exclude_window_title="Exam Helper"):
+            return ctx.screenshot.copy()
+
+    capture = FixtureScreenshotCapture()
+    return measure(lambda: capture.capture_and_encode(), iterations)
+
+
+def bench_ocr_preprocess(ctx, iterations):
+    """OCRCapture.preprocess_image on the fixture screenshot"""
+    ocr_module = require('ocr_module')
+    cv2 = require('cv2')
+
+    ocr = ocr_module.OCRCapture()
+    image = cv2.cvtColor(np.array(ctx.screenshot), cv2.COLOR_RGB2BGR)
+    return measure(lambda: ocr.preprocess_image(image), iterations)
+
+
+def bench_audio_segmentation(ctx, iterations):
+    """RMS + VAD segmentation over the fixture WAV, replayed with synthetic chunk timestamps"""
+    audio_module = require('audio_module')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        audio = audio_module.AudioCapture(profile_path=os.path.join(temp_dir, 'audio_profile.json'))
+    if ctx.rate != audio.rate:
+        raise SkipBenchmark(f"fixture WAV is {ctx.rate} Hz, capture runs at {audio.rate} Hz")
+
+    samples = np.frombuffer(ctx.pcm, dtype=np.int16)
+    chunks = [samples[i:i + audio.chunk] for i in range(0, len(samples) - audio.chunk + 1, audio.chunk)]
+    chunk_seconds = audio.chunk / audio.rate
+    segments = []
+
+    def run():
+        audio.speech_buffer.clear()
+        for index, chunk in enumerate(chunks):
+            rms = audio._calculate_rms(chunk)
+            audio._process_speech_detection(chunk, rms, index * chunk_seconds)
+        count = 0
+        while audio.get_speech_from_queue() is not None:
+            count += 1
+        segments.append(count)
+
+    result = measure(run, iterations, units_per_call=len(chunks))
+    result['segments'] = segments[-1]
+    audio.cleanup()
+    return result
+
+
+def bench_audio_encode(ctx, iterations):
+    """AudioCapture.encode_for_upload on the fixture PCM"""
+    audio_module = require('audio_module')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        audio = audio_module.AudioCapture(profile_path=os.path.join(temp_dir, 'audio_profile.json'))
+    result = measure(lambda: audio.encode_for_upload(ctx.pcm), iterations)
+    audio.cleanup()
+    return result
+
+
+def bench_llm_client(ctx, iterations):
+    """LLMClient.get_answer request/parse against the mock endpoint"""
+    llm_module = require('llm_module')
+
+    client = llm_module.LLMClient('mock-key', 'gpt-4o-mini', base_url=f"{ctx.base_url}/v1")
+    client.min_request_interval = 0
+    return measure(lambda: client.get_answer("What is the time complexity of binary search?"), iterations)
+
+
+def bench_openai_vision(ctx, iterations):
+    """ExamEngine.analyze_image (OpenAI vision) request/parse against the mock endpoint"""
+    engine_module = require('engine_module')
+
+    engine = engine_module.ExamEngine({'openai_api_key': 'mock-key', 'openai_base_url': f"{ctx.base_url}/v1",
+                                       'response_cache_size': 0, 'dedup_enabled': False})
+    return measure(lambda: engine.analyze_image(ctx.screenshot_b64, 'openai_gpt4o_mini', 'short'), iterations)
+
+
+def bench_engine_answer(ctx, iterations):
+    """Headless engine round trip: submit_question -> answer event"""
+    engine_module = require('engine_module')
+    require('llm_module')
+
+    config = {'openai_api_key': 'mock-key', 'openai_base_url': f"{ctx.base_url}/v1",
+              'openai_model': 'gpt-4o-mini', 'audio_enabled': False, 'live_screen_enabled': False,
+              'response_cache_size': 0, 'dedup_enabled': False}
+    engine = engine_module.ExamEngine(config)
+    engine.llm_client.min_request_interval = 0
+    answered = threading.Semaphore(0)
+    engine.subscribe('answer', lambda **data: answered.release())
+    engine.subscribe('error', lambda **data: answered.release())
+    engine.start(warm_up=False)
+
+    def run():
+        engine.submit_question('Benchmark', "What is the time complexity of binary search?")
+        answered.acquire()
+
+    try:
+        return measure(run, iterations)
+    finally:
+        engine.stop()
+
+
+def bench_perplexity_client(ctx, iterations):
+    """PerplexityClient.get_text_answer request/parse against the mock endpoint"""
+    perplexity_module = require('perplexity_module')
+
+    client = perplexity_module.PerplexityClient('mock-key', base_url=f"{ctx.base_url}/chat/completions")
+    client.min_request_interval = 0
+    return measure(lambda: client.get_text_answer("What is the time complexity of binary search?"), iterations)
+
+
+def bench_gemini_client(ctx, iterations):
+    """GeminiClient.analyze_image request/parse against the mock endpoint"""
+    gemini_module = require('gemini_module')
+
+    client = gemini_module.GeminiClient('mock-key', api_endpoint=ctx.base_url)
+    client.min_request_interval = 0
+    answer = client.analyze_image(ctx.screenshot_b64)
+    if not answer or answer.startswith("Error"):
+        raise SkipBenchmark(f"Gemini SDK could not reach the mock endpoint: {answer}")
+    return measure(lambda: client.analyze_image(ctx.screenshot_b64), iterations)
+
+
+BENCHMARKS = {
+    'capture_and_encode': bench_capture_and_encode,
+    'ocr_preprocess': bench_ocr_preprocess,
+    'audio_segmentation': bench_audio_segmentation,
+    'audio_encode': bench_audio_encode,
+    'llm_client': bench_llm_client,
+    'openai_vision': bench_openai_vision,
+    'engine_answer': bench_engine_answer,
+    'perplexity_client': bench_perplexity_client,
+    'gemini_client': bench_gemini_client,
+}
+
+
+# ---------------------------------------------------------------------------
+# Baseline
+# ---------------------------------------------------------------------------
+
+def load_baseline(path):
+    """Load stored baseline results"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    """Store the current results as the baseline"""
+    baseline = {name: {'p50_ms': result['p50_ms'], 'throughput_per_sec': result['throughput_per_sec']}
+                for name, result in results.items() if 'p50_ms' in result}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def find_regressions(results, baseline, tolerance):
+    """List benchmarks whose p50 is slower than the baseline beyond the tolerance"""
+    regressions = []
+    for name, result in results.items():
+        if 'p50_ms' not in result or name not in baseline:
+            continue
+        allowed = baseline[name]['p50_ms'] * (1 + tolerance)
+        if result['p50_ms'] > allowed:
+            regressions.append((name, baseline[name]['p50_ms'], result['p50_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the capture -> encode -> request pipeline")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument('--screenshot', help="Fixture screenshot (default: synthetic exam page)")
+    parser.add_argument('--wav', help="Fixture WAV, 44.1 kHz mono (default: synthetic speech bursts)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Mock endpoint response delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of mock requests that fail with a 500")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p50 slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--json', help="Also write results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    screenshot, pcm, rate = load_fixtures(args.screenshot, args.wav)
+    server = MockProviderServer(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=0)
+    base_url = server.start()
+
+    buffer = io.BytesIO()
+    screenshot.save(buffer, format='JPEG', quality=85)
+    ctx = SimpleNamespace(screenshot=screenshot, screenshot_b64=base64.b64encode(buffer.getvalue()).decode('utf-8'),
+                          pcm=pcm, rate=rate, base_url=base_url)
+
+    print("Exam Helper Pipeline Benchmark")
+    print("=" * 40)
+    print(f"Mock endpoints: {base_url} (latency {args.latency_ms:.0f} ms, error rate {args.error_rate:.0%})")
+    print()
+    print(f"{'Benchmark':<20} {'p50':>9} {'p95':>9} {'mean':>9} {'ops/s':>10}")
+
+    results = {}
+    for name in args.only or BENCHMARKS:
+        try:
+            result = BENCHMARKS[name](ctx, args.iterations)
+        except SkipBenchmark as e:
+            results[name] = {'skipped': str(e)}
+            print(f"{name:<20} skipped ({e})")
+            continue
+        results[name] = result
+        print(f"{name:<20} {result['p50_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms {result['mean_ms']:>7.2f}ms "
+              f"{result['throughput_per_sec']:>10.1f}")
+
+    mock_stats = server.get_stats()
+    server.stop()
+
+    print(f"\nMock requests: {mock_stats}")
+
+    cache_stats = prompt_cache_stats.get_stats()
+    if cache_stats:
+        print()
+        print("Prompt tokens served from provider cache:")
+        for provider, stats in sorted(cache_stats.items()):
+            print(f"  {provider:<12} {stats['cached_tokens']}/{stats['prompt_tokens']} ({stats['cached_ratio']:.0%}) "
+                  f"over {stats['requests']} requests")
+
+    stage_stats = profiler.stage_stats()
+    if stage_stats:
+        print()
+        print("Profiler stages (ms):")
+        for stage, stats in sorted(stage_stats.items()):
+            print(f"  {stage:<14} n={stats['count']:<5} p50={stats['p50']:.2f} p95={stats['p95']:.2f} p99={stats['p99']:.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline} - run with --update-baseline to create one")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for name, expected, actual in regressions:
+            print(f"  {name}: p50 {actual:.2f}ms vs baseline {expected:.2f}ms")
+        return 1
+
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Request body benchmark: peak memory and serialization time of a vision
+request carrying a 4K screenshot, sent with requests' json= versus
+StreamedJSONBody, against the mock provider server on localhost.
+
+Peak memory is measured with tracemalloc and excludes the payload itself
+(the base64 screenshot already exists before the request is built).
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import base64
+import argparse
+import statistics
+import tracemalloc
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import requests
+from PIL import Image, ImageDraw
+
+from body_module import StreamedJSONBody
+from mock_provider_server import MockProviderServer
+
+
+def make_4k_capture(image_format='PNG'):
+    """Deterministic 3840x2160 exam page with a photo-like background panel, base64 encoded"""
+    rng = np.random.default_rng(0)
+    image = Image.new('RGB', (3840, 2160), 'white')
+    # Wallpaper, video or photo content is what makes real 4K captures large
+    noise = rng.integers(0, 256, (1080, 1600, 3), dtype=np.uint8)
+    image.paste(Image.fromarray(noise), (2160, 1000))
+    draw = ImageDraw.Draw(image)
+    for index in range(40):
+        draw.text((120, 120 + index * 45), f"Q{index + 1}. Which of the following statements about item {index} is true?",
+                  fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **({'quality': 95} if image_format == 'JPEG' else {}))
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def make_payload(base64_image, image_format):
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": "Answer the questions on the screen."},
+            {"role": "user", "content": [
+                {"type": "image_url",
+                 "image_url": {"url": f"data:image/{image_format.lower()};base64,{base64_image}", "detail": "high"}}
+            ]}
+        ],
+        "max_tokens": 1000,
+        "temperature": 0.3
+    }
+
+
+def serialize_json(payload):
+    """What requests does for json=: dumps to str, then encode to bytes"""
+    request = requests.Request('POST', 'http://localhost/', json=payload).prepare()
+    return len(request.body)
+
+
+def serialize_streamed(payload):
+    """Build the streamed body and produce every chunk, as sending it does"""
+    request = requests.Request('POST', 'http://localhost/', data=StreamedJSONBody(payload)).prepare()
+    return sum(len(chunk) for chunk in request.body)
+
+
+def measure(func, payload, iterations):
+    """(median ms, peak bytes allocated during one call)"""
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(payload)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func(payload)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return statistics.median(durations), peak
+
+
+def measure_post(url, payload, streamed, iterations):
+    """Median ms of a full POST to the mock server"""
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        if streamed:
+            response = requests.post(url, headers={"Content-Type": "application/json"},
+                                     data=StreamedJSONBody(payload), timeout=30)
+        else:
+            response = requests.post(url, json=payload, timeout=30)
+        response.raise_for_status()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark request body serialization for 4K screenshots")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--format', choices=['PNG', 'JPEG'], default='PNG', help="Encoding of the 4K capture")
+    parser.add_argument('--no-post', action='store_true', help="Skip the round trips to the mock server")
+    args = parser.parse_args()
+
+    base64_image = make_4k_capture(args.format)
+    payload = make_payload(base64_image, args.format)
+    body_size = len(json.dumps(payload))
+
+    print("Exam Helper Request Body Benchmark")
+    print("=" * 40)
+    print(f"4K {args.format} capture: {len(base64_image) / 1e6:.1f} MB base64, body {body_size / 1e6:.1f} MB")
+    print()
+    print(f"{'Body':<10} {'serialize':>10} {'peak memory':>12} {'POST':>10}")
+
+    server = None if args.no_post else MockProviderServer(seed=0)
+    url = None if server is None else f"{server.start()}/v1/chat/completions"
+    try:
+        for name, func, streamed in [('json=', serialize_json, False), ('streamed', serialize_streamed, True)]:
+            assert func(payload) == len(json.dumps(payload).encode('utf-8'))
+            duration, peak = measure(func, payload, args.iterations)
+            post = '' if url is None else f"{measure_post(url, payload, streamed, args.iterations):.1f}ms"
+            print(f"{name:<10} {duration:>8.2f}ms {peak / 1e6:>9.2f} MB {post:>10}")
+    finally:
+        if server is not None:
+            server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
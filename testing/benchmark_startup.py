@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark: breaks down import and init cost per subsystem
+"""
+
+import sys
+import os
+import time
+import logging
+
+# Add parent directory to path to import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine_module import ExamEngine, load_config
+
+def benchmark_gui_imports():
+    """Time the imports the main window needs before it can appear"""
+    start = time.perf_counter()
+    import tkinter  # noqa: F401
+    from tkinter import ttk, scrolledtext, messagebox  # noqa: F401
+    from PIL import Image  # noqa: F401
+    return time.perf_counter() - start
+
+def benchmark_engine(config):
+    """Construct the engine the way the GUI and CLI do; its registry holds the real startup components"""
+    start = time.perf_counter()
+    engine = ExamEngine(config)
+    return engine, time.perf_counter() - start
+
+def benchmark_components(registry):
+    """Build each subsystem registered by ExamEngine.register_components and report its cost"""
+    for name in list(registry.factories):
+        try:
+            registry.get(name)
+        except Exception as e:
+            print(f"❌ {name} failed: {e}")
+
+    return registry
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+
+    print("Exam Helper Startup Benchmark")
+    print("=" * 40)
+
+    gui_time = benchmark_gui_imports()
+    print(f"GUI imports (window can appear after this): {gui_time:.3f}s")
+    print()
+
+    engine, engine_time = benchmark_engine(load_config())
+    print(f"Engine construction: {engine_time:.3f}s")
+    print()
+
+    registry = benchmark_components(engine.components)
+    print("Deferred subsystems (built by the warm-up thread):")
+    print(registry.format_timings())
+
+if __name__ == "__main__":
+    main()